@@ -0,0 +1,169 @@
+"""The whole controller under load, against a busy stand-in house.
+
+    python benchmarks/bench_end_to_end.py
+
+Serves every mapped entity alongside ENTITIES synthetic ones from the
+stand-in, and has CHURN of them change every second, spread over the house
+and the pads alike. A real LaunchpadController runs against it, on a board
+that only counts what it is told to light, with a poll every POLL seconds and
+a toggle press every PRESS seconds. Each run is done twice:
+
+- polling: every repaint fetches the watched states over REST
+- push: repaints come from the WebSocket subscription, presses go over it
+
+and reports the repaint times, LED writes, presses answered, and the client's
+own metrics.
+"""
+
+import statistics
+import threading
+import time
+from typing import Any
+
+from ha_launchpad.config.mapping import BUTTON_MAP
+from ha_launchpad.core.controller import LaunchpadController
+from ha_launchpad.infrastructure.ha.client import HomeAssistantClient
+from ha_launchpad.infrastructure.ha.standin import HomeAssistantStandIn
+from ha_launchpad.infrastructure.ha.websocket import HomeAssistantWebSocket
+from ha_launchpad.infrastructure.midi.interface import MidiBackend
+
+ENTITIES = 2000
+CHURN = 50.0
+POLL = 0.1
+PRESS = 0.25
+DURATION = 5.0
+SEED = 1
+
+
+class _Board(MidiBackend):
+    """A Launchpad that counts what it is asked to light."""
+
+    def __init__(self):
+        self.writes = 0
+
+    def find_and_open(self) -> bool:
+        return True
+
+    def send_note(self, note: int, color: str, channel: int = 0) -> None:
+        self.writes += 1
+
+    def send_velocity(self, note: int, velocity: int, channel: int = 0) -> None:
+        self.writes += 1
+
+    def send_cc(self, control: int, velocity: int, channel: int = 0) -> None:
+        self.writes += 1
+
+    def iter_incoming(self) -> Any | None:
+        return None
+
+    def is_connected(self) -> bool:
+        return True
+
+    def close(self) -> None:
+        pass
+
+
+def _house() -> dict[str, str]:
+    states = {}
+    for entity_id in BUTTON_MAP.values():
+        domain, _, object_id = entity_id.partition(".")
+        if domain in ("volume_up", "volume_down"):
+            entity_id = object_id
+            domain = entity_id.partition(".")[0]
+        if "." not in entity_id:
+            continue
+        states[entity_id] = "playing" if domain == "media_player" else "off"
+    return states
+
+
+def _toggle_pads() -> list[int]:
+    return [
+        note
+        for note, entity_id in sorted(BUTTON_MAP.items())
+        if entity_id.startswith("switch.")
+    ]
+
+
+def _run(use_push: bool) -> None:
+    with HomeAssistantStandIn(_house(), seed=SEED) as ha:
+        synthetic = ha.populate(ENTITIES)
+        client = HomeAssistantClient(ha.url, ha.token)
+        push = None
+        if use_push:
+            push = HomeAssistantWebSocket(ha.websocket_url, ha.token)
+            client.use_websocket(push)
+        board = _Board()
+        controller = LaunchpadController(client, BUTTON_MAP, board, push)
+        controller.running = True
+        controller.output.start()
+        controller.executor.start()
+        if push is not None:
+            push.start()
+            deadline = time.monotonic() + 5
+            while not push.is_live and time.monotonic() < deadline:
+                time.sleep(0.01)
+
+        controller.update_led_states(force=True)
+        ha.start_churn(CHURN, synthetic + list(_house()))
+
+        stop = threading.Event()
+        repaints: list[float] = []
+        presses = 0
+
+        def press() -> None:
+            nonlocal presses
+            pads = _toggle_pads()
+            while not stop.wait(PRESS):
+                controller.handle_button_press(pads[presses % len(pads)])
+                presses += 1
+
+        presser = threading.Thread(target=press, daemon=True)
+        presser.start()
+        deadline = time.monotonic() + DURATION
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            controller.update_led_states()
+            repaints.append(time.perf_counter() - started)
+            controller._serve_inbox()
+            time.sleep(POLL)
+        stop.set()
+        presser.join()
+
+        ha.stop_churn()
+        controller.running = False
+        controller.executor.stop()
+        controller.output.stop()
+        if push is not None:
+            push.stop()
+
+        repaints.sort()
+        label = "push" if use_push else "polling"
+        print(
+            f"{label}: {len(repaints)} repaints, median "
+            f"{statistics.median(repaints) * 1000:.2f} ms, "
+            f"p95 {repaints[int(len(repaints) * 0.95)] * 1000:.2f} ms; "
+            f"{board.writes} LED writes; {ha.churned} changes served"
+        )
+        print(f"  presses: {presses} sent, executor {controller.executor.metrics()}")
+        print(
+            f"  board: {controller.framebuffer.writes} pad writes, "
+            f"{controller.framebuffer.suppressed} dropped as unchanged; "
+            f"output {controller.output.metrics()}"
+        )
+        for line in client.metrics.summary():
+            print(f"  {line}")
+        for lane, counters in client.pool_metrics().items():
+            print(f"  {lane}: {counters}")
+
+
+def main() -> None:
+    print(
+        f"{ENTITIES} synthetic entities, {CHURN:g} changes/s, poll every "
+        f"{POLL}s, a press every {PRESS}s, {DURATION:g}s per run"
+    )
+    _run(use_push=False)
+    _run(use_push=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Latency of the first press after the board has been left alone.
+
+    python benchmarks/bench_first_press.py
+
+The stand-in closes idle connections after KEEPALIVE_TIMEOUT, as Home
+Assistant does after 75 s, and charges CONNECT_LATENCY for every new one. On
+localhost a connect is nearly free, so that stands in for the TCP and TLS
+setup a real network charges. Each run leaves the client idle past the
+timeout and then times one light.toggle:
+
+- cold: nothing done in between, so the press opens a new connection
+- prewarmed: prewarm() called on wake, as the wake button does, and awaited
+- kept alive: keep_alive() called through the quiet spell, as the poll does
+"""
+
+import statistics
+import time
+
+from ha_launchpad.infrastructure.ha.client import HomeAssistantClient
+from ha_launchpad.infrastructure.ha.standin import HomeAssistantStandIn
+
+KEEPALIVE_TIMEOUT = 0.5
+CONNECT_LATENCY = 0.02
+IDLE = 0.8
+RUNS = 8
+
+
+def _press(client: HomeAssistantClient) -> float:
+    start = time.perf_counter()
+    client.toggle_entity("light.a")
+    return time.perf_counter() - start
+
+
+def _cold(client: HomeAssistantClient) -> float:
+    time.sleep(IDLE)
+    return _press(client)
+
+
+def _prewarmed(client: HomeAssistantClient) -> float:
+    time.sleep(IDLE)
+    for future in client.prewarm():
+        future.result(5)
+    return _press(client)
+
+
+def _kept_alive(client: HomeAssistantClient) -> float:
+    deadline = time.monotonic() + IDLE
+    while time.monotonic() < deadline:
+        client.keep_alive(interval=KEEPALIVE_TIMEOUT / 2)
+        time.sleep(0.05)
+    return _press(client)
+
+
+def main() -> None:
+    with HomeAssistantStandIn(
+        {"light.a": "on"},
+        keepalive_timeout=KEEPALIVE_TIMEOUT,
+        connect_latency=CONNECT_LATENCY,
+    ) as ha:
+        client = HomeAssistantClient(ha.url, ha.token)
+        client.toggle_entity("light.a")
+
+        print(
+            f"first press after {IDLE:.1f}s idle, server closes idle connections "
+            f"after {KEEPALIVE_TIMEOUT:.1f}s, {CONNECT_LATENCY * 1000:.0f} ms "
+            f"per new connection, {RUNS} runs"
+        )
+        for label, scenario in (
+            ("cold", _cold),
+            ("prewarmed", _prewarmed),
+            ("kept alive", _kept_alive),
+        ):
+            timings = [scenario(client) for _ in range(RUNS)]
+            print(
+                f"{label:<11} median {statistics.median(timings) * 1000:6.2f} ms"
+                f"   max {max(timings) * 1000:6.2f} ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
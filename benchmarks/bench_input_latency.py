@@ -0,0 +1,161 @@
+"""How long a press waits before the controller handles it.
+
+    python benchmarks/bench_input_latency.py
+
+A real LaunchpadController's MIDI loop runs against a board that "reads" a
+press every GAP seconds on average, at random, from a thread of its own as
+rtmidi does, and stamps each one with when it was read. The handler records
+how long each took to reach it. Each run is done twice:
+
+- polled: the board cannot hand messages over, so the loop polls the port
+- listened: the board calls back with each message, and the loop sleeps on
+  its inbox until one arrives
+
+and reports the press-to-handler latency and how often the loop wakes with
+nothing to do.
+"""
+
+import random
+import statistics
+import threading
+import time
+from collections.abc import Callable
+from typing import Any
+
+from ha_launchpad.core.controller import LaunchpadController
+from ha_launchpad.infrastructure.ha.client import HomeAssistantClient
+from ha_launchpad.infrastructure.midi.interface import MidiBackend
+
+PRESSES = 100
+GAP = 0.02
+IDLE = 3.0
+SEED = 1
+
+
+class _Press:
+    type = "note_on"
+    velocity = 127
+
+    def __init__(self, note: int):
+        self.note = note
+        self.read_at = time.perf_counter()
+
+
+class _Port:
+    def __init__(self):
+        self._pending: list[_Press] = []
+        self._lock = threading.Lock()
+
+    def put(self, msg: _Press) -> None:
+        with self._lock:
+            self._pending.append(msg)
+
+    def iter_pending(self):
+        with self._lock:
+            pending, self._pending = self._pending, []
+        return iter(pending)
+
+
+class _Board(MidiBackend):
+    """A Launchpad that is pressed on its own, and lights nothing."""
+
+    def __init__(self, listens: bool):
+        self.listens = listens
+        self.port = _Port()
+        self.on_message: Callable[[Any], None] | None = None
+
+    def press(self, note: int) -> None:
+        msg = _Press(note)
+        if self.on_message is not None:
+            self.on_message(msg)
+        else:
+            self.port.put(msg)
+
+    def find_and_open(self) -> bool:
+        return True
+
+    def send_note(self, note: int, color: str, channel: int = 0) -> None:
+        pass
+
+    def send_velocity(self, note: int, velocity: int, channel: int = 0) -> None:
+        pass
+
+    def send_cc(self, control: int, velocity: int, channel: int = 0) -> None:
+        pass
+
+    def iter_incoming(self) -> Any | None:
+        return self.port
+
+    def listen(self, on_message: Callable[[Any], None]) -> bool:
+        if not self.listens:
+            return False
+        self.on_message = on_message
+        return True
+
+    def is_connected(self) -> bool:
+        return True
+
+    def close(self) -> None:
+        pass
+
+
+def _run(listens: bool) -> None:
+    board = _Board(listens)
+    # Never called: the handler is replaced, and nothing is mapped.
+    client = HomeAssistantClient("http://127.0.0.1:9", "token")
+    controller = LaunchpadController(client, {}, board)
+    latencies: list[float] = []
+    handled = threading.Event()
+
+    def handle(msg: _Press) -> None:
+        latencies.append(time.perf_counter() - msg.read_at)
+        if len(latencies) == PRESSES:
+            handled.set()
+
+    controller.handle_midi_message = handle  # pyright: ignore
+    wakes = 0
+    serve = controller._serve_inbox
+
+    def counted_serve(timeout: float | None = None) -> None:
+        nonlocal wakes
+        wakes += 1
+        serve(timeout)
+
+    controller._serve_inbox = counted_serve  # pyright: ignore
+    controller.running = True
+    loop = threading.Thread(target=controller._midi_loop, daemon=True)
+    loop.start()
+
+    # Wait for the loop to have asked the board how to read it.
+    time.sleep(0.05)
+    rng = random.Random(SEED)
+    for _ in range(PRESSES):
+        time.sleep(rng.uniform(0, 2 * GAP))
+        board.press(81)
+    handled.wait(5)
+
+    wakes = 0
+    time.sleep(IDLE)
+    idle_wakes = wakes
+
+    controller.stop()
+    loop.join(2)
+
+    latencies.sort()
+    label = "listened" if listens else "polled"
+    print(
+        f"{label:<8} median {statistics.median(latencies) * 1000:7.3f} ms"
+        f"   p95 {latencies[int(len(latencies) * 0.95)] * 1000:7.3f} ms"
+        f"   max {latencies[-1] * 1000:7.3f} ms"
+        f"   idle wake-ups {idle_wakes / IDLE:5.1f}/s"
+    )
+
+
+def main() -> None:
+    print(f"{PRESSES} presses, one every {GAP * 1000:.0f} ms on average")
+    _run(listens=False)
+    _run(listens=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""Cost of diffing a rendered board against the one last painted.
+
+    python benchmarks/bench_led_cache.py
+
+Every mapped pad's colour is worked out, then compared with what the board
+shows, and the new board is kept for next time. Compares the two ways
+LEDManager has held the board:
+
+- strings: a fresh dict per render, keyed by note, of "color:channel" keys
+- packed: velocity and channel packed into one slot of a preallocated array,
+  with the painted and next boards swapped rather than rebuilt
+
+Each render changes CHANGED pads of the mapped ones, as a typical poll does,
+and the time and the memory allocated are for the cache work alone.
+"""
+
+import random
+import statistics
+import time
+import tracemalloc
+from array import array
+
+from ha_launchpad.config.mapping import BUTTON_MAP, COLORS
+from ha_launchpad.core.logic.framebuffer import BLANK_BOARD
+
+CHANGED = 2
+RUNS = 20000
+
+
+def _renders(rng: random.Random) -> list[list[tuple[int, str, int]]]:
+    """The (note, colour, channel) of every pad, render after render."""
+    names = list(COLORS)
+    board = {note: (rng.choice(names), rng.choice((0, 2))) for note in BUTTON_MAP}
+    renders = []
+    for _ in range(64):
+        for note in rng.sample(list(board), CHANGED):
+            board[note] = (rng.choice(names), rng.choice((0, 2)))
+        renders.append([(note, c, ch) for note, (c, ch) in board.items()])
+    return renders
+
+
+class _Strings:
+    def __init__(self):
+        self.last: dict[int, str] = {}
+
+    def render(self, pads: list[tuple[int, str, int]]) -> int:
+        changed = 0
+        current = {}
+        for note, color, channel in pads:
+            state_key = f"{color}:{channel}"
+            current[note] = state_key
+            if self.last.get(note) != state_key:
+                changed += 1
+        self.last = current
+        return changed
+
+
+class _Packed:
+    def __init__(self):
+        self.painted = array("H", BLANK_BOARD)
+        self.next = array("H", BLANK_BOARD)
+
+    def render(self, pads: list[tuple[int, str, int]]) -> int:
+        changed = 0
+        current = self.next
+        current[:] = self.painted
+        painted = self.painted
+        velocity = COLORS.get
+        for note, color, channel in pads:
+            packed = channel << 7 | velocity(color, 0)
+            current[note] = packed
+            if painted[note] != packed:
+                changed += 1
+        self.painted, self.next = current, painted
+        return changed
+
+
+def _measure(cache, renders) -> tuple[float, int]:
+    for pads in renders:
+        cache.render(pads)
+    times = []
+    for i in range(RUNS):
+        pads = renders[i % len(renders)]
+        start = time.perf_counter()
+        cache.render(pads)
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    cache.render(renders[0])
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return statistics.median(times), peak - before
+
+
+def main() -> None:
+    renders = _renders(random.Random(1))
+    print(f"{len(BUTTON_MAP)} mapped pads, {CHANGED} changed per render")
+    print(f"{'':<10}{'median':>12}{'allocated':>14}")
+    for name, cache in (("strings", _Strings()), ("packed", _Packed())):
+        median, allocated = _measure(cache, renders)
+        print(f"{name:<10}{median * 1e6:>10.2f}us{allocated:>12} B")
+
+
+if __name__ == "__main__":
+    main()
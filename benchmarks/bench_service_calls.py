@@ -0,0 +1,68 @@
+"""Per-call latency of a service call over REST and over the WebSocket.
+
+    python benchmarks/bench_service_calls.py
+
+Both go through HomeAssistantClient.call_service against the local stand-in,
+so what differs is only the transport: an HTTP request on a pooled connection
+against one frame on the already-authenticated socket. The stand-in answers
+at once, which leaves the per-call overhead of each path to compare.
+"""
+
+import statistics
+import time
+
+from ha_launchpad.infrastructure.ha.client import HomeAssistantClient
+from ha_launchpad.infrastructure.ha.standin import HomeAssistantStandIn
+from ha_launchpad.infrastructure.ha.websocket import HomeAssistantWebSocket
+
+CALLS = 500
+WARMUP = 20
+
+
+def _time_calls(client: HomeAssistantClient) -> list[float]:
+    for _ in range(WARMUP):
+        client.call_service("light", "toggle", "light.a")
+    timings = []
+    for _ in range(CALLS):
+        start = time.perf_counter()
+        client.call_service("light", "toggle", "light.a")
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def _report(label: str, timings: list[float]) -> None:
+    timings = sorted(timings)
+    p95 = timings[int(len(timings) * 0.95)]
+    print(
+        f"{label:<10} median {statistics.median(timings) * 1000:6.3f} ms"
+        f"   p95 {p95 * 1000:6.3f} ms"
+    )
+
+
+def main() -> None:
+    with HomeAssistantStandIn({"light.a": "on"}) as ha:
+        client = HomeAssistantClient(ha.url, ha.token)
+        rest = _time_calls(client)
+
+        push = HomeAssistantWebSocket(ha.websocket_url, ha.token)
+        push.watch({"light.a"})
+        push.start()
+        deadline = time.monotonic() + 5.0
+        while not push.is_live and time.monotonic() < deadline:
+            time.sleep(0.01)
+        client.use_websocket(push)
+        try:
+            websocket = _time_calls(client)
+        finally:
+            push.stop()
+
+        transports = {call[0] for call in ha.service_calls[-CALLS:]}
+        assert transports == {"websocket"}, transports
+
+    print(f"{CALLS} light.toggle calls each")
+    _report("REST", rest)
+    _report("WebSocket", websocket)
+
+
+if __name__ == "__main__":
+    main()
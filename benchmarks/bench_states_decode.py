@@ -0,0 +1,100 @@
+"""Peak memory and time to turn one /api/states body into the render map.
+
+    python benchmarks/bench_states_decode.py
+
+Compares decoding the whole body and filtering afterwards, which is what the
+poller used to do, against StatesDecoder fed in STATES_CHUNK_SIZE chunks. The
+body is synthetic but shaped like a real house: a few hundred entities, most of
+them sensors and automations the board never shows, at just under 200 KB.
+"""
+
+import json
+import random
+import statistics
+import time
+import tracemalloc
+
+from ha_launchpad.core.logic.led_manager import RENDERED_ATTRIBUTES
+from ha_launchpad.infrastructure.ha.client import STATES_CHUNK_SIZE
+from ha_launchpad.infrastructure.ha.states_decoder import StatesDecoder
+
+ENTITIES = 329
+WATCHED = 28
+RUNS = 200
+
+
+def _house(rng: random.Random) -> list[dict]:
+    domains = ["sensor"] * 6 + ["automation", "binary_sensor", "light", "switch"]
+    states = []
+    for i in range(ENTITIES):
+        domain = domains[i % len(domains)]
+        states.append(
+            {
+                "entity_id": f"{domain}.entity_{i}",
+                "state": rng.choice(["on", "off", "21.4", "unavailable"]),
+                "attributes": {
+                    "friendly_name": f"Entity number {i} in the living room",
+                    "brightness": rng.randrange(256),
+                    "supported_features": 44,
+                    "icon": "mdi:lightbulb",
+                    "device_class": "temperature",
+                    "unit_of_measurement": "°C",
+                    "state_class": "measurement",
+                    "effect_list": ["colorloop", "random", "none"],
+                    "supported_color_modes": ["color_temp", "xy"],
+                },
+                "last_changed": "2026-10-16T08:12:44.123456+00:00",
+                "last_reported": "2026-10-16T08:12:44.123456+00:00",
+                "last_updated": "2026-10-16T08:12:44.123456+00:00",
+                "context": {
+                    "id": f"01J{rng.getrandbits(100):026X}",
+                    "parent_id": None,
+                    "user_id": None,
+                },
+            }
+        )
+    return states
+
+
+def _whole(body: bytes, watched: frozenset[str]) -> dict:
+    return {s["entity_id"]: s for s in json.loads(body) if s["entity_id"] in watched}
+
+
+def _streamed(body: bytes, watched: frozenset[str]) -> dict:
+    decoder = StatesDecoder(watched, RENDERED_ATTRIBUTES)
+    for i in range(0, len(body), STATES_CHUNK_SIZE):
+        decoder.feed(body[i : i + STATES_CHUNK_SIZE])
+    return decoder.finish()
+
+
+def _measure(decode, body: bytes, watched: frozenset[str]) -> tuple[float, int]:
+    times = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        decode(body, watched)
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    decode(body, watched)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return statistics.median(times), peak
+
+
+def main() -> None:
+    rng = random.Random(1)
+    states = _house(rng)
+    body = json.dumps(states, separators=(",", ":"), ensure_ascii=False).encode()
+    watched = frozenset(s["entity_id"] for s in rng.sample(states, WATCHED))
+
+    assert set(_whole(body, watched)) == set(_streamed(body, watched))
+
+    print(f"{ENTITIES} entities, {WATCHED} watched, {len(body) / 1024:.0f} KB body")
+    print(f"{'':<10}{'median':>12}{'peak alloc':>14}")
+    for name, decode in (("whole", _whole), ("streamed", _streamed)):
+        median, peak = _measure(decode, body, watched)
+        print(f"{name:<10}{median * 1000:>10.2f}ms{peak / 1024:>11.0f} KB")
+
+
+if __name__ == "__main__":
+    main()
@@ -54,6 +54,12 @@ def main():
         print("Please press buttons on the Launchpad. Press Ctrl+C to exit.")
         print("-" * 50)
 
+        # Printed from rtmidi's own thread as each message arrives; this one
+        # only waits for Ctrl+C.
+        if backend.listen(lambda msg: print(f"Received: {msg}")):
+            while True:
+                time.sleep(3600)
+
         midi_in = backend.iter_incoming()
         if not midi_in:
             print("❌ MIDI input not available.")
@@ -67,9 +73,8 @@ def main():
     except KeyboardInterrupt:
         print("\nExiting...")
     finally:
-        # turn off
-        for note in ALL_PADS:
-            backend.send_note(note, "off")
+        # turn off, in one message
+        backend.send_frame([(note, 0, 0) for note in ALL_PADS])
         backend.close()
         print("Backend closed.")
 
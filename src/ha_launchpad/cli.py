@@ -9,8 +9,10 @@ from ha_launchpad.config.mapping import BUTTON_MAP
 from ha_launchpad.config.settings import (
     HA_CONNECT_MAX_DELAY,
     HA_CONNECT_RETRY_DELAY,
+    HA_PUSH,
     HA_TOKEN,
     HA_URL,
+    HA_WS_SERVICES,
     RELEASE_ID,
 )
 from ha_launchpad.core.controller import LaunchpadController
@@ -18,6 +20,10 @@ from ha_launchpad.infrastructure.ha.client import (
     HomeAssistantClient,
     HomeAssistantUnauthorized,
 )
+from ha_launchpad.infrastructure.ha.websocket import (
+    HomeAssistantWebSocket,
+    websocket_url,
+)
 from ha_launchpad.infrastructure.midi.mido_backend import MidoBackend
 from ha_launchpad.logging_config import configure_logging
 
@@ -105,8 +111,16 @@ def main() -> None:
         logger.info("Retrying in %.1fs...", delay)
         time.sleep(delay)
 
+    push = None
+    if HA_PUSH:
+        push = HomeAssistantWebSocket(
+            websocket_url(HA_URL), HA_TOKEN, store=ha_client.store
+        )
+        if HA_WS_SERVICES:
+            ha_client.use_websocket(push)
+
     backend = MidoBackend()
-    controller = LaunchpadController(ha_client, BUTTON_MAP, backend=backend)
+    controller = LaunchpadController(ha_client, BUTTON_MAP, backend=backend, push=push)
     controller.run()
 
 
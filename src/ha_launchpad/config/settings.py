@@ -25,7 +25,26 @@ LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", "5"))
 # Home Assistant
 HA_URL = os.getenv("HA_URL")
 HA_TOKEN = os.getenv("HA_TOKEN")
-POLL_INTERVAL = float(os.getenv("POLL_INTERVAL", "1.5"))
+# Polling is quickest, POLL_MIN_INTERVAL, for POLL_BOOST_DURATION seconds after
+# a press or a change, then stretches by POLL_GROWTH per quiet poll up to
+# POLL_MAX_INTERVAL. Each wait is jittered by up to POLL_JITTER of itself.
+# POLL_INTERVAL is the old name for the minimum, still honoured, and its old
+# default is the minimum's: even busy, the board polls no more than it used to.
+POLL_MIN_INTERVAL = float(
+    os.getenv("POLL_MIN_INTERVAL", os.getenv("POLL_INTERVAL", "1.5"))
+)
+POLL_MAX_INTERVAL = float(os.getenv("POLL_MAX_INTERVAL", "6.0"))
+POLL_BOOST_DURATION = float(os.getenv("POLL_BOOST_DURATION", "5.0"))
+POLL_GROWTH = float(os.getenv("POLL_GROWTH", "1.3"))
+POLL_JITTER = float(os.getenv("POLL_JITTER", "0.1"))
+# How polling fetches states. "template" asks /api/template to render only the
+# entities the board shows; "states" downloads /api/states whole. A refused
+# template request falls back to "states" on its own.
+HA_POLL_MODE = os.getenv("HA_POLL_MODE", "template")
+# How old a polled state may be and still be acted on by a press, in seconds.
+# Older than this, a media or volume press reads the entity afresh first.
+# Entities kept current by push are never too old.
+HA_STATE_MAX_AGE = float(os.getenv("HA_STATE_MAX_AGE", "3.0"))
 
 HA_CONNECT_RETRY_DELAY = float(os.getenv("HA_CONNECT_RETRY_DELAY", "3.0"))
 HA_CONNECT_MAX_DELAY = float(os.getenv("HA_CONNECT_MAX_DELAY", "30.0"))
@@ -33,9 +52,55 @@ HA_CONNECT_MAX_DELAY = float(os.getenv("HA_CONNECT_MAX_DELAY", "30.0"))
 # by the retry policy in the HA client, so there is no separate initial delay.
 HA_REQUEST_MAX_DELAY = float(os.getenv("HA_REQUEST_MAX_DELAY", "5.0"))
 
+# Circuit breaker for outages. After HA_BREAKER_FAILURES failed requests in a
+# row only `GET /api/` is tried, on a backoff from the probe interval up to the
+# maximum, until HA_BREAKER_SUCCESSES of those in a row have been answered.
+HA_BREAKER_FAILURES = int(os.getenv("HA_BREAKER_FAILURES", "3"))
+HA_BREAKER_SUCCESSES = int(os.getenv("HA_BREAKER_SUCCESSES", "2"))
+HA_BREAKER_PROBE_INTERVAL = float(os.getenv("HA_BREAKER_PROBE_INTERVAL", "2.0"))
+HA_BREAKER_MAX_PROBE_INTERVAL = float(
+    os.getenv("HA_BREAKER_MAX_PROBE_INTERVAL", "30.0")
+)
+
+# Service calls run on a small pool of workers, never on the MIDI loop. Calls
+# beyond HA_EXECUTOR_QUEUE waiting are dropped rather than queued up to replay
+# long after the press.
+HA_EXECUTOR_WORKERS = int(os.getenv("HA_EXECUTOR_WORKERS", "4"))
+HA_EXECUTOR_QUEUE = int(os.getenv("HA_EXECUTOR_QUEUE", "16"))
+# Seconds a batchable service call waits for identical calls on other entities
+# to join it in one request.
+HA_BATCH_WINDOW = float(os.getenv("HA_BATCH_WINDOW", "0.05"))
+
+# Home Assistant closes a keep-alive connection after 75 idle seconds, which
+# is aiohttp's default. A connection for presses idle for HA_KEEPALIVE_INTERVAL
+# is used for a cheap request before that happens. Waking the board opens
+# HA_PREWARM_CONNECTIONS of them up front.
+HA_KEEPALIVE_INTERVAL = float(os.getenv("HA_KEEPALIVE_INTERVAL", "60.0"))
+HA_PREWARM_CONNECTIONS = int(os.getenv("HA_PREWARM_CONNECTIONS", "2"))
+
+# How often to log a summary of request latency, size and status per endpoint,
+# in seconds. 0 turns the summary off; the numbers are still collected.
+HA_METRICS_LOG_INTERVAL = float(os.getenv("HA_METRICS_LOG_INTERVAL", "900"))
+
+# Push updates over the WebSocket API, with polling kept as the fallback. Set
+# HA_PUSH=0 to poll only.
+HA_PUSH = os.getenv("HA_PUSH", "1") != "0"
+# Reconnect backoff for the push connection. It doubles per failed attempt up
+# to the ceiling, and starts again from the bottom after every gap.
+HA_PUSH_RETRY_DELAY = float(os.getenv("HA_PUSH_RETRY_DELAY", "1.0"))
+HA_PUSH_MAX_DELAY = float(os.getenv("HA_PUSH_MAX_DELAY", "60.0"))
+# Make service calls over that same connection while it is up, rather than one
+# HTTP request each. Set HA_WS_SERVICES=0 to keep them on REST.
+HA_WS_SERVICES = os.getenv("HA_WS_SERVICES", "1") != "0"
+
 # Volume
 VOLUME_STEP = float(os.getenv("VOLUME_STEP", "0.07"))
 
+# How long a toggled pad shows its predicted colour while waiting for Home
+# Assistant to report the change. After that the reported state is shown,
+# whatever it is.
+OPTIMISTIC_TIMEOUT = float(os.getenv("LAUNCHPAD_OPTIMISTIC_TIMEOUT", "5.0"))
+
 # Launchpad Connection
 LAUNCHPAD_VENDOR = int(os.getenv("LAUNCHPAD_VENDOR", "0x1235"), 16)
 LAUNCHPAD_PRODUCT = int(os.getenv("LAUNCHPAD_PRODUCT", "0x0113"), 16)
@@ -44,6 +109,11 @@ LAUNCHPAD_IDENT = os.getenv("LAUNCHPAD_IDENT", "LPMiniMK3 MIDI")
 LAUNCHPAD_ALIVE_DELAY = float(os.getenv("LAUNCHPAD_ALIVE_DELAY", "3.0"))
 LAUNCHPAD_RETRY_DELAY = float(os.getenv("LAUNCHPAD_RETRY_DELAY", "5.0"))
 LAUNCHPAD_MAX_RETRY_DELAY = float(os.getenv("LAUNCHPAD_MAX_RETRY_DELAY", "10.0"))
+# Shortest gap between two writes to the board. A whole-board LED frame is
+# about 200 bytes of SysEx, some 270 on the wire once USB MIDI has packed it,
+# and a full-speed port moves 64 bytes a millisecond: a frame every 5 ms is
+# what the link carries without queueing. Writes made in between are merged.
+LAUNCHPAD_WRITE_INTERVAL = float(os.getenv("LAUNCHPAD_WRITE_INTERVAL", "0.005"))
 
 # Idle Mode
 IDLE_TIMEOUT = int(os.getenv("LAUNCHPAD_IDLE_TIMEOUT", "1800"))  # Default 30 minutes
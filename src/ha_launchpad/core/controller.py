@@ -1,11 +1,14 @@
 """Launchpad MIDI controller abstraction."""
 
 import logging
+import queue
 import signal
 import sys
 import threading
 import time
+from dataclasses import replace
 from pathlib import Path
+from typing import Any
 
 from ha_launchpad.config.mapping import (
     ALL_PADS,
@@ -15,20 +18,23 @@ from ha_launchpad.config.mapping import (
 from ha_launchpad.config.settings import (
     HEARTBEAT_FILE,
     HEARTBEAT_INTERVAL,
-    IDLE_POLL_INTERVAL,
     LAUNCHPAD_ALIVE_DELAY,
     LAUNCHPAD_MAX_RETRY_DELAY,
     LAUNCHPAD_RETRY_DELAY,
     LAUNCHPAD_ROTATION,
-    POLL_INTERVAL,
     RELEASE_ID,
 )
 from ha_launchpad.core.logic.feedback_manager import FeedbackManager
+from ha_launchpad.core.logic.framebuffer import FrameBuffer, Layer
 from ha_launchpad.core.logic.idle_manager import IdleManager
 from ha_launchpad.core.logic.input_handler import InputHandler
 
 # New Logic Components
-from ha_launchpad.core.logic.led_manager import UNAVAILABLE_COLOR, LEDManager
+from ha_launchpad.core.logic.led_manager import (
+    RENDERED_ATTRIBUTES,
+    LEDManager,
+)
+from ha_launchpad.core.logic.poll_scheduler import PollScheduler
 from ha_launchpad.features.color_lab import ColorLab
 from ha_launchpad.features.color_picker import ColorPicker
 from ha_launchpad.features.disco import DiscoMode
@@ -36,12 +42,26 @@ from ha_launchpad.infrastructure.ha.client import (
     HomeAssistantClient,
     HomeAssistantUnauthorized,
 )
+from ha_launchpad.infrastructure.ha.commands import Toggle
+from ha_launchpad.infrastructure.ha.executor import Completion, ServiceExecutor
+from ha_launchpad.infrastructure.ha.websocket import HomeAssistantWebSocket
 from ha_launchpad.infrastructure.midi.interface import MidiBackend
 from ha_launchpad.infrastructure.midi.mido_backend import MidoBackend
 from ha_launchpad.infrastructure.midi.rotated_backend import RotatedBackend
+from ha_launchpad.infrastructure.midi.writer import MidiWriter
 
 logger = logging.getLogger(__name__)
 
+# Put in the inbox to wake the MIDI loop, so it looks at self.running again.
+_WAKE = object()
+# How long the MIDI loop sleeps on an empty inbox before it looks at
+# self.running anyway. Everything that stops it also wakes it, so this only
+# bounds a stop that did not.
+INBOX_IDLE_TIMEOUT = 1.0
+# How often input is polled from a backend that cannot hand it over as it
+# arrives.
+MIDI_POLL_INTERVAL = 0.1
+
 
 class LaunchpadController:
     def __init__(
@@ -49,34 +69,77 @@ class LaunchpadController:
         ha_client: HomeAssistantClient,
         button_map: dict[int, str],
         backend: MidiBackend | None = None,
+        push: HomeAssistantWebSocket | None = None,
     ):
         if backend is None:
             backend = MidoBackend()
 
         # Wrap backend with rotation layer
         self.backend = RotatedBackend(backend, LAUNCHPAD_ROTATION)
+        # The only thing that writes to the board, from a thread of its own;
+        # see writer.py.
+        self.output = MidiWriter(self.backend)
+        # Everything that lights a pad paints a layer of this rather than the
+        # board itself; see framebuffer.py.
+        self.framebuffer = FrameBuffer(self.output)
+        self.output.on_error = self.framebuffer.write_failed
 
         self.ha_client = ha_client
         self.button_map = button_map
 
+        # Everything the MIDI loop has to handle, in the order it came in:
+        # messages from the board as rtmidi reads them, and the results of
+        # service calls. Presses never wait on Home Assistant; their calls run
+        # on the executor's workers, and come back here to be confirmed on the
+        # pads, since only the MIDI loop may drive the feedback.
+        self._inbox: queue.SimpleQueue[Any] = queue.SimpleQueue()
+        self.executor = ServiceExecutor(ha_client, self._inbox.put)
+
         # Features
         self.disco = DiscoMode(ha_client)
-        self.color_picker = ColorPicker(ha_client, self.backend)
-        self.color_lab = ColorLab(self.backend, LAUNCHPAD_ROTATION)
+        self.color_picker = ColorPicker(
+            self.executor, self.framebuffer.surface(Layer.PICKER)
+        )
+        self.color_lab = ColorLab(
+            self.framebuffer.surface(Layer.LAB), LAUNCHPAD_ROTATION
+        )
 
         # Core Logic Modules
-        self.led_manager = LEDManager(ha_client, self.backend, button_map, self.disco)
+        self.led_manager = LEDManager(
+            ha_client, self.framebuffer.surface(Layer.STATE), button_map, self.disco
+        )
         self.input_handler = InputHandler(
             ha_client, button_map, self.color_picker, self.disco
         )
-        self.feedback = FeedbackManager(self.backend)
-        self.idle_manager = IdleManager(self.backend)
+        self.feedback = FeedbackManager(self.framebuffer.surface(Layer.FEEDBACK))
+        self.idle_manager = IdleManager(self.framebuffer)
+        self.poll_scheduler = PollScheduler()
+
+        # Both transports fetch only what the board can show.
+        watched = self.led_manager.watched_entities()
+        ha_client.watch(watched, RENDERED_ATTRIBUTES)
+
+        # Push is an optimisation, never a requirement: whenever it is not
+        # live, update_led_states() polls exactly as it did without it.
+        self.push = push
+        if push is not None:
+            push.watch(watched)
+            push.on_change = self._on_push_change
+        # The poll thread, the MIDI loop and the push thread can all ask for a
+        # repaint, and the LED cache is not safe to diff from two at once.
+        self._render_lock = threading.RLock()
 
         self.running = False
         self._last_heartbeat = 0.0
         self._unavailable_presses: set[int] = set()
         self._press_times: dict[int, float] = {}
 
+    def stop(self):
+        """Ask run() to finish, from any thread or a signal handler."""
+        self.running = False
+        # SimpleQueue.put() is safe to call from a signal handler.
+        self._inbox.put(_WAKE)
+
     def _install_signal_handlers(self):
         """Request a graceful shutdown on SIGTERM/SIGINT.
 
@@ -87,7 +150,7 @@ class LaunchpadController:
 
         def _request_shutdown(signum, _frame):
             logger.info("Received %s - shutting down...", signal.Signals(signum).name)
-            self.running = False
+            self.stop()
 
         for sig in (signal.SIGTERM, signal.SIGINT):
             try:
@@ -110,24 +173,20 @@ class LaunchpadController:
             return True
         return False
 
-    def send_note(self, note: int, color: str, channel: int = 0):
-        """Send a MIDI note message to the backend"""
-        try:
-            self.backend.send_note(note=note, color=color, channel=channel)
-        except Exception:
-            logger.warning(
-                "Failed to send note via backend: note=%s color=%s", note, color
-            )
-
     def clear_all_leds(self, splash: bool = False):
         """Turn off all LEDs"""
-        if self.backend and self.backend.is_connected():
-            if splash:
+        if splash:
+            with self.framebuffer.batch():
                 for note in ALL_PADS:
-                    self.send_note(note=note, color="cyan_1")
-                time.sleep(0.3)
-            for note in ALL_PADS:
-                self.send_note(note=note, color="off")
+                    self.framebuffer.paint(Layer.FEEDBACK, note, "cyan_1")
+            time.sleep(0.3)
+        with self.framebuffer.batch():
+            self.framebuffer.clear_all()
+            # At startup nothing is known about what the board shows, and at
+            # shutdown it has to end up dark whatever anyone believed.
+            self.framebuffer.resync()
+        # The state layer went with the rest.
+        self.led_manager.invalidate_cache()
 
     def close_backend(self):
         """Close the MIDI backend"""
@@ -137,18 +196,17 @@ class LaunchpadController:
             except Exception:
                 pass
 
-    def update_led_states(self, force: bool = False):
-        """Delegate LED updates to LEDManager"""
-        # Checks
-        if self.color_picker.active:
-            return
-
-        # The colour lab has painted every pad on the board, most of them with
-        # colours no entity asked for. Repainting underneath it would erase the
-        # palette one pad at a time.
-        if self.color_lab.active:
-            return
-
+    def update_led_states(self, force: bool = False) -> bool:
+        """Delegate LED updates to LEDManager. True if any pad changed."""
+        # One write per pad that ends up looking different, however many
+        # times the render and the sleeping board touch it on the way.
+        with self._render_lock, self.framebuffer.batch():
+            return self._update_led_states(force)
+
+    def _update_led_states(self, force: bool) -> bool:
+        # The colour picker and the colour lab are layers over the entity
+        # state, so it goes on being rendered underneath them and is already
+        # up to date when they close.
         is_idle = self.idle_manager.is_idle
 
         # Update logic: If idle, we dry_run to check for changes without lighting up
@@ -158,9 +216,15 @@ class LaunchpadController:
         if force:
             self.led_manager.invalidate_cache()
 
+        # A live subscription already holds every watched state, so there is
+        # nothing to fetch. Otherwise fall back to polling.
+        state_map = None
+        if self.push is not None and self.push.is_live:
+            state_map = self.push.snapshot()
+
         # The bool is redundant now that the pads themselves are reported:
         # notification_pads carries both which and what colour.
-        changes, _ = self.led_manager.update_all(dry_run=dry_run)
+        changes, _ = self.led_manager.update_all(dry_run=dry_run, state_map=state_map)
 
         if is_idle:
             self.idle_manager.sync_notification_pads(self.led_manager.notification_pads)
@@ -181,6 +245,25 @@ class LaunchpadController:
                     self.idle_manager.show_standby_preview(previewable)
                 self.led_manager.commit(changes)
 
+        return bool(changes)
+
+    def _on_push_change(self, changed: set[str]):
+        """Repaint as soon as Home Assistant reports a watched entity moved.
+
+        Runs on the push thread. The poll thread keeps ticking regardless, for
+        the idle timer and the standby preview, but the board no longer waits
+        for it to see a change.
+        """
+        logger.debug("Push: %d entit(ies) changed", len(changed))
+        if not self.running:
+            return
+        try:
+            self.update_led_states()
+        except HomeAssistantUnauthorized:
+            # Only reachable through the polling fallback, and the poll thread
+            # owns that exit.
+            pass
+
     def _write_heartbeat(self):
         """Record that this release is alive and actually polling.
 
@@ -204,7 +287,12 @@ class LaunchpadController:
 
     def state_polling_thread(self):
         """Background thread to poll HA states and update LEDs"""
-        logger.info("Starting state polling (interval: %ss)", POLL_INTERVAL)
+        scheduler = self.poll_scheduler
+        logger.info(
+            "Starting state polling (interval: %ss-%ss)",
+            scheduler.min_interval,
+            scheduler.max_interval,
+        )
         while self.running:
             self._write_heartbeat()
             try:
@@ -213,21 +301,17 @@ class LaunchpadController:
                 # the only way back would be through a board showing nothing.
                 if not self.color_lab.active:
                     self.idle_manager.check_status()  # Check for idle timeout
-                self.update_led_states()
+                scheduler.record(self.update_led_states())
+                self.ha_client.keep_alive()
             except HomeAssistantUnauthorized as exc:
                 # Retrying cannot help, and hammering a rejected token risks
                 # tripping Home Assistant's IP ban. Exit and let the service
                 # manager restart us once the token has been fixed.
                 logger.error("%s", exc)
-                self.running = False
+                self.stop()
                 return
 
-            # Variable polling interval. While asleep this also decides how
-            # quickly a change elsewhere shows up as a standby preview.
-            if self.idle_manager.is_idle:
-                time.sleep(IDLE_POLL_INTERVAL)
-            else:
-                time.sleep(POLL_INTERVAL)
+            scheduler.wait(idle=self.idle_manager.is_idle)
 
     def handle_button_press(self, note: int):
         """Handle button press via InputHandler and execute Feedback"""
@@ -247,40 +331,101 @@ class LaunchpadController:
             from ha_launchpad.config.mapping import IDLE_MODE_BUTTON_ID
 
             if note == IDLE_MODE_BUTTON_ID:
-                self.idle_manager.wake_up()
-                # Restore LEDs immediately
-                self.update_led_states(force=True)
+                # A press is likely next, and after a long sleep the
+                # connections for it have been closed. Reopen them while the
+                # board repaints rather than on that press.
+                self.ha_client.prewarm()
+                self._wake_and_repaint()
             else:
-                # Glitch Fix: Explicitly turn off stray presses
-                self.backend.send_note(note, "off")
+                # Glitch Fix: put back what a stray press may have disturbed,
+                # which on a sleeping board is dark or a held notification.
+                self.framebuffer.resend([note])
             # Ignore other actions when idle
             return
 
         # 4. Register Activity (resets timer)
         self.idle_manager.register_activity()
+        self.poll_scheduler.activity()
 
         # 5. Handle Sleep Action
         if actions.get("sleep"):
             self.idle_manager.set_manual_sleep()
             return
 
-        # 6. Execute Feedback Actions
-        feedback_occurred = False
-
+        command = actions.get("command")
+        if command is not None:
+            # Light the outcome now rather than after the round trip. The
+            # prediction is settled by the state Home Assistant reports, or
+            # rolled back if the call fails.
+            if isinstance(command, Toggle) and command.note is not None:
+                with self._render_lock:
+                    if self.led_manager.paint_prediction(command.note):
+                        command = replace(command, predicted=True)
+            self.executor.submit(command)
+
+        # 6. Execute Feedback Actions. A pulse ends on its own, and the
+        #    state it covered is still underneath it, so it needs no render.
         if "pulse" in actions:
             p = actions["pulse"]
             self.feedback.pulse(
                 p["note"], p["color"], p["duration"], p.get("clear_note")
             )
-            feedback_occurred = True
 
-        if feedback_occurred:
-            # Force refresh of LEDs to overwrite the temporary feedback state
-            self.led_manager.invalidate_cache()
-
-        if actions.get("update_leds") or feedback_occurred:
+        if actions.get("update_leds"):
             self.update_led_states()
 
+    def _serve_inbox(self, timeout: float | None = None):
+        """Handle everything in the inbox, after waiting up to `timeout`
+        seconds for the first of it. None does not wait."""
+        try:
+            if timeout is None:
+                item = self._inbox.get_nowait()
+            else:
+                item = self._inbox.get(timeout=timeout)
+        except queue.Empty:
+            return
+        while True:
+            if isinstance(item, Completion):
+                self._handle_completion(item)
+            elif item is not _WAKE:
+                self.handle_midi_message(item)
+            try:
+                item = self._inbox.get_nowait()
+            except queue.Empty:
+                return
+
+    def _handle_completion(self, completion: Completion):
+        """Confirm a finished call on the pad that asked for it.
+
+        A failed call is not confirmed, and neither is one that finished after
+        the board moved on: a pulse on a sleeping board, or underneath the
+        colour lab or picker, would paint over what those are showing.
+
+        A predicted toggle is already showing its outcome, so it is never
+        pulsed. If it failed, the pad goes back to what it showed before.
+        """
+        command = completion.command
+        note = command.note
+        if note is None:
+            return
+
+        showing = not (
+            self.idle_manager.is_idle
+            or self.color_lab.active
+            or self.color_picker.active
+        )
+
+        if isinstance(command, Toggle) and command.predicted:
+            if not completion.ok:
+                with self._render_lock:
+                    self.led_manager.roll_back(note, dry_run=not showing)
+            return
+
+        if not completion.ok or not showing:
+            return
+
+        self.feedback.pulse(note, "yellow_3", 0.2)
+
     def _handle_note_on(self, note: int):
         """Handle MIDI note-on (button press)."""
         logger.debug("DEBUG: _handle_note_on received note: %s", note)
@@ -319,7 +464,7 @@ class LaunchpadController:
         if self.led_manager.is_unavailable(note):
             logger.debug("Pad %s is unavailable - ignoring press", note)
             self._unavailable_presses.add(note)
-            self.backend.send_note(note, "off")
+            self.feedback.hold(note, "off")
             return
 
         # record press time
@@ -351,9 +496,9 @@ class LaunchpadController:
 
         if note in self._unavailable_presses:
             self._unavailable_presses.discard(note)
-            # Put back exactly what the LED manager believes is there, so its
-            # cache stays truthful and no repaint is needed.
-            self.backend.send_note(note, UNAVAILABLE_COLOR)
+            # Uncovers whatever the state layer has for it, so no repaint is
+            # needed.
+            self.feedback.clear(note)
             return
 
         start = self._press_times.pop(note, None)
@@ -403,19 +548,28 @@ class LaunchpadController:
 
     def _toggle_color_lab(self):
         if self.color_lab.active:
+            # The board underneath has been kept current, so closing the lab
+            # only writes the pads that look different without it.
             self.color_lab.exit()
-            # The lab lit all 64 pads, including the ones no entity owns, so
-            # the LED manager has no way to put those back on its own.
-            self.led_manager.invalidate_cache()
-            self.clear_all_leds()
-            self.update_led_states(force=True)
             return
 
         # Opening from standby wakes the board first. Leaving it nominally
         # asleep would have the next poll paint a sleeping board over the
         # palette, and the wake button is one of the 64 swatches.
-        self.idle_manager.register_activity()
-        self.color_lab.enter()
+        with self.framebuffer.batch():
+            if self.idle_manager.is_idle:
+                # Asleep, the state layer is only rendered as far as the
+                # preview needs, so bring it up to date before it is covered.
+                self._wake_and_repaint()
+            self.idle_manager.register_activity()
+            self.color_lab.enter()
+
+    def _wake_and_repaint(self):
+        # The board goes straight from asleep to awake, without the stale
+        # state layer showing in between.
+        with self.framebuffer.batch():
+            self.idle_manager.wake_up()
+            self.update_led_states(force=True)
 
     def handle_midi_message(self, msg):
         """Process a single MIDI message."""
@@ -458,7 +612,42 @@ class LaunchpadController:
             if not connected:
                 logger.error("Launchpad USB device disconnected")
                 logger.info("Signaling shutdown...")
-                self.running = False
+                self.stop()
+
+    def _midi_loop(self):
+        """Handle presses and finished calls until asked to stop.
+
+        Polling the port meant a press waited up to a poll interval before it
+        was even seen. A backend that can hand messages over as they arrive
+        puts them in the inbox, alongside the completions, and this sleeps on
+        the inbox until there is something in it: a press is handled as soon
+        as rtmidi has read it, and an idle board wakes nothing.
+        """
+        port = None
+        if self.backend.listen(self._inbox.put):
+            logger.info("MIDI input: handled as it arrives")
+        else:
+            port = self.backend.iter_incoming()
+            if port is None or not hasattr(port, "iter_pending"):
+                logger.warning("MIDI input not available - buttons will not work")
+                port = None
+            else:
+                logger.info("MIDI input: polled every %ss", MIDI_POLL_INTERVAL)
+
+        while self.running:
+            try:
+                if port is None:
+                    self._serve_inbox(INBOX_IDLE_TIMEOUT)
+                    continue
+                for msg in port.iter_pending():
+                    self.handle_midi_message(msg)
+                self._serve_inbox(MIDI_POLL_INTERVAL)
+            except (OSError, ValueError):
+                break
+            except Exception as exc:
+                if self.running:
+                    logger.warning("MIDI error: %s", exc)
+                break
 
     def run(self):
         """Main run loop"""
@@ -502,9 +691,14 @@ class LaunchpadController:
             raise SystemExit(1)
 
         logger.info("Press Ctrl+C to exit")
+        self.output.start()
         self.clear_all_leds(splash=True)
         self.update_led_states()
 
+        if self.push is not None:
+            self.push.start()
+        self.executor.start()
+
         try:
             poll_thread = threading.Thread(
                 target=self.state_polling_thread, daemon=True
@@ -516,41 +710,33 @@ class LaunchpadController:
             )
             monitor_thread.start()
 
-            # MIDI Loop
-            midi_in = self.backend.iter_incoming()
-            if midi_in is None:
-                logger.warning("MIDI input not available - buttons will not work")
-                while self.running:
-                    time.sleep(1)
-            else:
-                while self.running:
-                    try:
-                        # Assuming mido port or object that has iter_pending
-                        # If backend returns mido port direclty:
-                        if hasattr(midi_in, "iter_pending"):
-                            for msg in midi_in.iter_pending():
-                                self.handle_midi_message(msg)
-                        else:
-                            # Fallback if specific backend returns iterator
-                            # Note: MidoBackend returns self.midi_in which is a mido Port
-                            pass
-
-                        time.sleep(0.1)
-                    except (OSError, ValueError):
-                        break
-                    except Exception as exc:
-                        if self.running:
-                            logger.warning("MIDI error: %s", exc)
-                        break
+            self._midi_loop()
 
         except KeyboardInterrupt:
             logger.info("Shutting down...")
         finally:
             self.running = False
+            self.poll_scheduler.stop()
+            self.executor.stop()
+            if self.push is not None:
+                self.push.stop()
             self.disco.stop()
             # Blanks the page buttons and the logo, which clear_all_leds does
             # not reach: it only knows about the 8x8.
             self.color_lab.exit()
             self.clear_all_leds()
+            # Sends the blackout before the port is let go of.
+            self.output.stop()
             self.close_backend()
+            logger.info(
+                "Board: %d pad writes, %d writes dropped as unchanged, output %s",
+                self.framebuffer.writes,
+                self.framebuffer.suppressed,
+                self.output.metrics(),
+            )
+            logger.info(
+                "HA calls: executor %s, connection pools %s",
+                self.executor.metrics(),
+                self.ha_client.pool_metrics(),
+            )
             logger.info("Cleanup complete. Goodbye!")
@@ -1,7 +1,7 @@
 import logging
-import time
+import threading
 
-from ha_launchpad.infrastructure.midi.interface import MidiBackend
+from ha_launchpad.core.logic.framebuffer import Surface
 
 logger = logging.getLogger(__name__)
 
@@ -12,8 +12,14 @@ PULSE_CHANNEL = 2
 
 
 class FeedbackManager:
-    def __init__(self, backend: MidiBackend):
+    def __init__(self, backend: Surface):
+        # The feedback layer, over everything else. Whatever a pulse covers is
+        # still there underneath when it ends.
         self.backend = backend
+        self._lock = threading.Lock()
+        # note -> the pulse showing on it, so that a pulse ending cannot take
+        # a later one on the same pad down with it.
+        self._pulses: dict[int, object] = {}
 
     def pulse(
         self,
@@ -26,13 +32,42 @@ class FeedbackManager:
 
         This used to have a `flash()` twin that claimed to do something
         different but sent the identical message on the identical channel.
+
+        Returns at once. Both pads go back to whatever they covered once
+        `duration` is up, from a timer: this runs on the MIDI loop, which used
+        to sleep through every pulse with the next press waiting behind it.
         """
-        self.backend.send_note(note, color, channel=PULSE_CHANNEL)
+        notes = (note,) if clear_note is None else (note, clear_note)
+        token = object()
+        with self._lock:
+            for pad in notes:
+                self._pulses[pad] = token
+
+        with self.backend.batch():
+            self.backend.send_note(note, color, channel=PULSE_CHANNEL)
+            if clear_note is not None:
+                self.backend.send_note(clear_note, "off")
 
-        if clear_note is not None:
-            self.backend.send_note(clear_note, "off")
+        timer = threading.Timer(duration, self._end_pulse, (notes, token))
+        timer.daemon = True
+        timer.start()
 
-        time.sleep(duration)
+    def hold(self, note: int, color: str):
+        """Show `color` on a pad until clear() is called for it."""
+        with self._lock:
+            self._pulses.pop(note, None)
+        self.backend.send_note(note, color)
 
     def clear(self, note: int):
-        self.backend.send_note(note, "off")
+        with self._lock:
+            self._pulses.pop(note, None)
+        self.backend.clear(note)
+
+    def _end_pulse(self, notes: tuple[int, ...], token: object):
+        with self._lock:
+            ending = [pad for pad in notes if self._pulses.get(pad) is token]
+            for pad in ending:
+                del self._pulses[pad]
+        with self.backend.batch():
+            for pad in ending:
+                self.backend.clear(pad)
@@ -0,0 +1,322 @@
+"""One picture of the board, built from layers and written only where it changes.
+
+Everything that lights a pad used to write straight to the Launchpad: the LED
+manager, the sleeping board's notifications and previews, the colour picker,
+the colour lab and the press feedback. None of them knew what the others had
+put there, so whichever wrote last won, and the only way back from an overlay
+was to throw the LED manager's cache away and repaint every pad from a fresh
+Home Assistant fetch. Closing the colour lab blanked all 64 pads and then
+painted them again.
+
+Each of them now paints a layer of its own. A pad shows the topmost layer that
+has anything on it, and the board is written only where that changes. The
+entity state stays underneath whatever covers it, and is kept current there,
+so taking an overlay away puts back exactly what it covered: one write per pad
+that looks different, and nothing fetched.
+
+What the board was last sent is kept for every pad and for the buttons around
+the grid, so a write that would not change anything is dropped wherever it
+comes from: a layer repainted with what it already held, "off" to a dark pad,
+the lab blanking a logo that is already blank.
+"""
+
+import logging
+import threading
+from array import array
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
+from enum import IntEnum
+
+from ha_launchpad.config.mapping import ALL_PADS, COLORS
+from ha_launchpad.infrastructure.midi.interface import MidiBackend
+
+logger = logging.getLogger(__name__)
+
+# A pad is held as one packed value: the palette velocity in the low 7 bits and
+# the MIDI channel above them, exactly what the note-on carries. One slot per
+# MIDI note, so any note a map can name has one.
+BOARD_SLOTS = 128
+# A pad nothing has been painted on, or that has to be painted again.
+UNPAINTED = 0xFFFF
+# Every slot UNPAINTED. A template to copy or slice-assign from, never to change.
+BLANK_BOARD = array("H", [UNPAINTED]) * BOARD_SLOTS
+
+# What a pad with nothing on any visible layer shows.
+_OFF = 0
+
+# Velocity -> colour name, to turn a packed pad back into what send_note()
+# takes. Every name in COLORS has a velocity of its own.
+_COLOR_NAMES = {velocity: name for name, velocity in COLORS.items()}
+
+
+def pack_color(color: str, channel: int) -> int:
+    """A colour as the board is held. An unknown name is sent as 0, so it is
+    packed as 0 too."""
+    return channel << 7 | COLORS.get(color, 0)
+
+
+def unpack_color(packed: int) -> tuple[str, int]:
+    return _COLOR_NAMES[packed & 0x7F], packed >> 7
+
+
+class Layer(IntEnum):
+    """From the bottom up. A pad shows the highest one holding a colour."""
+
+    # What Home Assistant reports, as the LED manager renders it.
+    STATE = 0
+    # Pads lit for a while on the sleeping board because their entity changed.
+    PREVIEW = 1
+    # Pads held lit through sleep because they need attention, and the wake
+    # button. Above the preview, so a preview expiring cannot darken one.
+    NOTIFICATION = 2
+    # The colour picker's source pad and palettes.
+    PICKER = 3
+    # The colour lab's swatches, over the whole grid.
+    LAB = 4
+    # A press being acknowledged, and the startup splash.
+    FEEDBACK = 5
+
+
+class FrameBuffer:
+    def __init__(self, backend: MidiBackend):
+        self.backend = backend
+        # The MIDI loop, the poll thread and the push thread all paint.
+        self._lock = threading.RLock()
+        # note -> packed colour, one dict per layer, indexed by Layer.
+        self._layers: tuple[dict[int, int], ...] = tuple({} for _ in Layer)
+        self._hidden: set[Layer] = set()
+        # What the board shows, by note, as far as is known.
+        self._shown = array("H", BLANK_BOARD)
+        # The same for the buttons around the grid, by control number.
+        self._shown_cc = array("H", BLANK_BOARD)
+        # Pads whose picture may have changed since they were last written.
+        self._pending: set[int] = set()
+        self._batch_depth = 0
+        # Pads written to the board, however many went in one message.
+        self.writes = 0
+        # Writes of pads and buttons dropped because the board already showed
+        # what they asked for.
+        self.suppressed = 0
+
+    def surface(self, layer: Layer) -> "Surface":
+        return Surface(self, layer)
+
+    def paint(self, layer: Layer, note: int, color: str, channel: int = 0) -> None:
+        self.paint_velocity(layer, note, COLORS.get(color, 0), channel)
+
+    def paint_velocity(
+        self, layer: Layer, note: int, velocity: int, channel: int = 0
+    ) -> None:
+        """Put a raw palette entry on one layer. "off" is a colour like any
+        other here: it covers the layers below, where clear() uncovers them."""
+        with self._lock:
+            self._layers[layer][note] = channel << 7 | velocity
+            self._pending.add(note)
+            self._flush()
+
+    def clear(self, layer: Layer, note: int) -> None:
+        with self._lock:
+            if self._layers[layer].pop(note, None) is not None:
+                self._pending.add(note)
+                self._flush()
+
+    def clear_layer(self, layer: Layer) -> None:
+        with self._lock:
+            self._pending.update(self._layers[layer])
+            self._layers[layer].clear()
+            self._flush()
+
+    def clear_all(self) -> None:
+        with self._lock:
+            for layer in Layer:
+                self._pending.update(self._layers[layer])
+                self._layers[layer].clear()
+            self._flush()
+
+    def hide(self, layer: Layer) -> None:
+        """Take a layer off the board, keeping what is painted on it."""
+        with self._lock:
+            if layer not in self._hidden:
+                self._hidden.add(layer)
+                self._pending.update(self._layers[layer])
+                self._flush()
+
+    def show(self, layer: Layer) -> None:
+        with self._lock:
+            if layer in self._hidden:
+                self._hidden.discard(layer)
+                self._pending.update(self._layers[layer])
+                self._flush()
+
+    def resend(self, notes: Iterable[int]) -> None:
+        """Write these pads whatever the board is believed to show.
+
+        For when the board may not show what it was last told: at startup, or
+        after the device lit a pad on its own.
+        """
+        with self._lock:
+            for note in notes:
+                self._shown[note] = UNPAINTED
+                self._pending.add(note)
+            self._flush()
+
+    def resync(self) -> None:
+        """Write the whole board again, as if nothing were known about it.
+
+        Every grid pad and every pad any layer holds, and the buttons around
+        the grid at what they were last sent. For a board that may have lost
+        what it was showing: freshly opened, or about to be let go of.
+        """
+        with self._lock:
+            notes = set(ALL_PADS)
+            for layer in self._layers:
+                notes.update(layer)
+            controls = [
+                (control, packed)
+                for control, packed in enumerate(self._shown_cc)
+                if packed != UNPAINTED
+            ]
+            self.resend(notes)
+            self._shown_cc[:] = BLANK_BOARD
+            for control, packed in controls:
+                self.send_cc(control, packed & 0x7F, packed >> 7)
+
+    def write_failed(self, notes: Iterable[int], controls: Iterable[int]) -> None:
+        """Forget what these pads and buttons show: a write to them failed.
+
+        For a backend that writes later, on a thread of its own, where the
+        failure cannot raise to _flush() or send_cc(). The pads are written
+        again with the next write; the buttons the next time they are lit.
+        """
+        with self._lock:
+            for note in notes:
+                self._shown[note] = UNPAINTED
+                self._pending.add(note)
+            for control in controls:
+                if 0 <= control < BOARD_SLOTS:
+                    self._shown_cc[control] = UNPAINTED
+
+    def send_cc(self, control: int, velocity: int, channel: int = 0) -> None:
+        """Light one of the buttons around the grid, unless it already is.
+
+        They are not layered: only the colour lab lights them.
+        """
+        if not 0 <= control < BOARD_SLOTS:
+            # Not a control the board has; the backend says so.
+            self.backend.send_cc(control, velocity, channel)
+            return
+        packed = channel << 7 | velocity
+        with self._lock:
+            if self._shown_cc[control] == packed:
+                self.suppressed += 1
+                return
+            # Unknown until the write has gone through.
+            self._shown_cc[control] = UNPAINTED
+            self.backend.send_cc(control, velocity, channel)
+            self._shown_cc[control] = packed
+
+    def composite(self, note: int) -> int:
+        """What the pad should show, packed."""
+        with self._lock:
+            for layer in reversed(Layer):
+                if layer in self._hidden:
+                    continue
+                packed = self._layers[layer].get(note)
+                if packed is not None:
+                    return packed
+            return _OFF
+
+    @contextmanager
+    def batch(self) -> Iterator[None]:
+        """Hold every write until the outermost batch ends.
+
+        A pad changed several times inside one is written once, with the
+        colour it ends up with, so repainting from scratch underneath an
+        overlay, or waking the board and rendering it, never shows the steps.
+        """
+        with self._lock:
+            self._batch_depth += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._batch_depth -= 1
+                self._flush()
+
+    def _flush(self) -> None:
+        if self._batch_depth or not self._pending:
+            return
+
+        pending = sorted(self._pending)
+        self._pending.clear()
+        changed = []
+        for note in pending:
+            packed = self.composite(note)
+            if self._shown[note] != packed:
+                changed.append((note, packed))
+        self.suppressed += len(pending) - len(changed)
+        if not changed:
+            return
+
+        try:
+            if len(changed) == 1:
+                # A note-on is three bytes, and the SysEx frame for one pad
+                # eleven.
+                self._send_one(*changed[0])
+            else:
+                self.backend.send_frame(
+                    [(note, packed & 0x7F, packed >> 7) for note, packed in changed]
+                )
+        except Exception:
+            # Not known to show anything now, so tried again with the next
+            # write.
+            logger.debug("Could not write %d pad(s)", len(changed), exc_info=True)
+            for note, _ in changed:
+                self._shown[note] = UNPAINTED
+                self._pending.add(note)
+            return
+
+        for note, packed in changed:
+            self._shown[note] = packed
+        self.writes += len(changed)
+
+    def _send_one(self, note: int, packed: int) -> None:
+        velocity, channel = packed & 0x7F, packed >> 7
+        name = _COLOR_NAMES.get(velocity)
+        if name is not None:
+            self.backend.send_note(note, name, channel)
+        else:
+            self.backend.send_velocity(note, velocity, channel)
+
+
+class Surface:
+    """One layer of a FrameBuffer, with the writing half of a MidiBackend.
+
+    Handed to whatever paints that layer, so it can go on calling send_note()
+    as it did when it owned the board.
+    """
+
+    def __init__(self, framebuffer: FrameBuffer, layer: Layer):
+        self.framebuffer = framebuffer
+        self.layer = layer
+
+    def send_note(self, note: int, color: str, channel: int = 0) -> None:
+        self.framebuffer.paint(self.layer, note, color, channel)
+
+    def send_velocity(self, note: int, velocity: int, channel: int = 0) -> None:
+        self.framebuffer.paint_velocity(self.layer, note, velocity, channel)
+
+    def send_cc(self, control: int, velocity: int, channel: int = 0) -> None:
+        self.framebuffer.send_cc(control, velocity, channel)
+
+    def clear(self, note: int) -> None:
+        self.framebuffer.clear(self.layer, note)
+
+    def clear_all(self) -> None:
+        self.framebuffer.clear_layer(self.layer)
+
+    def batch(self):
+        return self.framebuffer.batch()
+
+    def is_connected(self) -> bool:
+        return self.framebuffer.backend.is_connected()
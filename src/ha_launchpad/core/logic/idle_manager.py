@@ -2,9 +2,9 @@ import logging
 import time
 from collections.abc import Iterable
 
-from ha_launchpad.config.mapping import ALL_PADS, IDLE_MODE_BUTTON_ID
+from ha_launchpad.config.mapping import IDLE_MODE_BUTTON_ID
 from ha_launchpad.config.settings import IDLE_TIMEOUT, STANDBY_PREVIEW_DURATION
-from ha_launchpad.infrastructure.midi.interface import MidiBackend
+from ha_launchpad.core.logic.framebuffer import FrameBuffer, Layer
 
 logger = logging.getLogger(__name__)
 
@@ -12,10 +12,16 @@ logger = logging.getLogger(__name__)
 # entity needs attention.
 WAKE_BUTTON_COLOR = "white"
 
+# Everything the awake board paints. Hidden for sleep rather than cleared, so
+# waking puts back exactly what was there, an open colour picker included.
+AWAKE_LAYERS = (Layer.STATE, Layer.PICKER, Layer.LAB, Layer.FEEDBACK)
+
 
 class IdleManager:
-    def __init__(self, backend: MidiBackend):
-        self.backend = backend
+    def __init__(self, framebuffer: FrameBuffer):
+        # The board is put to sleep by hiding what it shows awake, and what
+        # the sleeping board shows goes on the layers in between.
+        self.framebuffer = framebuffer
         self._last_activity_time = time.time()
         self._is_idle = False
         self._manual_sleep = False
@@ -49,9 +55,6 @@ class IdleManager:
         summary light somewhere else. These pads survive the sleep blackout and
         ignore the standby preview timer; they go out when the problem does.
         """
-        if not self.backend.is_connected():
-            return
-
         wanted = {
             note: (color, channel)
             for note, color, channel in pads
@@ -59,17 +62,18 @@ class IdleManager:
             if note != IDLE_MODE_BUTTON_ID
         }
 
-        for note in self._notification_pads.keys() - wanted.keys():
-            self.backend.send_note(note, "off")
-            logger.info("Notification cleared on pad %d", note)
+        # The notification layer sits above the preview, so a preview running
+        # on the same pad neither hides the notification nor, when it expires,
+        # darkens it.
+        with self.framebuffer.batch():
+            for note in self._notification_pads.keys() - wanted.keys():
+                self.framebuffer.clear(Layer.NOTIFICATION, note)
+                logger.info("Notification cleared on pad %d", note)
 
-        for note, (color, channel) in wanted.items():
-            if self._notification_pads.get(note) != (color, channel):
-                self.backend.send_note(note, color, channel)
-                logger.info("Notification held on pad %d (%s)", note, color)
-            # A held pad outranks a preview: drop any pending expiry so the
-            # preview timer cannot switch it back off underneath us.
-            self._preview_deadlines.pop(note, None)
+            for note, (color, channel) in wanted.items():
+                if self._notification_pads.get(note) != (color, channel):
+                    self.framebuffer.paint(Layer.NOTIFICATION, note, color, channel)
+                    logger.info("Notification held on pad %d (%s)", note, color)
 
         self._notification_pads = wanted
 
@@ -89,24 +93,27 @@ class IdleManager:
 
         self._is_idle = True
 
-        # turn off all lights
-        self._forget_standby_preview()
-        # The blackout below darkens the notification pads too. Forgetting them
-        # here makes the next sync repaint them instead of believing they are
-        # already lit; the poll that enters sleep runs that sync immediately
-        # afterwards, so the gap is not visible.
-        self._forget_notification_pads()
-        self._clear_all_leds()
-        self._update_wake_button()
+        # Hiding the awake board darkens every pad it lit and nothing else:
+        # the entity state, and a colour picker or a press acknowledgement
+        # that would otherwise stay lit over a sleeping board. The poll that
+        # enters sleep syncs the notification pads straight afterwards.
+        with self.framebuffer.batch():
+            for layer in AWAKE_LAYERS:
+                self.framebuffer.hide(layer)
+            self._update_wake_button()
 
     def wake_up(self):
         logger.info("Waking up from Sleep Mode")
         self._is_idle = False
         self._manual_sleep = False
-        # The caller repaints the whole board from scratch, so the preview and
-        # notification bookkeeping is no longer meaningful.
-        self._forget_standby_preview()
-        self._forget_notification_pads()
+        # Whatever the sleeping board showed comes off, and the awake board
+        # comes back. Done as one write of every pad that changes, together
+        # with the caller's repaint if it batches the two.
+        with self.framebuffer.batch():
+            self._forget_standby_preview()
+            self._forget_notification_pads()
+            for layer in AWAKE_LAYERS:
+                self.framebuffer.show(layer)
         # Restart the clock. Without this the next check_status() still sees
         # the pre-sleep timestamp, decides the timeout has long since elapsed,
         # and puts the board straight back to sleep.
@@ -121,22 +128,16 @@ class IdleManager:
         board, but it is not a reason to wake the whole thing up. The pads
         light for STANDBY_PREVIEW_DURATION and then go dark again.
         """
-        if not self.backend.is_connected():
-            return
-
         deadline = time.time() + STANDBY_PREVIEW_DURATION
         shown = 0
-        for note, color, channel in changes:
-            # The wake button owns its own colour while asleep.
-            if note == IDLE_MODE_BUTTON_ID:
-                continue
-            # Already held lit as a notification, and it must not inherit an
-            # expiry that would darken it two minutes later.
-            if note in self._notification_pads:
-                continue
-            self.backend.send_note(note, color, channel)
-            self._preview_deadlines[note] = deadline
-            shown += 1
+        with self.framebuffer.batch():
+            for note, color, channel in changes:
+                # The wake button owns its own colour while asleep.
+                if note == IDLE_MODE_BUTTON_ID:
+                    continue
+                self.framebuffer.paint(Layer.PREVIEW, note, color, channel)
+                self._preview_deadlines[note] = deadline
+                shown += 1
 
         if shown:
             logger.info(
@@ -152,33 +153,22 @@ class IdleManager:
 
         now = time.time()
         expired = [note for note, due in self._preview_deadlines.items() if now >= due]
-        for note in expired:
-            # A pad that became a notification while its preview was running
-            # stays lit; only the timer is dropped.
-            if note not in self._notification_pads:
-                self.backend.send_note(note, "off")
-            del self._preview_deadlines[note]
+        with self.framebuffer.batch():
+            for note in expired:
+                self.framebuffer.clear(Layer.PREVIEW, note)
+                del self._preview_deadlines[note]
 
         if expired:
             logger.debug("Standby preview expired for %d pad(s)", len(expired))
 
     def _forget_standby_preview(self) -> None:
         self._preview_deadlines.clear()
+        self.framebuffer.clear_layer(Layer.PREVIEW)
 
     def _forget_notification_pads(self) -> None:
-        """Drop the bookkeeping without touching the board.
-
-        Called around the blackout and the wake-up repaint, both of which
-        repaint every pad themselves. Sending "off" here would fight them.
-        """
+        # The wake button goes with them: it is on the same layer.
         self._notification_pads.clear()
-
-    def _clear_all_leds(self):
-        # Clear main grid
-        if self.backend and self.backend.is_connected():
-            for note in ALL_PADS:
-                if note != IDLE_MODE_BUTTON_ID:
-                    self.backend.send_note(note, "off")
+        self.framebuffer.clear_layer(Layer.NOTIFICATION)
 
     def _update_wake_button(self):
         """Paint the wake button.
@@ -188,7 +178,6 @@ class IdleManager:
         told you that something was wrong without telling you what. The pads
         themselves now carry that, so this is just the way back in.
         """
-        if not self.backend.is_connected():
-            return
-
-        self.backend.send_note(IDLE_MODE_BUTTON_ID, WAKE_BUTTON_COLOR)
+        self.framebuffer.paint(
+            Layer.NOTIFICATION, IDLE_MODE_BUTTON_ID, WAKE_BUTTON_COLOR
+        )
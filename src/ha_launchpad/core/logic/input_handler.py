@@ -7,9 +7,11 @@ from ha_launchpad.config.mapping import (
     RESTART_CHORD,
     RESTART_CHORD_TIMEOUT,
 )
+from ha_launchpad.config.settings import VOLUME_STEP
 from ha_launchpad.features.color_picker import ColorPicker
 from ha_launchpad.features.disco import DiscoMode
 from ha_launchpad.infrastructure.ha.client import HomeAssistantClient
+from ha_launchpad.infrastructure.ha.commands import AdjustVolume, Toggle
 
 logger = logging.getLogger(__name__)
 
@@ -34,6 +36,9 @@ class InputHandler:
         """
         Handle a button press.
         Returns a dict of actions for the controller to perform.
+
+        Nothing here waits on Home Assistant. A call the press asks for comes
+        back as a "command" action for the controller to hand to its executor.
         """
 
         # 1. Color Picker Delegation
@@ -77,12 +82,10 @@ class InputHandler:
             return {"update_leds": True}
 
         if entity_id.startswith("volume_up."):
-            self.ha_client.volume_up(entity_id.split(".", 1)[1])
-            return {}
+            return {"command": AdjustVolume(entity_id.split(".", 1)[1], VOLUME_STEP)}
 
         if entity_id.startswith("volume_down."):
-            self.ha_client.volume_down(entity_id.split(".", 1)[1])
-            return {}
+            return {"command": AdjustVolume(entity_id.split(".", 1)[1], -VOLUME_STEP)}
 
         if entity_id.startswith("plant."):
             return {}
@@ -125,14 +128,9 @@ class InputHandler:
     def _handle_toggle(self, note: int, entity_id: str):
         logger.info("Button %s pressed -> toggle %s", note, entity_id)
 
-        success = self.ha_client.toggle_entity(entity_id)
-        if success:
-            # Brief confirmation on the pad that was pressed.
-            return {
-                "update_leds": True,
-                "pulse": {"note": note, "color": "yellow_3", "duration": 0.2},
-            }
-        return {}
+        # Confirmed on the pad once Home Assistant has accepted it; see
+        # LaunchpadController._handle_completion.
+        return {"command": Toggle(entity_id, note=note)}
 
     def handle_note_off(self, note: int):
         # Clean up selection logic
@@ -1,41 +1,64 @@
 import logging
-import random
+import time
+from array import array
+from collections.abc import Iterable
 from typing import Any
 
-from ha_launchpad.config.mapping import PAD_AVAILABILITY
-from ha_launchpad.config.settings import DISCO_LIGHTS
+from ha_launchpad.config.mapping import COLORS, PAD_AVAILABILITY
+from ha_launchpad.config.settings import DISCO_LIGHTS, OPTIMISTIC_TIMEOUT
+from ha_launchpad.core.logic.framebuffer import (
+    BLANK_BOARD,
+    UNPAINTED,
+    Surface,
+    pack_color,
+    unpack_color,
+)
+from ha_launchpad.core.logic.pad_plans import (
+    UNAVAILABLE_COLOR,
+    DiscoPlan,
+    PadPlan,
+    compile_plans,
+)
 from ha_launchpad.features.disco import DiscoMode
 from ha_launchpad.infrastructure.ha.client import (
+    UNCHANGED,
     HomeAssistantClient,
-    media_player_is_actionable,
 )
-from ha_launchpad.infrastructure.midi.interface import MidiBackend
 
 logger = logging.getLogger(__name__)
 
-# Home Assistant states meaning "this device cannot be reached right now", as
-# opposed to "it is switched off". Wi-Fi bulbs killed at a wall switch report
-# `unavailable`, and rendering that as plain off hides the difference.
-UNAVAILABLE_STATES = frozenset({"unavailable", "unknown"})
-# A device that is merely switched off. Most of the board sits at this colour
-# most of the time, which is why it was worth choosing on the hardware: the
-# velocity it replaced read as slate blue on screen and as a dull smudge in the
-# room.
-OFF_COLOR = "gray_3"
+# Every attribute rendering reads, media_player_is_actionable() included. A
+# transport that can filter need fetch nothing else.
+RENDERED_ATTRIBUTES = frozenset(
+    {
+        "brightness",
+        "media_content_id",
+        "media_title",
+        "problem",
+        "supported_features",
+        "volume_level",
+    }
+)
+
+
+class _Provisional:
+    """A pad showing the colour a press is expected to produce."""
 
-# An unreachable device is a passive fact, so its pad has to sit *below* the
-# switched-off colour in brightness. A mid white here made offline bulbs the
-# loudest thing on the board. This brown-mauve is dimmer than OFF_COLOR and,
-# unlike the grey it replaced, is not another shade of the same thing: off and
-# unreachable now differ in hue as well as brightness.
-UNAVAILABLE_COLOR = "taupe"
+    def __init__(self, state_before: str, previous: int, deadline: float):
+        # The entity's state when pressed. Any other state reported means
+        # Home Assistant has answered, one way or the other.
+        self.state_before = state_before
+        # What the pad showed before, packed, to roll back to. UNPAINTED if
+        # nothing was.
+        self.previous = previous
+        self.deadline = deadline
 
 
 class LEDManager:
     def __init__(
         self,
         ha_client: HomeAssistantClient,
-        backend: MidiBackend,
+        backend: Surface,
         button_map: dict[int, str],
         disco_mode: DiscoMode,
     ):
@@ -43,18 +66,78 @@ class LEDManager:
         self.backend = backend
         self.button_map = button_map
         self.disco = disco_mode
-        self._unknown_entities: set[str] = set()
         self._missing_entities: set[str] = set()
-        self._last_state: dict[int, str] = {}
+        # Every pad's plan, in map order; see pad_plans.py. A malformed map
+        # fails here, at startup.
+        self._plans = compile_plans(
+            button_map,
+            PAD_AVAILABILITY,
+            disco_mode,
+            DISCO_LIGHTS,
+            self._missing_entities,
+        )
+        # The state layer as last painted, by note, and a second board the next
+        # render is built on. The two swap once a render is painted, so a
+        # render allocates nothing for its result.
+        self._painted = array("H", BLANK_BOARD)
+        self._next = array("H", BLANK_BOARD)
         self._warned_no_states = False
-        # Pads reporting a problem, as (note, colour, channel). Kept even on a
-        # dry run so the sleeping board can hold them lit.
-        self._notification_pads: list[tuple[int, str, int]] = []
+        # Pads reporting a problem, as note -> (note, colour, channel). Kept
+        # even on a dry run so the sleeping board can hold them lit.
+        self._notification_pads: dict[int, tuple[int, str, int]] = {}
         # Pads whose entity could not be reached at the last poll. Pressing one
         # cannot achieve anything, so the controller refuses to act on it.
         self._unavailable_notes: set[int] = set()
+        # The states the board was last rendered from. None until the first
+        # render and after invalidate_cache(), when the next one must run.
+        self._last_map: dict[str, Any] | None = None
+        # Renders skipped because the states were the same as last time.
+        self.skipped_renders = 0
+        # The states most recently rendered from, dry runs included: what a
+        # prediction is made from.
+        self._seen_map: dict[str, Any] = {}
+        # Pads painted ahead of Home Assistant, by note.
+        self._provisional: dict[int, _Provisional] = {}
+        # Which pads each entity's state can recolour; see _pads_to_render().
+        self._pads_by_entity = self._dependency_index()
+        # The disco pad, which picks a new colour on every render while disco
+        # runs.
+        self._disco_notes = frozenset(
+            note for note, plan in self._plans.items() if isinstance(plan, DiscoPlan)
+        )
+        # Pads to render next time whatever their entities did.
+        self._dirty_notes: set[int] = set()
+        # Whether disco was running at the last render. Starting or stopping
+        # it recolours pads without any state changing.
+        self._rendered_disco = False
+        # Renders that only looked at the pads whose states changed.
+        self.partial_renders = 0
+
+    def _dependency_index(self) -> dict[str, frozenset[int]]:
+        """Entity id -> every pad whose colour depends on its state.
+
+        The mapped entity itself, the player behind a volume pad, and the
+        PAD_AVAILABILITY gate, if the pad has one. "disco_toggle" and
+        "manual_sleep" are not entities at all and depend on nothing.
+        """
+        index: dict[str, set[int]] = {}
+        for note, plan in self._plans.items():
+            for entity_id in plan.depends_on:
+                index.setdefault(entity_id, set()).add(note)
+        return {entity_id: frozenset(notes) for entity_id, notes in index.items()}
+
+    def watched_entities(self) -> frozenset[str]:
+        """Every entity whose state can change the colour of a pad.
+
+        The mapped entities themselves, the players behind the volume pads,
+        and the PAD_AVAILABILITY gates. A transport that fetches only these
+        is fetching everything rendering can ever look at.
+        """
+        return frozenset(self._pads_by_entity)
 
-    def update_all(self, dry_run: bool = False) -> tuple[list, bool]:
+    def update_all(
+        self, dry_run: bool = False, state_map: dict[str, Any] | None = None
+    ) -> tuple[list, bool]:
         """
         Update all mapped LEDs based on HA states.
 
@@ -63,37 +146,88 @@ class LEDManager:
 
         With dry_run the changes are reported but nothing is sent and nothing
         is recorded, leaving the caller free to decide what to display.
+
+        `state_map` is the push transport's snapshot, by entity id. Without
+        one the watched states are polled from Home Assistant.
+
+        States identical to the ones the board was last brought in line with
+        are not rendered again, since nothing can have changed. A dry run
+        that found changes has not brought the board in line with anything,
+        so it does not count.
+
+        Otherwise, once the board is in line with a set of states, only the
+        pads depending on an entity that has changed since are rendered. A
+        full pass is made after invalidate_cache(), and so on every forced
+        repaint.
         """
         changes = []
-        has_notifications = False
-        notification_pads = []
-        current_state = {}
-
-        # Fetch all states in one call
-        all_states = self.ha_client.get_all_states()
-        if not all_states:
-            # The fetch failed. Leave the board showing the last known state
-            # rather than repainting every pad as "unknown" over a blip. Report
-            # once per outage, not once per poll.
-            if not self._warned_no_states:
-                logger.warning(
-                    "No states returned from Home Assistant - LEDs left as-is"
-                )
-                self._warned_no_states = True
-            return [], False
+
+        if state_map is None:
+            # Fetch every watched state in one call
+            state_map = self.ha_client.get_state_map(
+                if_changed=self._last_map is not None
+            )
+            if state_map is None:
+                # The fetch failed. Leave the board showing the last known
+                # state rather than repainting every pad as "unknown" over a
+                # blip. Report once per outage, not once per poll.
+                if not self._warned_no_states:
+                    logger.warning(
+                        "No states returned from Home Assistant - LEDs left as-is"
+                    )
+                    self._warned_no_states = True
+                return [], False
 
         self._warned_no_states = False
-        state_map = {s["entity_id"]: s for s in all_states}
 
-        for note, entity_id in self.button_map.items():
-            if self.disco.active and entity_id in DISCO_LIGHTS:
+        if state_map is UNCHANGED:
+            state_map = self._last_map
+        # The disco pad picks a new colour on every render, and a provisional
+        # pad can time out with nothing having changed, so those have to run.
+        # So does the first render after disco stops, which hands its lights
+        # back.
+        if (
+            state_map == self._last_map
+            and not self.disco.active
+            and not self._rendered_disco
+            and not self._provisional
+            and not self._dirty_notes
+        ):
+            self.skipped_renders += 1
+            return [], bool(self._notification_pads)
+        self._seen_map = state_map
+        now = time.monotonic()
+
+        dirty = self._pads_to_render(state_map)
+        if dirty is None:
+            plans: Iterable[PadPlan] = self._plans.values()
+            notification_pads = {}
+            current = self._next
+            current[:] = BLANK_BOARD
+        else:
+            self.partial_renders += 1
+            # Still in button_map order, so changes come out the same either
+            # way.
+            plans = [plan for note, plan in self._plans.items() if note in dirty]
+            notification_pads = {
+                n: pad for n, pad in self._notification_pads.items() if n not in dirty
+            }
+            current = self._next
+            current[:] = self._painted
+        self._dirty_notes = set()
+        self._rendered_disco = self.disco.active
+
+        disco_active = self.disco.active
+        for plan in plans:
+            if disco_active and plan.disco_light:
                 continue
+            note = plan.note
 
-            color, channel = self._determine_color(entity_id, state_map)
+            color, channel = plan.color(state_map)
 
             # A pad can be pointed at a perfectly healthy entity and still be
             # useless, if the thing behind it is not there.
-            if not self._dependency_is_up(note, state_map):
+            if plan.gate is not None and not self._gate_is_up(plan.gate, state_map):
                 color, channel = UNAVAILABLE_COLOR, 0
 
             # Track reachability regardless of dry_run: this is what Home
@@ -104,19 +238,29 @@ class LEDManager:
                 self._unavailable_notes.discard(note)
 
             # Check for notification condition (Plant problem = red pulse/color)
-            if channel == 2 and "plant." in entity_id:
-                # Plant problem is reported on the pulsing channel
-                has_notifications = True
-                # Recorded per pad, not just as a flag: a sleeping board keeps
-                # these lit, so it needs to know which ones and in what colour.
-                notification_pads.append((note, color, channel))
-
-            # Create a simple representation of state: "color:channel"
-            state_key = f"{color}:{channel}"
-            current_state[note] = state_key
+            if channel == 2 and plan.notifies:
+                # Plant problem is reported on the pulsing channel. Recorded
+                # per pad, not just as a flag: a sleeping board keeps these
+                # lit, so it needs to know which ones and in what colour.
+                notification_pads[note] = (note, color, channel)
+
+            # pack_color(), inlined: this runs for every pad on every render.
+            packed = channel << 7 | COLORS.get(color, 0)
+
+            # Until Home Assistant reports the toggle, keep the prediction
+            # rather than flicking the pad back to the state it was pressed
+            # in. A different state, or running out of time, settles it.
+            provisional = self._provisional.get(note)
+            if provisional is not None:
+                reported = (state_map.get(plan.entity_id) or {}).get("state")
+                if reported == provisional.state_before and now < provisional.deadline:
+                    continue
+                del self._provisional[note]
+
+            current[note] = packed
 
             # Check if changed
-            if self._last_state.get(note) != state_key:
+            if self._painted[note] != packed:
                 changes.append((note, color, channel))
                 if not dry_run:
                     self.backend.send_note(note, color, channel)
@@ -125,10 +269,33 @@ class LEDManager:
         # A dry run reports what changed without emitting, so recording it here
         # would leave the cache claiming pads are lit that were never painted.
         if not dry_run:
-            self._last_state = current_state
+            self._painted, self._next = current, self._painted
+        self._last_map = state_map if not dry_run or not changes else None
 
         self._notification_pads = notification_pads
-        return changes, has_notifications
+        return changes, bool(notification_pads)
+
+    def _pads_to_render(self, state_map: dict[str, Any]) -> set[int] | None:
+        """The pads this render has to look at, or None for every pad.
+
+        Every pad when there is nothing to compare against, or when disco has
+        started or stopped since. Otherwise the pads depending on an entity
+        whose state differs from the last render, those marked dirty, the
+        provisional ones, which can time out with nothing having changed,
+        and the disco pad while disco runs.
+        """
+        last_map = self._last_map
+        if last_map is None or self.disco.active != self._rendered_disco:
+            return None
+
+        dirty = set(self._dirty_notes)
+        dirty.update(self._provisional)
+        for entity_id, notes in self._pads_by_entity.items():
+            if state_map.get(entity_id) != last_map.get(entity_id):
+                dirty.update(notes)
+        if self.disco.active:
+            dirty.update(self._disco_notes)
+        return dirty
 
     @property
     def notification_pads(self) -> list[tuple[int, str, int]]:
@@ -137,18 +304,14 @@ class LEDManager:
         Populated on every update_all, dry run included, because the sleeping
         board relies on it precisely when nothing is being painted normally.
         """
-        return list(self._notification_pads)
+        return list(self._notification_pads.values())
 
-    def _dependency_is_up(self, note: int, state_map: dict[str, Any]) -> bool:
-        """Whether the thing this pad quietly depends on is actually there.
+    def _gate_is_up(self, gate: str, state_map: dict[str, Any]) -> bool:
+        """Whether the thing a pad quietly depends on is actually there.
 
         See PAD_AVAILABILITY. A pad pointing at a script always looks live,
         because a script exists whether or not the thing it drives is there.
         """
-        gate = PAD_AVAILABILITY.get(note)
-        if gate is None:
-            return True
-
         state_data = state_map.get(gate)
         if not state_data:
             if gate not in self._missing_entities:
@@ -169,105 +332,72 @@ class LEDManager:
         the board -- the standby preview, which paints a sleeping board itself.
         """
         for note, color, channel in changes:
-            self._last_state[note] = f"{color}:{channel}"
+            self._painted[note] = pack_color(color, channel)
+        # The board no longer matches any one set of states.
+        self._last_map = None
+
+    def paint_prediction(self, note: int) -> bool:
+        """Paint the colour a toggle of this pad is expected to produce.
+
+        Lights and switches flip between on and off, and a player that is
+        playing pauses or one with something loaded plays. Anything less
+        certain -- a TV powering on, a scene, a script -- is not predicted.
+        Returns whether the pad was painted. The prediction stands until Home
+        Assistant reports the entity in a new state, the call fails (see
+        roll_back), or OPTIMISTIC_TIMEOUT passes.
+        """
+        if note in self._provisional:
+            # Pressed again before the first press was answered. The outcome
+            # of two toggles in flight is anybody's guess.
+            self.roll_back(note)
+            return False
+
+        predicted = self._predict(note)
+        if predicted is None:
+            return False
+        state_data = self._seen_map[self._plans[note].entity_id]
+
+        color, channel = predicted
+        self._provisional[note] = _Provisional(
+            state_data["state"],
+            self._painted[note],
+            time.monotonic() + OPTIMISTIC_TIMEOUT,
+        )
+        self.backend.send_note(note, color, channel)
+        self._painted[note] = pack_color(color, channel)
+        return True
+
+    def is_provisional(self, note: int) -> bool:
+        return note in self._provisional
+
+    def roll_back(self, note: int, dry_run: bool = False) -> None:
+        """Put back what the pad showed before its prediction.
+
+        With dry_run, or nothing known to put back, the pad is left for the
+        next render instead.
+        """
+        provisional = self._provisional.pop(note, None)
+        if provisional is None:
+            return
+
+        if dry_run or provisional.previous == UNPAINTED:
+            self._painted[note] = UNPAINTED
+            self._last_map = None
+            return
+
+        color, channel = unpack_color(provisional.previous)
+        self.backend.send_note(note, color, channel)
+        self._painted[note] = provisional.previous
+        # What it showed may not be what its state looks like by now.
+        self._dirty_notes.add(note)
+
+    def _predict(self, note: int) -> tuple[str, int] | None:
+        plan = self._plans.get(note)
+        if plan is None or (plan.disco_light and self.disco.active):
+            return None
+        return plan.predicted_color(self._seen_map)
 
     def invalidate_cache(self):
         """Force next update to resend all states."""
-        self._last_state = {}
-
-    def _determine_color(self, entity_id: str, state_map: dict[str, Any]):
-        """Determine the color and channel for a given entity."""
-        # Special cases
-        if entity_id == "disco_toggle":
-            if self.disco.active:
-                colors = ["orange_1", "green_1", "cyan_1", "pink_2", "yellow_1"]
-                return random.choice(colors), 2
-            return "orange_1", 0
-
-        # Manual Sleep Button (always orange_3 when active)
-        if entity_id == "manual_sleep":
-            return "lightblue_0", 0
-
-        if entity_id.startswith(("volume_up.", "volume_down.")):
-            return self._get_volume_button_color(entity_id, state_map)
-
-        # Standard entities
-        state_data = state_map.get(entity_id)
-        if not state_data:
-            # Home Assistant has no such entity: a typo in the map, or
-            # something not created yet. Either way the pad cannot control
-            # anything, which is the same situation as an unreachable device --
-            # so render it that way and let the controller keep it inert,
-            # rather than lighting a red pad that fires calls into the void.
-            if entity_id not in self._missing_entities:
-                logger.warning("Entity does not exist in Home Assistant: %s", entity_id)
-                self._missing_entities.add(entity_id)
-            return UNAVAILABLE_COLOR, 0
-
-        self._missing_entities.discard(entity_id)
-        state = state_data.get("state", "unknown")
-        domain = entity_id.split(".")[0]
-
-        # Offline is not the same as off, and should not look like it.
-        if state in UNAVAILABLE_STATES:
-            return UNAVAILABLE_COLOR, 0
-
-        if domain in ["light", "switch"]:
-            if state == "on":
-                if domain == "light" and "attributes" in state_data:
-                    return self._get_dimmed_color(state_data["attributes"]), 0
-                return "green_1", 0
-            return OFF_COLOR, 0
-
-        if domain == "scene":
-            return "blue_1", 0
-
-        if domain == "script":
-            # Chosen on the hardware for pad 58, which is the only script on
-            # the board. A script has no state worth showing -- it is a button,
-            # not a thing that is on or off -- so this colour never changes.
-            return "sage", 0
-
-        if domain == "media_player":
-            if state == "playing":
-                return "cyan_0", 2
-            # An idle speaker with an empty queue cannot be played or paused,
-            # so it belongs with the unreachable pads rather than looking
-            # exactly like one that is merely paused.
-            if not media_player_is_actionable(entity_id, state_data):
-                return UNAVAILABLE_COLOR, 0
-            return OFF_COLOR, 0
-
-        if domain == "plant":
-            problem = state_data.get("attributes", {}).get("problem", "unknown")
-            if problem == "none":
-                return "green_3", 0
-            return "red_2", 2
-
-        # Unknown domain
-        self._unknown_entities.add(entity_id)
-        return "red_2", 0
-
-    def _get_volume_button_color(self, entity_id: str, state_map: dict[str, Any]):
-        """Colour a volume pad after the player it controls."""
-        target = entity_id.split(".", 1)[1]
-        state_data = state_map.get(target)
-
-        if not state_data or state_data.get("state") in UNAVAILABLE_STATES:
-            return UNAVAILABLE_COLOR, 0
-
-        # The pad can only do something if the player reports a level to
-        # adjust. A TV that is off has no volume_level, so the service call
-        # would just fail -- show that rather than a lit, dead pad.
-        if state_data.get("attributes", {}).get("volume_level") is None:
-            return UNAVAILABLE_COLOR, 0
-
-        return "purple_1", 0
-
-    def _get_dimmed_color(self, attributes: dict):
-        brightness = attributes.get("brightness", 255)
-        if brightness <= 85:
-            return "green_3"
-        if brightness <= 170:
-            return "green_2"
-        return "green_1"
+        self._painted[:] = BLANK_BOARD
+        self._last_map = None
@@ -0,0 +1,339 @@
+"""What each pad shows, worked out once from the button map.
+
+Rendering used to read every pad's map entry afresh on every poll: compare it
+with "disco_toggle" and "manual_sleep", check it for a volume prefix, split
+off the domain, and look the gate up in PAD_AVAILABILITY, for an answer that
+cannot change while the process runs.
+
+compile_plans() now does that once, at startup, and turns each entry into a
+plan: a small object for its kind of pad, holding the resolved domain, target
+entity and gate. Rendering a pad is then one call, `plan.color(state_map)`.
+
+A malformed entry -- not an entity id, a volume pad not aimed at a player, a
+note the board has no pad for -- is rejected here with a ValueError, rather
+than turning up as a red pad the first time it is rendered.
+"""
+
+import logging
+import random
+from abc import ABC, abstractmethod
+from collections.abc import Mapping
+from typing import Any
+
+from ha_launchpad.features.disco import DiscoMode
+from ha_launchpad.infrastructure.ha.client import media_player_is_actionable
+
+logger = logging.getLogger(__name__)
+
+# Home Assistant states meaning "this device cannot be reached right now", as
+# opposed to "it is switched off". Wi-Fi bulbs killed at a wall switch report
+# `unavailable`, and rendering that as plain off hides the difference.
+UNAVAILABLE_STATES = frozenset({"unavailable", "unknown"})
+# A device that is merely switched off. Most of the board sits at this colour
+# most of the time, which is why it was worth choosing on the hardware: the
+# velocity it replaced read as slate blue on screen and as a dull smudge in the
+# room.
+OFF_COLOR = "gray_3"
+
+# An unreachable device is a passive fact, so its pad has to sit *below* the
+# switched-off colour in brightness. A mid white here made offline bulbs the
+# loudest thing on the board. This brown-mauve is dimmer than OFF_COLOR and,
+# unlike the grey it replaced, is not another shade of the same thing: off and
+# unreachable now differ in hue as well as brightness.
+UNAVAILABLE_COLOR = "taupe"
+
+# Prefixes of pads that adjust a player's volume rather than naming an entity.
+VOLUME_PREFIXES = ("volume_up.", "volume_down.")
+
+# Every note a map can name, one per MIDI note.
+NOTES = range(128)
+
+DISCO_COLORS = ("orange_1", "green_1", "cyan_1", "pink_2", "yellow_1")
+
+Color = tuple[str, int]
+StateMap = Mapping[str, dict[str, Any]]
+
+
+class PadPlan(ABC):
+    """One pad: what it depends on, and how to colour it."""
+
+    __slots__ = ("depends_on", "disco_light", "entity_id", "gate", "note")
+
+    # Whether a problem this pad reports on the pulsing channel is one the
+    # sleeping board keeps lit.
+    notifies = False
+
+    def __init__(self, note: int, entity_id: str, gate: str | None):
+        self.note = note
+        self.entity_id = entity_id
+        # The PAD_AVAILABILITY entity that has to be on for the pad to work.
+        self.gate = gate
+        # Disco owns this pad's light while it runs.
+        self.disco_light = False
+        # Every entity whose state can change the pad's colour.
+        self.depends_on: tuple[str, ...] = (gate,) if gate is not None else ()
+
+    @abstractmethod
+    def color(self, state_map: StateMap) -> Color:
+        """The pad's colour and channel, given the watched states."""
+
+    def predicted_color(self, state_map: StateMap) -> Color | None:
+        """The colour a press should leave the pad, before Home Assistant
+        confirms it. None unless the outcome is certain."""
+        return None
+
+
+class DiscoPlan(PadPlan):
+    __slots__ = ("disco",)
+
+    def __init__(self, note: int, entity_id: str, gate: str | None, disco):
+        super().__init__(note, entity_id, gate)
+        self.disco = disco
+
+    def color(self, state_map: StateMap) -> Color:
+        if self.disco.active:
+            return random.choice(DISCO_COLORS), 2
+        return "orange_1", 0
+
+
+class SleepPlan(PadPlan):
+    __slots__ = ()
+
+    def color(self, state_map: StateMap) -> Color:
+        return "lightblue_0", 0
+
+
+class VolumePlan(PadPlan):
+    """A pad stepping a player's volume, coloured after the player."""
+
+    __slots__ = ("target",)
+
+    def __init__(self, note: int, entity_id: str, gate: str | None, target: str):
+        super().__init__(note, entity_id, gate)
+        self.target = target
+        self.depends_on = (target, *self.depends_on)
+
+    def color(self, state_map: StateMap) -> Color:
+        state_data = state_map.get(self.target)
+
+        if not state_data or state_data.get("state") in UNAVAILABLE_STATES:
+            return UNAVAILABLE_COLOR, 0
+
+        # The pad can only do something if the player reports a level to
+        # adjust. A TV that is off has no volume_level, so the service call
+        # would just fail -- show that rather than a lit, dead pad.
+        if state_data.get("attributes", {}).get("volume_level") is None:
+            return UNAVAILABLE_COLOR, 0
+
+        return "purple_1", 0
+
+
+class EntityPlan(PadPlan):
+    """A pad showing the state of the entity it names."""
+
+    __slots__ = ("domain", "missing")
+
+    def __init__(
+        self,
+        note: int,
+        entity_id: str,
+        gate: str | None,
+        domain: str,
+        missing: set[str],
+    ):
+        super().__init__(note, entity_id, gate)
+        self.domain = domain
+        # Entities already reported missing, shared by every plan, so each is
+        # reported once rather than on every poll.
+        self.missing = missing
+        self.depends_on = (entity_id, *self.depends_on)
+
+    def color(self, state_map: StateMap) -> Color:
+        state_data = state_map.get(self.entity_id)
+        if not state_data:
+            # Home Assistant has no such entity: a typo in the map, or
+            # something not created yet. Either way the pad cannot control
+            # anything, which is the same situation as an unreachable device --
+            # so render it that way and let the controller keep it inert,
+            # rather than lighting a red pad that fires calls into the void.
+            if self.entity_id not in self.missing:
+                logger.warning(
+                    "Entity does not exist in Home Assistant: %s", self.entity_id
+                )
+                self.missing.add(self.entity_id)
+            return UNAVAILABLE_COLOR, 0
+
+        self.missing.discard(self.entity_id)
+        state = state_data.get("state", "unknown")
+
+        # Offline is not the same as off, and should not look like it.
+        if state in UNAVAILABLE_STATES:
+            return UNAVAILABLE_COLOR, 0
+
+        return self.state_color(state, state_data)
+
+    def state_color(self, state: str, state_data: dict[str, Any]) -> Color:
+        # A domain rendering has no rule for.
+        return "red_2", 0
+
+
+class SwitchPlan(EntityPlan):
+    __slots__ = ("lit",)
+
+    def __init__(
+        self,
+        note: int,
+        entity_id: str,
+        gate: str | None,
+        domain: str,
+        missing: set[str],
+    ):
+        super().__init__(note, entity_id, gate, domain, missing)
+        # The colour it was last rendered on at. Home Assistant brings a light
+        # back at the brightness it had, but reports none while it is off.
+        self.lit: Color = ("green_1", 0)
+
+    def state_color(self, state: str, state_data: dict[str, Any]) -> Color:
+        if state == "on":
+            if self.domain == "light" and "attributes" in state_data:
+                self.lit = _dimmed_color(state_data["attributes"]), 0
+                return self.lit
+            return "green_1", 0
+        return OFF_COLOR, 0
+
+    def predicted_color(self, state_map: StateMap) -> Color | None:
+        state_data = state_map.get(self.entity_id) or {}
+        state = state_data.get("state")
+        if state == "on":
+            return self.state_color("off", state_data)
+        if state == "off":
+            return self.lit
+        return None
+
+
+class ScenePlan(EntityPlan):
+    __slots__ = ()
+
+    def state_color(self, state: str, state_data: dict[str, Any]) -> Color:
+        return "blue_1", 0
+
+
+class ScriptPlan(EntityPlan):
+    __slots__ = ()
+
+    def state_color(self, state: str, state_data: dict[str, Any]) -> Color:
+        # Chosen on the hardware for pad 58, which is the only script on the
+        # board. A script has no state worth showing -- it is a button, not a
+        # thing that is on or off -- so this colour never changes.
+        return "sage", 0
+
+
+class MediaPlayerPlan(EntityPlan):
+    __slots__ = ()
+
+    def state_color(self, state: str, state_data: dict[str, Any]) -> Color:
+        if state == "playing":
+            return "cyan_0", 2
+        # An idle speaker with an empty queue cannot be played or paused, so
+        # it belongs with the unreachable pads rather than looking exactly
+        # like one that is merely paused.
+        if not media_player_is_actionable(self.entity_id, state_data):
+            return UNAVAILABLE_COLOR, 0
+        return OFF_COLOR, 0
+
+    def predicted_color(self, state_map: StateMap) -> Color | None:
+        state_data = state_map.get(self.entity_id) or {}
+        state = state_data.get("state")
+        if state == "playing":
+            return self.state_color("paused", state_data)
+        # Whether a TV comes up idle, on or playing is anybody's guess.
+        if state in ("off", None, *UNAVAILABLE_STATES):
+            return None
+        if media_player_is_actionable(self.entity_id, state_data):
+            return self.state_color("playing", state_data)
+        return None
+
+
+class PlantPlan(EntityPlan):
+    __slots__ = ()
+
+    notifies = True
+
+    def state_color(self, state: str, state_data: dict[str, Any]) -> Color:
+        problem = state_data.get("attributes", {}).get("problem", "unknown")
+        if problem == "none":
+            return "green_3", 0
+        return "red_2", 2
+
+
+_ENTITY_PLANS: dict[str, type[EntityPlan]] = {
+    "light": SwitchPlan,
+    "switch": SwitchPlan,
+    "scene": ScenePlan,
+    "script": ScriptPlan,
+    "media_player": MediaPlayerPlan,
+    "plant": PlantPlan,
+}
+
+
+def _dimmed_color(attributes: dict[str, Any]) -> str:
+    brightness = attributes.get("brightness", 255)
+    if brightness <= 85:
+        return "green_3"
+    if brightness <= 170:
+        return "green_2"
+    return "green_1"
+
+
+def _split_entity_id(entity_id: str) -> tuple[str, str] | None:
+    domain, dot, object_id = entity_id.partition(".")
+    if not dot or not domain or not object_id:
+        return None
+    return domain, object_id
+
+
+def compile_plans(
+    button_map: Mapping[int, str],
+    availability: Mapping[int, str],
+    disco: DiscoMode,
+    disco_lights,
+    missing: set[str],
+) -> dict[int, PadPlan]:
+    """A plan for every pad in the map, by note, in map order.
+
+    `missing` is where entity plans note the entities Home Assistant does not
+    have. Raises ValueError naming the first entry that makes no sense.
+    """
+    plans: dict[int, PadPlan] = {}
+    for note, entity_id in button_map.items():
+        if note not in NOTES:
+            raise ValueError(f"Pad {note}: not a MIDI note")
+
+        gate = availability.get(note)
+        if gate is not None and _split_entity_id(gate) is None:
+            raise ValueError(f"Pad {note}: availability gate {gate!r} is not an entity")
+
+        plan: PadPlan
+        if entity_id == "disco_toggle":
+            plan = DiscoPlan(note, entity_id, gate, disco)
+        elif entity_id == "manual_sleep":
+            plan = SleepPlan(note, entity_id, gate)
+        elif entity_id.startswith(VOLUME_PREFIXES):
+            target = entity_id.split(".", 1)[1]
+            if (_split_entity_id(target) or ("",))[0] != "media_player":
+                raise ValueError(
+                    f"Pad {note}: {entity_id!r} does not name a media player"
+                )
+            plan = VolumePlan(note, entity_id, gate, target)
+        else:
+            parts = _split_entity_id(entity_id)
+            if parts is None:
+                raise ValueError(f"Pad {note}: {entity_id!r} is not an entity id")
+            domain = parts[0]
+            plan = _ENTITY_PLANS.get(domain, EntityPlan)(
+                note, entity_id, gate, domain, missing
+            )
+
+        plan.disco_light = entity_id in disco_lights
+        plans[note] = plan
+    return plans
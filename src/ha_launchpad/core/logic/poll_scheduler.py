@@ -0,0 +1,127 @@
+"""When the poll thread next asks Home Assistant for the watched states.
+
+The poll thread used to sleep a fixed POLL_INTERVAL after each poll. That had
+two costs. The period was the interval plus however long the request took, so
+a slow Home Assistant polled less often exactly when it was least predictable.
+And a house where nothing had changed for an hour was fetched as often as one
+where somebody was busy at the board.
+
+Polls now fall on deadlines on the monotonic clock, so the request time comes
+out of the wait rather than adding to it. The interval is POLL_MIN_INTERVAL for
+POLL_BOOST_DURATION after a press or a change, since that is when the next
+change is likely and worth seeing quickly. After that it stretches by
+POLL_GROWTH per quiet poll, up to POLL_MAX_INTERVAL. Each wait is jittered by
+POLL_JITTER either way, so the poller does not beat in step with anything else
+polling Home Assistant on a round number.
+"""
+
+import random
+import threading
+import time
+from collections.abc import Callable
+
+from ha_launchpad.config.settings import (
+    IDLE_POLL_INTERVAL,
+    POLL_BOOST_DURATION,
+    POLL_GROWTH,
+    POLL_JITTER,
+    POLL_MAX_INTERVAL,
+    POLL_MIN_INTERVAL,
+)
+
+
+class PollScheduler:
+    def __init__(
+        self,
+        min_interval: float = POLL_MIN_INTERVAL,
+        max_interval: float = POLL_MAX_INTERVAL,
+        *,
+        boost: float = POLL_BOOST_DURATION,
+        growth: float = POLL_GROWTH,
+        jitter: float = POLL_JITTER,
+        idle_interval: float = IDLE_POLL_INTERVAL,
+        clock: Callable[[], float] = time.monotonic,
+        rng: random.Random | None = None,
+    ):
+        self.min_interval = min_interval
+        self.max_interval = max(max_interval, min_interval)
+        self.idle_interval = idle_interval
+        self._boost = boost
+        self._growth = growth
+        self._jitter = jitter
+        self._clock = clock
+        self._rng = rng or random.Random()
+        self._lock = threading.Lock()
+        # Set to cut a wait short: activity brought the deadline forward, or
+        # the poller is stopping.
+        self._wake = threading.Event()
+        self._stopped = False
+
+        now = clock()
+        self._interval = min_interval
+        self._boost_until = now + boost
+        self._deadline = now
+
+    @property
+    def interval(self) -> float:
+        """The awake interval the next poll will be scheduled with, unjittered."""
+        with self._lock:
+            return self._interval
+
+    def activity(self) -> None:
+        """Someone is at the board. Poll quickly for a while, starting now."""
+        now = self._clock()
+        with self._lock:
+            self._tighten(now)
+            # A poll due in five seconds would leave the pad the user just
+            # pressed waiting that long for its confirmation.
+            self._deadline = min(self._deadline, now + self.min_interval)
+        self._wake.set()
+
+    def record(self, changed: bool) -> None:
+        """Report whether the poll just made changed anything on the board."""
+        now = self._clock()
+        with self._lock:
+            if changed:
+                self._tighten(now)
+            elif now >= self._boost_until:
+                self._interval = min(self._interval * self._growth, self.max_interval)
+
+    def next_deadline(self, idle: bool = False) -> float:
+        """Schedule the next poll and return when it is due.
+
+        While the board is asleep the interval is IDLE_POLL_INTERVAL, which
+        also sets how quickly a change shows up as a standby preview.
+        """
+        now = self._clock()
+        with self._lock:
+            interval = self.idle_interval if idle else self._interval
+            step = interval * (1 + self._rng.uniform(-self._jitter, self._jitter))
+            # A poll that overran its slot waits a whole interval from now,
+            # rather than firing the polls it missed back to back: a Home
+            # Assistant slower than the interval is still given a rest.
+            deadline = self._deadline + step
+            self._deadline = deadline if deadline >= now else now + step
+            return self._deadline
+
+    def wait(self, idle: bool = False) -> None:
+        """Block until the next poll is due, or stop() was called."""
+        self.next_deadline(idle)
+        while True:
+            self._wake.clear()
+            with self._lock:
+                if self._stopped:
+                    return
+                remaining = self._deadline - self._clock()
+            if remaining <= 0:
+                return
+            self._wake.wait(remaining)
+
+    def stop(self) -> None:
+        with self._lock:
+            self._stopped = True
+        self._wake.set()
+
+    def _tighten(self, now: float) -> None:
+        self._interval = self.min_interval
+        self._boost_until = now + self._boost
@@ -21,7 +21,7 @@ from ha_launchpad.config.mapping import (
     LOGO_CC,
 )
 from ha_launchpad.config.palette import PALETTE_SIZE, describe
-from ha_launchpad.infrastructure.midi.interface import MidiBackend
+from ha_launchpad.core.logic.framebuffer import Surface
 
 logger = logging.getLogger(__name__)
 
@@ -48,7 +48,9 @@ PAD_INDEX: dict[int, int] = {pad: index for index, pad in enumerate(PAGE_PADS)}
 
 
 class ColorLab:
-    def __init__(self, backend: MidiBackend, rotation: int = 0):
+    def __init__(self, backend: Surface, rotation: int = 0):
+        # The lab layer, which covers the whole grid and hides nothing for
+        # good: the board underneath goes on tracking Home Assistant.
         self.backend = backend
         self.active = False
         self.page = 0
@@ -72,17 +74,14 @@ class ColorLab:
         self._paint()
 
     def exit(self) -> None:
-        """Close the lab and blank the furniture around the grid.
-
-        The grid itself is left as-is: the caller repaints it from Home
-        Assistant, which it has to do anyway because the lab lights pads that
-        no entity owns.
-        """
+        """Close the lab, uncovering the board, and blank the furniture around
+        the grid."""
         if not self.active:
             return
 
         self.active = False
         logger.info("Colour lab closed")
+        self.backend.clear_all()
 
         for cc in (
             self.toggle_button,
@@ -155,10 +154,12 @@ class ColorLab:
             return
 
         first = self.page * PAGE_SIZE
-        for index, pad in enumerate(PAGE_PADS):
-            # Velocity 0 is "off", so the first pad of page 1 is dark. That is
-            # the palette telling the truth about itself, not a missing swatch.
-            self.backend.send_velocity(pad, first + index)
+        with self.backend.batch():
+            for index, pad in enumerate(PAGE_PADS):
+                # Velocity 0 is "off", so the first pad of page 1 is dark. That
+                # is the palette telling the truth about itself, not a missing
+                # swatch.
+                self.backend.send_velocity(pad, first + index)
 
         # An arrow lights only when it leads somewhere. On two pages that also
         # says which one is open, without a second row of buttons to say it.
@@ -2,13 +2,18 @@ import logging
 from typing import Any
 
 from ha_launchpad.config.mapping import BRIGHTNESS_PALETTE, COLOR_PALETTE
+from ha_launchpad.core.logic.framebuffer import Surface
+from ha_launchpad.infrastructure.ha.commands import CallService, Toggle
 
 logger = logging.getLogger(__name__)
 
 
 class ColorPicker:
-    def __init__(self, ha_client, midi_backend):
-        self.ha_client = ha_client
+    def __init__(self, executor, midi_backend: Surface):
+        # Picks are handed to the service executor, so the palette closes
+        # straight away rather than after Home Assistant has answered.
+        self.executor = executor
+        # The picker layer: the board underneath is left as it is.
         self.backend = midi_backend
         self.active = False
         self.target_entity: str | None = None
@@ -30,7 +35,7 @@ class ColorPicker:
 
         # Visual feedback: mark the source pad
         try:
-            if self.backend and self.backend.is_connected():
+            with self.backend.batch():
                 self.backend.send_note(self.source_note, "yellow_3", channel=2)
 
                 # Show color palette if enabled
@@ -51,20 +56,9 @@ class ColorPicker:
         self.target_entity = None
         self.source_note = None
 
-        # Turn off palettes
-        if self.backend and self.backend.is_connected():
-            # Clear color palette
-            for note in COLOR_PALETTE:
-                try:
-                    self.backend.send_note(note, "off")
-                except Exception:
-                    pass
-            # Clear brightness palette
-            for note in BRIGHTNESS_PALETTE:
-                try:
-                    self.backend.send_note(note, "off")
-                except Exception:
-                    pass
+        # Take the palettes and the marked source pad off, which uncovers the
+        # pads they were drawn over exactly as they were.
+        self.backend.clear_all()
 
     def handle_input(self, note: int) -> Any | None:
         """
@@ -83,10 +77,7 @@ class ColorPicker:
                     "Source pad released without palette selection -> toggling %s",
                     self.target_entity,
                 )
-                try:
-                    self.ha_client.toggle_entity(self.target_entity)
-                except Exception:
-                    pass
+                self.executor.submit(Toggle(self.target_entity))
             consumed_source_note = self.source_note
             self.exit()
             # Return selection info with None color to signal "no pulse"
@@ -98,12 +89,11 @@ class ColorPicker:
             logger.info("Picked color %s for %s", (r, g, b), self.target_entity)
 
             # Send to Home Assistant
-            try:
-                self.ha_client.call_service(
-                    "light", "turn_on", self.target_entity, rgb_color=[r, g, b]
+            self.executor.submit(
+                CallService(
+                    "light", "turn_on", self.target_entity, {"rgb_color": [r, g, b]}
                 )
-            except Exception:
-                pass
+            )
 
             consumed_source_note = self.source_note
             pulse_color = COLOR_PALETTE.get(note, {}).get("color", "white")
@@ -115,14 +105,15 @@ class ColorPicker:
             level = BRIGHTNESS_PALETTE[note]
             logger.info("Picked brightness %s for %s", level, self.target_entity)
 
-            # Send to Home Assistant
-            try:
-                # 255-based brightness
-                self.ha_client.call_service(
-                    "light", "turn_on", self.target_entity, brightness=int(level * 255)
+            # Send to Home Assistant, 255-based brightness
+            self.executor.submit(
+                CallService(
+                    "light",
+                    "turn_on",
+                    self.target_entity,
+                    {"brightness": int(level * 255)},
                 )
-            except Exception:
-                pass
+            )
 
             consumed_source_note = self.source_note
             self.exit()
@@ -8,6 +8,7 @@ from ha_launchpad.config.settings import (
     DISCO_SPEED,
     DISCO_TRANSITION,
 )
+from ha_launchpad.infrastructure.ha.lanes import TrafficClass
 
 logger = logging.getLogger(__name__)
 
@@ -28,6 +29,9 @@ class DiscoMode:
         self.active = False
         self.thread = None
         self._stop_event = threading.Event()
+        # The brightness call made by start(), which the first colour step
+        # waits for.
+        self._setup = []
 
     def start(self):
         if self.active:
@@ -43,14 +47,20 @@ class DiscoMode:
         # takes the transition and the colour change is left with none -- so
         # sending brightness on every step, as this used to, guaranteed the
         # colour would hard-cut no matter what transition was requested.
-        for light in DISCO_LIGHTS:
-            self.ha_client.call_service(
+        #
+        # Batched, so every bulb gets it in one request rather than a burst of
+        # them at the gateway, and so this press does not wait on the answer.
+        self._setup = [
+            self.ha_client.call_service_batched(
                 "light",
                 "turn_on",
                 light,
                 brightness=DISCO_BRIGHTNESS,
                 transition=1,
+                lane=TrafficClass.BACKGROUND,
             )
+            for light in DISCO_LIGHTS
+        ]
 
         self.thread = threading.Thread(target=self._run, daemon=True)
         self.thread.start()
@@ -90,6 +100,13 @@ class DiscoMode:
         # the Trådfri gateway is a CoAP bottleneck and dislikes bursts.
         stagger = DISCO_SPEED / count
 
+        # Brightness has to have landed first, or it would arrive after a
+        # colour step and take that step's transition with it.
+        for future in self._setup:
+            while not future.done():
+                if self._stop_event.wait(0.05):
+                    return
+
         while self.active and not self._stop_event.is_set():
             for i, light in enumerate(DISCO_LIGHTS):
                 hues[i] = (hues[i] + random.uniform(HUE_STEP_MIN, HUE_STEP_MAX)) % 360.0
@@ -103,6 +120,9 @@ class DiscoMode:
                     light,
                     hs_color=[round(hues[i], 1), round(saturation, 1)],
                     transition=DISCO_TRANSITION,
+                    # On a pool of its own, so the effect never holds a
+                    # connection a press or the poller needs.
+                    lane=TrafficClass.BACKGROUND,
                 )
 
                 if self._stop_event.wait(stagger):
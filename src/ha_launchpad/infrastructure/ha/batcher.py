@@ -0,0 +1,96 @@
+"""Fold identical service calls on different entities into one request.
+
+Home Assistant takes a list for `entity_id`, and acts on every entity in it.
+Starting disco used to send `light.turn_on` with the same brightness to each
+bulb in turn, one request after another, and the Trådfri gateway behind those
+bulbs is a CoAP bottleneck that dislikes exactly that kind of burst.
+
+Calls handed to this batcher wait for a short window instead. Every call with
+the same domain, service and data that arrives in that window joins the same
+request, which goes out once, naming all of their entities. Calls that differ
+in any of those are never merged: one light at 40% and another at 60% are two
+requests, as they have to be.
+"""
+
+import json
+import logging
+import threading
+from collections.abc import Callable
+from concurrent.futures import Future
+from typing import Any
+
+from ha_launchpad.config.settings import HA_BATCH_WINDOW
+
+logger = logging.getLogger(__name__)
+
+# Sends one call for a list of entities, blocking. True if it was accepted.
+Send = Callable[[str, str, list[str], dict[str, Any]], bool]
+
+
+class _Batch:
+    def __init__(self, domain: str, service: str, data: dict[str, Any]):
+        self.domain = domain
+        self.service = service
+        self.data = data
+        # A dict rather than a set, to keep the order they were asked for.
+        self.entity_ids: dict[str, None] = {}
+        self.futures: list[Future] = []
+
+
+class ServiceBatcher:
+    def __init__(self, send: Send, window: float = HA_BATCH_WINDOW):
+        self._send = send
+        self._window = window
+        self._lock = threading.Lock()
+        self._open: dict[tuple[str, str, str], _Batch] = {}
+        self._sent = 0
+        self._batched = 0
+
+    def submit(
+        self, domain: str, service: str, entity_id: str, data: dict[str, Any]
+    ) -> Future:
+        """Queue a call and return at once.
+
+        The future resolves to whether Home Assistant accepted the request the
+        call ended up in.
+        """
+        future: Future = Future()
+        # Data compared by value, key order aside. Lists such as rgb_color
+        # are not hashable, so compare the JSON it will be sent as.
+        key = (domain, service, json.dumps(data, sort_keys=True))
+        with self._lock:
+            batch = self._open.get(key)
+            if batch is None:
+                batch = self._open[key] = _Batch(domain, service, dict(data))
+                timer = threading.Timer(self._window, self._flush, (key,))
+                timer.daemon = True
+                timer.start()
+            else:
+                self._batched += 1
+            batch.entity_ids[entity_id] = None
+            batch.futures.append(future)
+        return future
+
+    def metrics(self) -> dict[str, int]:
+        with self._lock:
+            return {"sent": self._sent, "batched": self._batched}
+
+    def _flush(self, key: tuple[str, str, str]) -> None:
+        with self._lock:
+            batch = self._open.pop(key)
+            self._sent += 1
+
+        entity_ids = list(batch.entity_ids)
+        try:
+            ok = self._send(batch.domain, batch.service, entity_ids, batch.data)
+        except Exception as exc:
+            logger.error(
+                "Call failed: %s.%s for %s: %s",
+                batch.domain,
+                batch.service,
+                entity_ids,
+                exc,
+            )
+            ok = False
+        for future in batch.futures:
+            future.set_result(ok)
@@ -0,0 +1,122 @@
+"""Stop asking an unreachable Home Assistant for anything but a health check.
+
+While Home Assistant restarts, every poll used to go out regardless. Each one
+sat through urllib3's retries and backoff before giving up, tying up the poll
+thread for seconds at a time, and the retries landed on Home Assistant just
+as it was trying to come back up.
+
+The breaker counts failures. After HA_BREAKER_FAILURES in a row it opens, and
+while open the client makes no real requests at all. Instead it probes the
+cheap `GET /api/` on a backoff, from HA_BREAKER_PROBE_INTERVAL up to
+HA_BREAKER_MAX_PROBE_INTERVAL. A probe that is answered half-opens it, and
+from then on every request is preceded by another probe. Once
+HA_BREAKER_SUCCESSES probes in a row have been answered it closes, and
+requests flow again. A failed probe on the way sends it back to open.
+
+Each change of state is logged once, so an outage reads as two or three
+lines however long it lasts.
+"""
+
+import logging
+import threading
+import time
+from collections.abc import Callable
+from enum import Enum
+
+from ha_launchpad.config.settings import (
+    HA_BREAKER_FAILURES,
+    HA_BREAKER_MAX_PROBE_INTERVAL,
+    HA_BREAKER_PROBE_INTERVAL,
+    HA_BREAKER_SUCCESSES,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class BreakerState(Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+
+class CircuitBreaker:
+    def __init__(
+        self,
+        failures: int = HA_BREAKER_FAILURES,
+        successes: int = HA_BREAKER_SUCCESSES,
+        probe_interval: float = HA_BREAKER_PROBE_INTERVAL,
+        max_probe_interval: float = HA_BREAKER_MAX_PROBE_INTERVAL,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self._failures_to_open = max(failures, 1)
+        self._successes_to_close = max(successes, 1)
+        self._probe_interval = probe_interval
+        self._max_probe_interval = max(max_probe_interval, probe_interval)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = BreakerState.CLOSED
+        self._failures = 0
+        self._successes = 0
+        self._next_probe = 0.0
+        self._backoff = probe_interval
+
+    @property
+    def state(self) -> BreakerState:
+        with self._lock:
+            return self._state
+
+    def allows_requests(self) -> bool:
+        with self._lock:
+            return self._state is BreakerState.CLOSED
+
+    def probe_due(self) -> bool:
+        """Whether a health check should go out before the next request.
+
+        Never while closed. While half-open, before every request. While open,
+        once the backoff has run out.
+        """
+        with self._lock:
+            if self._state is BreakerState.CLOSED:
+                return False
+            if self._state is BreakerState.HALF_OPEN:
+                return True
+            return self._clock() >= self._next_probe
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            if self._state is BreakerState.CLOSED:
+                return
+            self._successes += 1
+            if self._successes >= self._successes_to_close:
+                self._state = BreakerState.CLOSED
+                self._successes = 0
+                self._backoff = self._probe_interval
+                logger.info("Home Assistant reachable again, resuming requests")
+            elif self._state is BreakerState.OPEN:
+                self._state = BreakerState.HALF_OPEN
+                logger.info("Home Assistant answering again, confirming first")
+
+    def record_failure(self, reason) -> None:
+        with self._lock:
+            self._successes = 0
+            if self._state is BreakerState.CLOSED:
+                self._failures += 1
+                if self._failures < self._failures_to_open:
+                    logger.debug("Home Assistant request failed: %s", reason)
+                    return
+                self._state = BreakerState.OPEN
+                self._backoff = self._probe_interval
+                logger.warning(
+                    "Home Assistant unreachable (%s) - pausing requests, "
+                    "checking /api/ every %.0fs",
+                    reason,
+                    self._backoff,
+                )
+            elif self._state is BreakerState.HALF_OPEN:
+                self._state = BreakerState.OPEN
+                logger.info("Home Assistant dropped again while recovering: %s", reason)
+            else:
+                self._backoff = min(self._backoff * 2, self._max_probe_interval)
+                logger.debug("Still unreachable: %s", reason)
+            self._next_probe = self._clock() + self._backoff
@@ -1,40 +1,92 @@
 """Home Assistant API wrapper used by the Launchpad controller."""
 
+import hashlib
+import json
 import logging
-from typing import Any
+import threading
+import time
+from collections.abc import Iterable
+from concurrent.futures import Future
+from enum import Enum
+from functools import partial
+from typing import TYPE_CHECKING, Any, Literal
 
 import requests
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
 
 from ha_launchpad.config.mapping import PLAYERS_WITH_DEVICE_QUEUE
 from ha_launchpad.config.settings import (
-    HA_REQUEST_MAX_DELAY,
-    VOLUME_STEP,
+    HA_KEEPALIVE_INTERVAL,
+    HA_POLL_MODE,
+    HA_PREWARM_CONNECTIONS,
+    HA_STATE_MAX_AGE,
 )
+from ha_launchpad.infrastructure.ha.batcher import ServiceBatcher
+from ha_launchpad.infrastructure.ha.breaker import CircuitBreaker
+from ha_launchpad.infrastructure.ha.lanes import (
+    POLL_TIMEOUT,
+    TrafficClass,
+    build_lanes,
+)
+from ha_launchpad.infrastructure.ha.metrics import ClientMetrics, endpoint_class
+from ha_launchpad.infrastructure.ha.singleflight import SingleFlight
+from ha_launchpad.infrastructure.ha.states_decoder import StatesDecoder
+from ha_launchpad.infrastructure.ha.store import EntityStore
 
-logger = logging.getLogger(__name__)
+if TYPE_CHECKING:
+    from ha_launchpad.infrastructure.ha.websocket import HomeAssistantWebSocket
 
-# (connect, read) timeouts. The read budget for polling has to fit inside the
-# poll interval, otherwise one slow response stalls every LED update behind it.
-POLL_TIMEOUT = (2.0, 3.0)
-# Service calls block until Home Assistant has finished running them, which for
-# a cloud-backed light or a speaker is legitimately slow.
-SERVICE_TIMEOUT = (2.0, 10.0)
+logger = logging.getLogger(__name__)
 
-# Transient server-side conditions; a restarting Home Assistant behind a proxy
-# typically shows up as 502/503.
-RETRYABLE_STATUSES = (408, 429, 500, 502, 503, 504)
+# How much of /api/states is held at once while it is filtered. Big enough
+# that the per-chunk overhead vanishes, small enough that the whole house never
+# sits in memory.
+STATES_CHUNK_SIZE = 16 * 1024
 
 # MediaPlayerEntityFeature.TURN_ON. Not every player can be powered on
 # remotely, and calling the service on one that cannot just fails.
 MEDIA_PLAYER_TURN_ON = 128
 
 
+# Answers from /api/template meaning "not here, not for you", as opposed to a
+# blip. 401 belongs here too: the endpoint needs an admin token, and a
+# non-admin one is still perfectly good for everything else.
+TEMPLATE_REFUSED_STATUSES = (400, 401, 403, 404, 405)
+
+
 class HomeAssistantUnauthorized(Exception):
     """The token was rejected. No amount of retrying will fix it."""
 
 
+def build_state_template(entity_ids: Iterable[str], attributes: Iterable[str]) -> str:
+    """A Jinja template rendering just these entities as one compact JSON object.
+
+    Each entity becomes `{"state": ..., "attributes": {...}}` carrying only
+    the listed attribute keys that it actually has, or `null` if Home
+    Assistant does not know it. No timestamps and no context, so an unchanged
+    house renders byte-for-byte the same.
+
+    The entity is looked up as `states['domain']['object_id']`, which Jinja
+    resolves through attribute access and which, unlike `states.domain.id`,
+    still works for an object id starting with a digit.
+    """
+    keys = json.dumps(sorted(attributes))
+    parts = []
+    for entity_id in sorted(entity_ids):
+        domain, _, object_id = entity_id.partition(".")
+        parts.append(
+            f"{json.dumps(entity_id)}:"
+            f"{{% set s = states[{json.dumps(domain)}][{json.dumps(object_id)}] %}}"
+            "{% if s %}"
+            # The space keeps "{" and "{%" from reading as "{{".
+            '{"state":{{ s.state | to_json }},"attributes":{ '
+            f"{{% for k in {keys} if k in s.attributes %}}"
+            '{{ k | to_json }}:{{ s.attributes[k] | to_json }}{{ "," if not loop.last }}'
+            "{% endfor %}}}"
+            "{% else %}null{% endif %}"
+        )
+    return "{" + ",".join(parts) + "}"
+
+
 def media_player_is_actionable(entity_id: str, state_data: dict[str, Any]) -> bool:
     """Whether pressing this player's pad can achieve anything at all.
 
@@ -69,74 +121,252 @@ def media_player_is_actionable(entity_id: str, state_data: dict[str, Any]) -> bo
     return bool(attributes.get("media_content_id") or attributes.get("media_title"))
 
 
+class _TemplateRefused(Exception):
+    pass
+
+
+class _Unchanged(Enum):
+    UNCHANGED = "unchanged"
+
+
+# What get_state_map(if_changed=True) returns when the watched states are
+# exactly what it returned last time.
+UNCHANGED = _Unchanged.UNCHANGED
+
+StateMap = dict[str, dict[str, Any]]
+
+
+def _digest(data: bytes) -> bytes:
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
+def _retries(resp: requests.Response) -> int:
+    """How many times urllib3 retried on the way to this response."""
+    retries = getattr(resp.raw, "retries", None)
+    return len(getattr(retries, "history", None) or ())
+
+
 class HomeAssistantClient:
-    def __init__(self, url: str, token: str):
+    def __init__(self, url: str, token: str, store: EntityStore | None = None):
         self.url = url.rstrip("/")
-        self.session = requests.Session()
-        self.session.headers.update(
-            {
-                "Authorization": f"Bearer {token}",
-                "Accept": "application/json",
-            }
+        # Everything this client reads lands here, and presses read from it
+        # rather than fetching an entity the poller has only just fetched.
+        self.store = store if store is not None else EntityStore()
+        headers = {
+            "Authorization": f"Bearer {token}",
+            "Accept": "application/json",
+        }
+        # Polling, presses and disco each get their own connection pool,
+        # timeout and retry policy; see lanes.py.
+        self.lanes = build_lanes(headers)
+
+        # Health checks while Home Assistant is unreachable. No retries: the
+        # breaker schedules the next attempt itself, and a probe exists to be
+        # cheap.
+        self._probe_session = requests.Session()
+        self._probe_session.headers.update(headers)
+
+        # Tracks outages, so a Home Assistant restart costs a probe now and
+        # then rather than a full fetch on every poll, and reports once.
+        self.breaker = CircuitBreaker()
+        # What every request cost, by endpoint class; see metrics.py.
+        self.metrics = ClientMetrics()
+        # Concurrent reads of the same thing share one request; see
+        # singleflight.py.
+        self.reads = SingleFlight()
+
+        # What get_state_map() fetches; see watch(). Empty means everything.
+        self._watched: frozenset[str] = frozenset()
+        self._attributes: frozenset[str] = frozenset()
+        self._template: str | None = None
+        # Set once /api/template has been refused. A refusal is a property of
+        # the token or the server, not a blip, so it is not retried.
+        self._template_refused = HA_POLL_MODE != "template"
+        # Digest of the last watched states returned, for if_changed.
+        self._last_digest: bytes | None = None
+        # Service calls go over this connection while it is up; see
+        # use_websocket().
+        self._websocket: HomeAssistantWebSocket | None = None
+        self._batchers = {
+            lane: ServiceBatcher(partial(self._call_batch, lane=lane))
+            for lane in TrafficClass
+        }
+
+    def watch(self, entity_ids: Iterable[str], attributes: Iterable[str]) -> None:
+        """Narrow get_state_map() to these entities and attribute keys."""
+        self._watched = frozenset(entity_ids)
+        self._attributes = frozenset(attributes)
+        self._template = (
+            build_state_template(self._watched, attributes) if self._watched else None
         )
+        self._last_digest = None
 
-        retry = Retry(
-            total=2,
-            connect=2,
-            read=2,
-            status=2,
-            backoff_factor=0.3,
-            backoff_max=HA_REQUEST_MAX_DELAY,
-            backoff_jitter=0.2,
-            status_forcelist=RETRYABLE_STATUSES,
-            # Read and status retries are gated by method. A POST that timed
-            # out on read may well have run the service already, and replaying
-            # `light.toggle` would flip the light straight back. Connect
-            # failures are not gated, because there the request provably never
-            # reached Home Assistant.
-            allowed_methods=frozenset(["GET"]),
-            respect_retry_after_header=True,
-            raise_on_status=False,
-        )
-        adapter = HTTPAdapter(max_retries=retry, pool_connections=2, pool_maxsize=4)
-        self.session.mount("http://", adapter)
-        self.session.mount("https://", adapter)
+    def use_websocket(self, websocket: "HomeAssistantWebSocket | None") -> None:
+        """Make service calls over this connection whenever it is up.
 
-        # Whether we are currently in an outage, so a Home Assistant restart
-        # reports once rather than on every poll for as long as it lasts.
-        self._offline = False
+        While it is down they go over REST as before. A call is only ever
+        made one way: once sent on the socket it is not retried over REST.
+        """
+        self._websocket = websocket
 
     def _report_unreachable(self, method: str, endpoint: str, error) -> None:
-        if self._offline:
-            logger.debug("Still unreachable (%s %s): %s", method, endpoint, error)
+        self.breaker.record_failure(f"{method} {endpoint}: {error}")
+
+    def _report_reachable(self) -> None:
+        self.breaker.record_success()
+
+    def _report_status(self, method: str, endpoint: str, status: int) -> None:
+        """Tell the breaker what an answer says about Home Assistant.
+
+        A restarting Home Assistant behind a proxy answers 502 or 503, so a
+        5xx to a read is an outage. A 5xx to a service call is not: Music
+        Assistant answers a failed call with a bare 500, and one broken player
+        must not stop the polling and every other pad. It fails that call,
+        and says nothing either way about the rest.
+        """
+        if status < 500:
+            self._report_reachable()
+        elif endpoint_class(endpoint) != "service":
+            self._report_unreachable(method, endpoint, f"HTTP {status}")
+
+    def _admit(self, method: str, endpoint: str) -> bool:
+        """Whether a request may go out now, probing first if one is due."""
+        if self.breaker.probe_due():
+            self._probe()
+        if self.breaker.allows_requests():
+            return True
+        logger.debug("Skipped %s %s: Home Assistant unreachable", method, endpoint)
+        return False
+
+    def _probe(self) -> bool:
+        """One unretried `GET /api/`. The breaker hears the outcome."""
+        endpoint = f"{self.url}/api/"
+        try:
+            resp = self._send(
+                self._probe_session.request, "GET", endpoint, timeout=POLL_TIMEOUT
+            )
+        except requests.exceptions.RequestException as e:
+            self._report_unreachable("GET", endpoint, e)
+            return False
+
+        if resp.status_code == 401:
+            raise HomeAssistantUnauthorized(
+                f"Home Assistant rejected the access token: {resp.text[:200]}"
+            )
+
+        try:
+            running = resp.json().get("message") == "API running."
+        except ValueError:
+            running = False
+        if resp.status_code != 200 or not running:
+            self._report_unreachable("GET", endpoint, f"HTTP {resp.status_code}")
+            return False
+
+        self._report_reachable()
+        return True
+
+    def keep_alive(self, interval: float = HA_KEEPALIVE_INTERVAL) -> None:
+        """Use the press connections before Home Assistant closes them.
+
+        Cheap to call often: it does nothing unless they have been idle for
+        `interval`. Otherwise the first press after a quiet spell would pay
+        for a new connection before its call could even start.
+        """
+        lane = self.lanes[TrafficClass.COMMAND]
+        if lane.idle_for() < interval or not self._commands_use_rest():
             return
+        if not self.breaker.allows_requests():
+            return
+        logger.debug("Keeping the command connection alive")
+        self._touch_commands()
+
+    def prewarm(self, connections: int = HA_PREWARM_CONNECTIONS) -> list[Future]:
+        """Open press connections now, in the background, for presses to come.
 
-        logger.warning(
-            "Home Assistant unreachable (%s %s): %s", method, endpoint, error
+        Returns at once. Each future resolves when its connection is ready,
+        for a caller that wants to wait.
+        """
+        futures: list[Future] = []
+        if not self._commands_use_rest() or not self.breaker.allows_requests():
+            return futures
+
+        def warm(future: Future) -> None:
+            try:
+                future.set_result(self._touch_commands())
+            except Exception as exc:
+                logger.debug("Prewarming failed: %s", exc)
+                future.set_result(False)
+
+        # At once, not one after another: one at a time would all reuse the
+        # first socket and leave the rest of the pool cold.
+        for _ in range(connections):
+            future: Future = Future()
+            threading.Thread(
+                target=warm, args=(future,), name="ha-prewarm", daemon=True
+            ).start()
+            futures.append(future)
+        return futures
+
+    def _commands_use_rest(self) -> bool:
+        # While the WebSocket is carrying the calls, these connections sit
+        # unused and there is nothing to keep warm.
+        return self._websocket is None or not self._websocket.is_live
+
+    def _touch_commands(self) -> bool:
+        endpoint = f"{self.url}/api/"
+        resp = self._request(
+            "GET", endpoint, lane=TrafficClass.COMMAND, timeout=POLL_TIMEOUT
         )
-        self._offline = True
+        return resp is not None
 
-    def _report_reachable(self) -> None:
-        if self._offline:
-            logger.info("Home Assistant reachable again")
-            self._offline = False
+    def pool_metrics(self) -> dict[str, dict[str, int]]:
+        """Request counts and connection use for each traffic class."""
+        return {lane.value: self.lanes[lane].metrics() for lane in TrafficClass}
+
+    def _send(self, send, method: str, endpoint: str, **kwargs) -> requests.Response:
+        """Make one request through `send` and record what it cost.
+
+        A streamed body has not been read yet when this returns, so only the
+        time to its headers is counted here. The reader records the body.
+        """
+        kind = endpoint_class(endpoint)
+        started = time.perf_counter()
+        try:
+            resp = send(method, endpoint, **kwargs)
+        except requests.exceptions.RequestException:
+            self.metrics.record_request(kind, time.perf_counter() - started, None)
+            raise
+        size = None if kwargs.get("stream") else len(resp.content)
+        self.metrics.record_request(
+            kind, time.perf_counter() - started, resp.status_code, _retries(resp), size
+        )
+        return resp
 
     def _request(
-        self, method: str, endpoint: str, *, timeout, **kwargs
+        self,
+        method: str,
+        endpoint: str,
+        *,
+        lane: TrafficClass = TrafficClass.STATE,
+        **kwargs,
     ) -> requests.Response | None:
         """Perform one logical request.
 
         Transport-level retries and backoff are handled inside urllib3, so this
         always terminates. Returns None when the request could not be
-        completed; raises only when the failure is not worth retrying at all.
+        completed, or was not attempted because Home Assistant is known to be
+        unreachable; raises only when the failure is not worth retrying at all.
         """
+        if not self._admit(method, endpoint):
+            return None
+
         try:
-            resp = self.session.request(method, endpoint, timeout=timeout, **kwargs)
+            resp = self._send(self.lanes[lane].request, method, endpoint, **kwargs)
         except requests.exceptions.RequestException as e:
             self._report_unreachable(method, endpoint, e)
             return None
 
-        self._report_reachable()
+        self._report_status(method, endpoint, resp.status_code)
 
         if resp.status_code == 401:
             # Retrying a rejected token achieves nothing and, if Home Assistant
@@ -161,13 +391,38 @@ class HomeAssistantClient:
 
         return resp
 
-    def call_service(self, domain: str, service: str, entity_id: str, **kwargs) -> bool:
-        """Call a Home Assistant service"""
-        endpoint = f"{self.url}/api/services/{domain}/{service}"
+    def call_service(
+        self,
+        domain: str,
+        service: str,
+        entity_id: str | list[str],
+        *,
+        lane: TrafficClass = TrafficClass.COMMAND,
+        **kwargs,
+    ) -> bool:
+        """Call a Home Assistant service, on one entity or a list of them.
+
+        `lane` picks the connection pool a REST call goes out on. Over the
+        WebSocket there is only the one connection.
+        """
         data = {"entity_id": entity_id, **kwargs}
 
-        resp = self._request("POST", endpoint, timeout=SERVICE_TIMEOUT, json=data)
-        if resp is None:
+        ok = None
+        if self._websocket is not None:
+            started = time.perf_counter()
+            ok = self._websocket.call_service(domain, service, data)
+            if ok is not None:
+                self.metrics.record_request(
+                    "websocket",
+                    time.perf_counter() - started,
+                    "ok" if ok else "failed",
+                )
+        if ok is None:
+            endpoint = f"{self.url}/api/services/{domain}/{service}"
+            resp = self._request("POST", endpoint, lane=lane, json=data)
+            ok = resp is not None
+
+        if not ok:
             logger.error(
                 "Error calling service %s.%s for %s", domain, service, entity_id
             )
@@ -176,51 +431,273 @@ class HomeAssistantClient:
         logger.info("Called %s.%s for %s", domain, service, entity_id)
         return True
 
+    def call_service_batched(
+        self,
+        domain: str,
+        service: str,
+        entity_id: str,
+        *,
+        lane: TrafficClass = TrafficClass.COMMAND,
+        **kwargs,
+    ) -> Future:
+        """Call a service without waiting, batched with identical calls.
+
+        The call is held for HA_BATCH_WINDOW, and goes out as one request
+        together with every call made meanwhile for the same service and data
+        on other entities. The future resolves to whether it was accepted.
+        """
+        return self._batchers[lane].submit(domain, service, entity_id, kwargs)
+
+    def _call_batch(
+        self,
+        domain: str,
+        service: str,
+        entity_ids: list[str],
+        data: dict[str, Any],
+        *,
+        lane: TrafficClass,
+    ) -> bool:
+        target = entity_ids[0] if len(entity_ids) == 1 else entity_ids
+        return self.call_service(domain, service, target, lane=lane, **data)
+
     def is_available(self) -> bool:
         """Report whether the API answers and accepts our token.
 
         `GET /api/` is Home Assistant's own health endpoint, so unlike probing
         an entity this does not depend on anything in particular existing.
+        It is the breaker's probe, and counts towards closing it.
         """
-        resp = self._request("GET", f"{self.url}/api/", timeout=POLL_TIMEOUT)
-        if resp is None:
-            return False
-
-        try:
-            return resp.json().get("message") == "API running."
-        except ValueError:
-            logger.error("Invalid JSON response from /api/")
-            return False
+        return self._probe()
 
     def get_all_states(self) -> list[dict[str, Any]]:
         """Fetch all entity states from Home Assistant in one call.
 
         Returns an empty list if the states could not be fetched, which callers
-        must treat as "unknown" rather than "nothing is on".
+        must treat as "unknown" rather than "nothing is on". Callers asking
+        while a fetch is already in flight share its result.
         """
+        return self.reads.do("states", self._fetch_all_states)
+
+    def _fetch_all_states(self) -> list[dict[str, Any]]:
         endpoint = f"{self.url}/api/states"
-        resp = self._request("GET", endpoint, timeout=POLL_TIMEOUT)
+        resp = self._request("GET", endpoint)
         if resp is None:
             return []
 
+        started = time.perf_counter()
         try:
             return resp.json()
         except ValueError:
             logger.error("Invalid JSON response from /api/states")
             return []
+        finally:
+            self.metrics.record_decode("states", time.perf_counter() - started)
+
+    def get_state_map(
+        self, if_changed: bool = False
+    ) -> StateMap | Literal[_Unchanged.UNCHANGED] | None:
+        """Fetch the watched entities' states, keyed by entity id.
+
+        Renders them server-side through /api/template when it is allowed,
+        which is a couple of kilobytes instead of every entity in the house.
+        Where it is refused, falls back to /api/states and filters it as it
+        streams in, so only the watched entities are ever decoded.
+
+        Returns None if the states could not be fetched, which callers must
+        treat as "unknown" rather than "nothing is on". An entity Home
+        Assistant does not know is simply absent from the map.
+
+        With `if_changed`, returns UNCHANGED instead when the watched states
+        are identical to the last ones returned, for a caller that still holds
+        those. Most polls find nothing has changed, and then the rendered
+        template is not even parsed. Only watched states are compared, and
+        neither path carries timestamps or context, so an unrelated entity
+        ticking over does not count as a change.
+        """
+        states = self._fetch_state_map(if_changed)
+        if states is UNCHANGED:
+            self.store.touch(self._watched)
+        elif states is not None:
+            self.store.replace(states, self._watched or states)
+        return states
+
+    def _fetch_state_map(
+        self, if_changed: bool
+    ) -> StateMap | Literal[_Unchanged.UNCHANGED] | None:
+        if self._template is not None and not self._template_refused:
+            try:
+                return self._get_template_states(if_changed)
+            except _TemplateRefused:
+                pass
+
+        if self._watched:
+            return self._get_watched_states(if_changed)
+
+        all_states = self.get_all_states()
+        if not all_states:
+            return None
+
+        return {s["entity_id"]: s for s in all_states}
 
-    def get_state(self, entity_id: str) -> dict[str, Any]:
-        """Get the state of an entity. Returns 'not_found' if entity doesn't exist."""
+    def _is_unchanged(self, digest: bytes, if_changed: bool) -> bool:
+        unchanged = digest == self._last_digest
+        self._last_digest = digest
+        return if_changed and unchanged
+
+    def _get_watched_states(
+        self, if_changed: bool
+    ) -> StateMap | Literal[_Unchanged.UNCHANGED] | None:
+        endpoint = f"{self.url}/api/states"
+        resp = self._request("GET", endpoint, stream=True)
+        if resp is None:
+            return None
+
+        decoder = StatesDecoder(self._watched, self._attributes)
+        size = 0
+        decoding = 0.0
+        try:
+            with resp:
+                for chunk in resp.iter_content(chunk_size=STATES_CHUNK_SIZE):
+                    size += len(chunk)
+                    started = time.perf_counter()
+                    decoder.feed(chunk)
+                    decoding += time.perf_counter() - started
+            started = time.perf_counter()
+            states = decoder.finish()
+            decoding += time.perf_counter() - started
+            self.metrics.record_body("states", size, decoding)
+        except requests.exceptions.RequestException as e:
+            # Cut off part way through the body.
+            self._report_unreachable("GET", endpoint, e)
+            return None
+        except ValueError:
+            logger.error("Invalid JSON response from /api/states")
+            return None
+
+        # An empty house is as suspicious here as it is in get_all_states().
+        if not decoder.states_seen:
+            return None
+
+        # The decoder has already dropped the timestamps and everything
+        # unwatched, so what is left compares on content alone.
+        canonical = json.dumps(states, sort_keys=True, separators=(",", ":"))
+        if self._is_unchanged(_digest(canonical.encode()), if_changed):
+            return UNCHANGED
+        return states
+
+    def _get_template_states(
+        self, if_changed: bool
+    ) -> StateMap | Literal[_Unchanged.UNCHANGED] | None:
+        endpoint = f"{self.url}/api/template"
+        if not self._admit("POST", endpoint):
+            return None
+        try:
+            resp = self._send(
+                self.lanes[TrafficClass.STATE].request,
+                "POST",
+                endpoint,
+                json={"template": self._template},
+            )
+        except requests.exceptions.RequestException as e:
+            self._report_unreachable("POST", endpoint, e)
+            return None
+
+        self._report_status("POST", endpoint, resp.status_code)
+
+        if resp.status_code in TEMPLATE_REFUSED_STATUSES:
+            logger.warning(
+                "Home Assistant refused /api/template (%s), polling /api/states "
+                "instead: %s",
+                resp.status_code,
+                resp.text[:200],
+            )
+            self._template_refused = True
+            raise _TemplateRefused
+
+        if resp.status_code >= 400:
+            logger.error(
+                "Home Assistant returned %s for POST %s: %s",
+                resp.status_code,
+                endpoint,
+                resp.text[:200],
+            )
+            return None
+
+        # The template sorts its entities and attribute keys and leaves out
+        # anything that moves on its own, so the body itself is canonical.
+        digest = _digest(resp.content)
+        if digest == self._last_digest and if_changed:
+            return UNCHANGED
+
+        started = time.perf_counter()
+        try:
+            rendered = json.loads(resp.text)
+        except ValueError:
+            logger.error("Template did not render as JSON: %s", resp.text[:200])
+            self._last_digest = None
+            return None
+        finally:
+            self.metrics.record_decode("states", time.perf_counter() - started)
+        self._last_digest = digest
+
+        return {
+            entity_id: {"entity_id": entity_id, **state}
+            for entity_id, state in rendered.items()
+            if state is not None
+        }
+
+    def get_state(
+        self, entity_id: str, lane: TrafficClass = TrafficClass.STATE
+    ) -> dict[str, Any]:
+        """Get the state of an entity. Returns 'not_found' if entity doesn't exist.
+
+        Callers asking for the same entity while it is already being fetched
+        share that request and its result, whichever lane it went out on.
+        """
+        return self.reads.do(
+            ("state", entity_id), partial(self._fetch_state, entity_id, lane)
+        )
+
+    def _fetch_state(self, entity_id: str, lane: TrafficClass) -> dict[str, Any]:
         endpoint = f"{self.url}/api/states/{entity_id}"
-        resp = self._request("GET", endpoint, timeout=POLL_TIMEOUT)
+        resp = self._request("GET", endpoint, lane=lane)
         if resp is None:
             return {"error": "not_found"}
 
+        started = time.perf_counter()
         try:
-            return resp.json()
+            state = resp.json()
         except ValueError:
             logger.error("Invalid JSON response for %s", entity_id)
             return {}
+        finally:
+            self.metrics.record_decode("state", time.perf_counter() - started)
+
+        self.store.put(entity_id, self._as_watched(entity_id, state))
+        return state
+
+    def _as_watched(self, entity_id: str, state: dict[str, Any]) -> dict[str, Any]:
+        """A state in the shape get_state_map() stores, so that reading the
+        same entity both ways does not look like a change."""
+        if not self._watched:
+            return state
+        attributes = state.get("attributes") or {}
+        return {
+            "entity_id": entity_id,
+            "state": state.get("state"),
+            "attributes": {
+                key: attributes[key] for key in self._attributes if key in attributes
+            },
+        }
+
+    def _read_state(self, entity_id: str) -> dict[str, Any]:
+        """The entity's state for acting on, from the store if it is recent
+        enough and from Home Assistant otherwise."""
+        state = self.store.get(entity_id, HA_STATE_MAX_AGE)
+        if state is not None:
+            return state
+        # Someone is waiting on this read, so it does not queue behind a poll.
+        return self.get_state(entity_id, TrafficClass.COMMAND)
 
     def toggle_entity(self, entity_id: str) -> bool:
         """Trigger action based on entity domain."""
@@ -246,7 +723,8 @@ class HomeAssistantClient:
         A pad for a switched-off TV that does nothing at all is not much use,
         so if the player advertises TURN_ON, use it.
         """
-        state_data = self.get_state(entity_id)
+        version = self.store.version(entity_id)
+        state_data = self._read_state(entity_id)
         state = state_data.get("state") if state_data else None
 
         if state == "unavailable":
@@ -261,22 +739,18 @@ class HomeAssistantClient:
             )
             return True
 
-        if state == "off":
-            return self.call_service("media_player", "turn_on", entity_id)
-
-        return self.call_service("media_player", "media_play_pause", entity_id)
-
-    def volume_up(self, entity_id: str) -> bool:
-        """Increase volume of a media player by VOLUME_STEP."""
-        return self._adjust_volume(entity_id, VOLUME_STEP)
-
-    def volume_down(self, entity_id: str) -> bool:
-        """Decrease volume of a media player by VOLUME_STEP."""
-        return self._adjust_volume(entity_id, -VOLUME_STEP)
+        service = "turn_on" if state == "off" else "media_play_pause"
+        ok = self.call_service("media_player", service, entity_id)
+        if ok:
+            # The next press must see what this one did, not what was read
+            # before it.
+            self.store.invalidate(entity_id, version)
+        return ok
 
-    def _adjust_volume(self, entity_id: str, delta: float) -> bool:
+    def adjust_volume(self, entity_id: str, delta: float) -> bool:
         """Adjust volume by delta, clamped to 0.0-1.0."""
-        state = self.get_state(entity_id)
+        version = self.store.version(entity_id)
+        state = self._read_state(entity_id)
         if "error" in state:
             logger.error("Cannot get state for volume adjustment: %s", entity_id)
             return False
@@ -287,6 +761,9 @@ class HomeAssistantClient:
             return False
 
         new_volume = max(0.0, min(1.0, current_volume + delta))
-        return self.call_service(
+        ok = self.call_service(
             "media_player", "volume_set", entity_id, volume_level=new_volume
         )
+        if ok:
+            self.store.invalidate(entity_id, version)
+        return ok
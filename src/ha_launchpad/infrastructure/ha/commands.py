@@ -0,0 +1,96 @@
+"""The things a press can ask Home Assistant to do, as values.
+
+A press used to call the client directly, on the MIDI loop, and wait for the
+answer. Describing the call instead lets the executor run it elsewhere, and
+lets whoever gets the result back know what it was for.
+
+It also lets calls still waiting to run be merged. Seven quick taps on a
+volume pad are one move of seven steps, and four brightness picks in a row
+only need the last one sent.
+"""
+
+from abc import ABC, abstractmethod
+from collections.abc import Hashable
+from dataclasses import dataclass, field, replace
+from typing import Any, Self
+
+from ha_launchpad.infrastructure.ha.client import HomeAssistantClient
+
+
+@dataclass(frozen=True)
+class Command(ABC):
+    # The pad to confirm on once Home Assistant has accepted the call, or
+    # None for a call nobody is waiting to see confirmed.
+    note: int | None = field(default=None, kw_only=True)
+
+    @abstractmethod
+    def run(self, client: HomeAssistantClient) -> bool:
+        """Perform the call, blocking. True if Home Assistant accepted it."""
+
+    @property
+    def coalesce_key(self) -> Hashable | None:
+        """Calls with the same key may be merged while they wait, and never
+        run at the same time. None for a call that must run as often as it
+        was asked for."""
+        return None
+
+    def merge(self, later: Self) -> Self:
+        """One call doing the work of this one followed by `later`."""
+        return later
+
+
+@dataclass(frozen=True)
+class Toggle(Command):
+    """Whatever a press on this entity's pad means for its domain.
+
+    Never coalesced: two toggles are a round trip back, not one toggle.
+    """
+
+    entity_id: str
+    # The pad already shows the expected outcome, so success needs no pulse
+    # and failure has to put the old colour back.
+    predicted: bool = field(default=False, kw_only=True)
+
+    def run(self, client: HomeAssistantClient) -> bool:
+        return client.toggle_entity(self.entity_id)
+
+
+@dataclass(frozen=True)
+class CallService(Command):
+    domain: str
+    service: str
+    entity_id: str
+    data: dict[str, Any] = field(default_factory=dict)
+
+    def run(self, client: HomeAssistantClient) -> bool:
+        return client.call_service(
+            self.domain, self.service, self.entity_id, **self.data
+        )
+
+    @property
+    def coalesce_key(self) -> Hashable | None:
+        # A call carrying data sets those values outright, so the latest one
+        # wins. Without data it is an action, like media_play_pause, and each
+        # one counts.
+        if not self.data:
+            return None
+        return (self.entity_id, self.domain, self.service, frozenset(self.data))
+
+
+@dataclass(frozen=True)
+class AdjustVolume(Command):
+    """Move a player's volume by `delta`, clamped to 0.0-1.0."""
+
+    entity_id: str
+    delta: float
+
+    def run(self, client: HomeAssistantClient) -> bool:
+        return client.adjust_volume(self.entity_id, self.delta)
+
+    @property
+    def coalesce_key(self) -> Hashable | None:
+        return (self.entity_id, "volume")
+
+    def merge(self, later: Self) -> Self:
+        # One read of the current level and one volume_set, however many taps.
+        return replace(later, delta=self.delta + later.delta)
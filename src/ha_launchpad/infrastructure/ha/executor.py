@@ -0,0 +1,204 @@
+"""Run service calls off the MIDI loop.
+
+A service call blocks until Home Assistant has finished running it, and
+SERVICE_TIMEOUT allows that ten seconds, because a cloud light or a Sonos can
+legitimately take that long. Made from the MIDI loop, one such call froze
+every other pad on the board for as long as it took.
+
+Presses now hand a Command to this executor and return at once. A small pool
+of workers makes the calls, and each finished call is reported through
+`on_complete`, which the controller uses to confirm on the pad. The queue is
+bounded: a board mashed while Home Assistant is down should drop presses, not
+pile up a minute of them to replay when it comes back.
+
+Calls still waiting are merged with a newer call on the same entity and
+service family (see Command.coalesce_key), so a burst of taps costs one round
+trip and the last of them lands sooner. Calls with the same key never run at
+once either: the next volume step waits for the one in flight, rather than
+reading a level that is about to change.
+"""
+
+import logging
+import threading
+from collections import deque
+from collections.abc import Callable, Hashable
+from concurrent.futures import Future
+from dataclasses import dataclass
+
+from ha_launchpad.config.settings import HA_EXECUTOR_QUEUE, HA_EXECUTOR_WORKERS
+from ha_launchpad.infrastructure.ha.client import HomeAssistantClient
+from ha_launchpad.infrastructure.ha.commands import Command
+
+logger = logging.getLogger(__name__)
+
+# How long stop() waits for a call already in progress.
+STOP_TIMEOUT = 2.0
+
+
+@dataclass(frozen=True)
+class Completion:
+    command: Command
+    ok: bool
+
+
+class _Pending:
+    """A queued call, and everyone waiting on it once merged."""
+
+    def __init__(self, command: Command, future: Future):
+        self.command = command
+        self.futures = [future]
+
+
+class ServiceExecutor:
+    def __init__(
+        self,
+        client: HomeAssistantClient,
+        on_complete: Callable[[Completion], None] | None = None,
+        *,
+        workers: int = HA_EXECUTOR_WORKERS,
+        max_pending: int = HA_EXECUTOR_QUEUE,
+    ):
+        self.client = client
+        self.on_complete = on_complete
+        self._worker_count = workers
+        self._max_pending = max_pending
+        self._workers: list[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._ready = threading.Condition(self._lock)
+        self._pending: deque[_Pending] = deque()
+        self._by_key: dict[Hashable, _Pending] = {}
+        self._running_keys: set[Hashable] = set()
+        self._stopping = False
+        self._in_flight = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._coalesced = 0
+
+    def start(self) -> None:
+        if self._workers:
+            return
+        self._stopping = False
+        for i in range(self._worker_count):
+            worker = threading.Thread(
+                target=self._work, name=f"ha-executor-{i}", daemon=True
+            )
+            worker.start()
+            self._workers.append(worker)
+
+    def stop(self) -> None:
+        """Stop the workers. Calls still queued are resolved as failed."""
+        with self._ready:
+            self._stopping = True
+            discarded = list(self._pending)
+            self._pending.clear()
+            self._by_key.clear()
+            self._ready.notify_all()
+        for pending in discarded:
+            for future in pending.futures:
+                future.set_result(False)
+        for worker in self._workers:
+            worker.join(STOP_TIMEOUT)
+        self._workers = []
+
+    def submit(self, command: Command) -> Future:
+        """Queue a call and return at once.
+
+        The future resolves to whether Home Assistant accepted the call, or
+        the merged call it was folded into. It resolves to False straight away
+        if the queue is full.
+        """
+        future: Future = Future()
+        key = command.coalesce_key
+        with self._ready:
+            waiting = self._by_key.get(key) if key is not None else None
+            if waiting is not None:
+                waiting.command = waiting.command.merge(command)
+                waiting.futures.append(future)
+                self._coalesced += 1
+                return future
+
+            if len(self._pending) >= self._max_pending:
+                self._rejected += 1
+                rejected = True
+            else:
+                pending = _Pending(command, future)
+                self._pending.append(pending)
+                if key is not None:
+                    self._by_key[key] = pending
+                self._ready.notify()
+                rejected = False
+
+        if rejected:
+            logger.warning("Too many calls pending - dropped %s", command)
+            future.set_result(False)
+        return future
+
+    def metrics(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "queue_depth": len(self._pending),
+                "in_flight": self._in_flight,
+                "completed": self._completed,
+                "failed": self._failed,
+                "rejected": self._rejected,
+                "coalesced": self._coalesced,
+            }
+
+    def _next(self) -> _Pending | None:
+        """The oldest call whose key is not already running. Lock held."""
+        for pending in self._pending:
+            key = pending.command.coalesce_key
+            if key is None or key not in self._running_keys:
+                self._pending.remove(pending)
+                if key is not None:
+                    # From here on it is in flight, and a newer call on the
+                    # same key queues behind it instead of merging into it.
+                    del self._by_key[key]
+                    self._running_keys.add(key)
+                self._in_flight += 1
+                return pending
+        return None
+
+    def _work(self) -> None:
+        while True:
+            with self._ready:
+                pending = self._next()
+                while pending is None and not self._stopping:
+                    self._ready.wait()
+                    pending = self._next()
+                if pending is None:
+                    return
+
+            command = pending.command
+            futures = [f for f in pending.futures if f.set_running_or_notify_cancel()]
+            try:
+                ok = command.run(self.client)
+            except Exception as exc:
+                # An unauthorized token included: the poll thread owns that
+                # exit, and a worker cannot take the process down cleanly.
+                logger.error("Call failed: %s: %s", command, exc)
+                ok = False
+
+            with self._ready:
+                self._in_flight -= 1
+                self._completed += 1
+                if not ok:
+                    self._failed += 1
+                key = command.coalesce_key
+                if key is not None:
+                    self._running_keys.discard(key)
+                    # A call on this key may have been held back behind it.
+                    self._ready.notify_all()
+
+            for future in futures:
+                future.set_result(ok)
+            self._notify(Completion(command, ok))
+
+    def _notify(self, completion: Completion) -> None:
+        if self.on_complete is None:
+            return
+        try:
+            self.on_complete(completion)
+        except Exception:
+            logger.exception("Completion handler failed")
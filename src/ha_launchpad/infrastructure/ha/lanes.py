@@ -0,0 +1,174 @@
+"""Separate connection pools for the client's three kinds of traffic.
+
+Polling, presses and disco used to share one session and its four pooled
+connections, from three threads. A service call can legitimately hold its
+connection for SERVICE_TIMEOUT, so a few slow calls left the poll waiting for
+a socket, and a poll stuck on a half-dead connection held one a press needed.
+
+Each kind now has a lane of its own: a session with its own pool, timeout and
+retry policy, and counters to show how it is being used.
+
+- STATE, the poller's reads. Retried, and bounded to fit inside a poll.
+- COMMAND, whatever a press does, including the read a volume step makes
+  first. Enough connections that a press never queues for one, and retries
+  kept short, since someone is waiting.
+- BACKGROUND, disco. One connection, so an effect can never crowd out the
+  other two or burst at Home Assistant, and no retries: a lost step is
+  overtaken by the next one anyway.
+"""
+
+import threading
+import time
+from enum import Enum
+from typing import Any
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from ha_launchpad.config.settings import HA_EXECUTOR_WORKERS, HA_REQUEST_MAX_DELAY
+
+# (connect, read) timeouts. The read budget for polling has to fit inside the
+# poll interval, otherwise one slow response stalls every LED update behind it.
+POLL_TIMEOUT = (2.0, 3.0)
+# Service calls block until Home Assistant has finished running them, which for
+# a cloud-backed light or a speaker is legitimately slow.
+SERVICE_TIMEOUT = (2.0, 10.0)
+# A disco step that has not landed by the time the next one is due is moot.
+BACKGROUND_TIMEOUT = (2.0, 5.0)
+
+# Transient server-side conditions; a restarting Home Assistant behind a proxy
+# typically shows up as 502/503.
+RETRYABLE_STATUSES = (408, 429, 500, 502, 503, 504)
+
+
+class TrafficClass(Enum):
+    STATE = "state"
+    COMMAND = "command"
+    BACKGROUND = "background"
+
+
+def _retry(attempts: int, backoff: float) -> Retry:
+    return Retry(
+        total=attempts,
+        connect=attempts,
+        read=attempts,
+        status=attempts,
+        backoff_factor=backoff,
+        backoff_max=HA_REQUEST_MAX_DELAY,
+        backoff_jitter=0.2,
+        status_forcelist=RETRYABLE_STATUSES,
+        # Read and status retries are gated by method. A POST that timed out
+        # on read may well have run the service already, and replaying
+        # `light.toggle` would flip the light straight back. Connect failures
+        # are not gated, because there the request provably never reached
+        # Home Assistant.
+        allowed_methods=frozenset(["GET"]),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+
+
+class Lane:
+    def __init__(
+        self,
+        traffic: TrafficClass,
+        headers: dict[str, str],
+        *,
+        timeout: tuple[float, float],
+        retry: Retry,
+        pool_size: int,
+        block: bool = False,
+    ):
+        self.traffic = traffic
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers.update(headers)
+        self._adapter = HTTPAdapter(
+            max_retries=retry,
+            pool_connections=1,
+            pool_maxsize=pool_size,
+            pool_block=block,
+        )
+        self.session.mount("http://", self._adapter)
+        self.session.mount("https://", self._adapter)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._peak_in_flight = 0
+        self._requests = 0
+        self._failed = 0
+        # When the last request finished, which is how long the pooled
+        # sockets have been sitting idle.
+        self._last_done = time.monotonic()
+
+    def idle_for(self) -> float:
+        """Seconds since the lane last finished a request. 0 while busy."""
+        with self._lock:
+            if self._in_flight:
+                return 0.0
+            return time.monotonic() - self._last_done
+
+    def request(self, method: str, url: str, **kwargs: Any) -> requests.Response:
+        kwargs.setdefault("timeout", self.timeout)
+        with self._lock:
+            self._requests += 1
+            self._in_flight += 1
+            self._peak_in_flight = max(self._peak_in_flight, self._in_flight)
+        try:
+            return self.session.request(method, url, **kwargs)
+        except requests.exceptions.RequestException:
+            with self._lock:
+                self._failed += 1
+            raise
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+                self._last_done = time.monotonic()
+
+    def metrics(self) -> dict[str, int]:
+        with self._lock:
+            counters = {
+                "requests": self._requests,
+                "failed": self._failed,
+                "in_flight": self._in_flight,
+                "peak_in_flight": self._peak_in_flight,
+            }
+        counters["connections_opened"] = self._connections_opened()
+        return counters
+
+    def _connections_opened(self) -> int:
+        pools = self._adapter.poolmanager.pools
+        opened = 0
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is not None:
+                opened += pool.num_connections
+        return opened
+
+
+def build_lanes(headers: dict[str, str]) -> dict[TrafficClass, Lane]:
+    return {
+        TrafficClass.STATE: Lane(
+            TrafficClass.STATE,
+            headers,
+            timeout=POLL_TIMEOUT,
+            retry=_retry(2, 0.3),
+            pool_size=2,
+        ),
+        TrafficClass.COMMAND: Lane(
+            TrafficClass.COMMAND,
+            headers,
+            timeout=SERVICE_TIMEOUT,
+            retry=_retry(1, 0.1),
+            # One per executor worker, and one for a read made on the side.
+            pool_size=HA_EXECUTOR_WORKERS + 1,
+        ),
+        TrafficClass.BACKGROUND: Lane(
+            TrafficClass.BACKGROUND,
+            headers,
+            timeout=BACKGROUND_TIMEOUT,
+            retry=_retry(0, 0),
+            pool_size=1,
+            block=True,
+        ),
+    }
@@ -0,0 +1,182 @@
+"""What the client's requests to Home Assistant actually cost.
+
+Until now the client only said something when a request failed, so whether a
+transport change helped was a matter of feel. Every request is now recorded
+against its endpoint class -- the states fetch, a single state, a service
+call, the health check, a service call over the WebSocket -- with its
+latency, response size, decode time, retries and status.
+
+Distributions go into fixed-bucket histograms. Recording one value is a
+bisect over a short tuple and an increment, and memory stays the same however
+long the process runs. Percentiles read back from them are the upper edge of
+the bucket they fall in, which is as exact as "is this 40 ms or 400 ms" needs.
+
+`snapshot()` returns the lot as plain data. A summary is also logged every
+HA_METRICS_LOG_INTERVAL seconds.
+"""
+
+import bisect
+import logging
+import threading
+import time
+from collections import Counter
+from typing import Any
+
+from ha_launchpad.config.settings import HA_METRICS_LOG_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+# Upper bucket edges. Milliseconds for time, bytes for size.
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+DECODE_BUCKETS_MS = (0.1, 0.2, 0.5, 1, 2, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+ENDPOINT_CLASSES = ("states", "state", "service", "websocket", "health", "other")
+
+
+def endpoint_class(path: str) -> str:
+    """The class a request path is counted under."""
+    if path.endswith(("/api/states", "/api/template")):
+        return "states"
+    if "/api/states/" in path:
+        return "state"
+    if "/api/services/" in path:
+        return "service"
+    if path.endswith("/api/"):
+        return "health"
+    return "other"
+
+
+class Histogram:
+    __slots__ = ("bounds", "count", "counts", "max", "total")
+
+    def __init__(self, bounds: tuple[float, ...]):
+        self.bounds = bounds
+        # One more than there are bounds: the last counts everything beyond.
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def percentile(self, q: float) -> float:
+        """Upper edge of the bucket holding the q-th quantile. 0 if empty."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank and n:
+                return self.bounds[i] if i < len(self.bounds) else self.max
+        return self.max
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else 0.0,
+            "p50": self.percentile(0.5),
+            "p95": self.percentile(0.95),
+            "p99": self.percentile(0.99),
+            "max": self.max,
+            "buckets": dict(zip((*self.bounds, "inf"), self.counts, strict=True)),
+        }
+
+
+class _Endpoint:
+    def __init__(self):
+        self.latency_ms = Histogram(LATENCY_BUCKETS_MS)
+        self.decode_ms = Histogram(DECODE_BUCKETS_MS)
+        self.response_bytes = Histogram(SIZE_BUCKETS)
+        self.retries = 0
+        # Status codes by number, and "error" for no response at all. A call
+        # over the WebSocket has no status code: it is "ok" or "failed".
+        self.statuses: Counter[int | str] = Counter()
+
+
+class ClientMetrics:
+    def __init__(self, log_interval: float = HA_METRICS_LOG_INTERVAL):
+        self._lock = threading.Lock()
+        self._endpoints = {name: _Endpoint() for name in ENDPOINT_CLASSES}
+        self._log_interval = log_interval
+        self._next_log = time.monotonic() + log_interval
+
+    def record_request(
+        self,
+        kind: str,
+        seconds: float,
+        status: int | str | None,
+        retries: int = 0,
+        size: int | None = None,
+    ) -> None:
+        """One request: how long it took, and what came back."""
+        with self._lock:
+            endpoint = self._endpoints[kind]
+            endpoint.latency_ms.observe(seconds * 1000)
+            endpoint.statuses[status if status is not None else "error"] += 1
+            endpoint.retries += retries
+            if size is not None:
+                endpoint.response_bytes.observe(size)
+        self._log_if_due()
+
+    def record_body(self, kind: str, size: int, decode_seconds: float) -> None:
+        """The size of a response body, and the time spent decoding it."""
+        with self._lock:
+            endpoint = self._endpoints[kind]
+            endpoint.response_bytes.observe(size)
+            endpoint.decode_ms.observe(decode_seconds * 1000)
+
+    def record_decode(self, kind: str, seconds: float) -> None:
+        with self._lock:
+            self._endpoints[kind].decode_ms.observe(seconds * 1000)
+
+    def snapshot(self) -> dict[str, dict[str, Any]]:
+        """Everything recorded so far, by endpoint class, as plain data."""
+        with self._lock:
+            return {
+                name: {
+                    "latency_ms": endpoint.latency_ms.snapshot(),
+                    "decode_ms": endpoint.decode_ms.snapshot(),
+                    "response_bytes": endpoint.response_bytes.snapshot(),
+                    "retries": endpoint.retries,
+                    "statuses": dict(endpoint.statuses),
+                }
+                for name, endpoint in self._endpoints.items()
+                if endpoint.latency_ms.count
+            }
+
+    def summary(self) -> list[str]:
+        """One line per endpoint class that has seen a request."""
+        lines = []
+        for name, data in self.snapshot().items():
+            latency = data["latency_ms"]
+            size = data["response_bytes"]
+            decode = data["decode_ms"]
+            statuses = " ".join(
+                f"{status}x{n}"
+                for status, n in sorted(data["statuses"].items(), key=str)
+            )
+            lines.append(
+                f"{name}: {latency['count']} req, latency p50 {latency['p50']:g} ms "
+                f"p95 {latency['p95']:g} ms max {latency['max']:.0f} ms, "
+                f"body mean {size['mean'] / 1024:.1f} KB, "
+                f"decode p50 {decode['p50']:g} ms, retries {data['retries']}, "
+                f"status {statuses}"
+            )
+        return lines
+
+    def _log_if_due(self) -> None:
+        if self._log_interval <= 0:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if now < self._next_log:
+                return
+            self._next_log = now + self._log_interval
+        for line in self.summary():
+            logger.info("HA %s", line)
@@ -0,0 +1,63 @@
+"""Share one in-flight read among everyone asking for the same thing.
+
+The poll thread, the MIDI thread reading a player before a volume step or a
+play/pause, and the colour picker can all fetch the same entity at the same
+moment. A burst of presses landing on a poll used to turn into as many
+identical GETs, each decoded separately, for an answer that was the same
+every time.
+
+A read made while the same one is already in flight now waits for that one
+instead of making its own, and gets its result: the very same decoded object,
+or the same exception. Nothing is cached past the request. The first read to
+start after it finishes goes to Home Assistant again.
+"""
+
+import threading
+from collections.abc import Callable, Hashable
+from concurrent.futures import Future
+from typing import TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights: dict[Hashable, Future] = {}
+        self._made = 0
+        self._shared = 0
+
+    def do(self, key: Hashable, fetch: Callable[[], T]) -> T:
+        """`fetch()`, or the result of the one already running for `key`."""
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                self._shared += 1
+                leader = False
+            else:
+                flight = self._flights[key] = Future()
+                self._made += 1
+                leader = True
+        if not leader:
+            return flight.result()
+
+        try:
+            result = fetch()
+        except BaseException as exc:
+            self._land(key)
+            flight.set_exception(exc)
+            raise
+        self._land(key)
+        flight.set_result(result)
+        return result
+
+    def _land(self, key: Hashable) -> None:
+        # Before the waiters are woken, so that a read starting after this
+        # one has landed makes a fresh request rather than joining it.
+        with self._lock:
+            del self._flights[key]
+
+    def metrics(self) -> dict[str, int]:
+        """Reads made, and reads that joined one already in flight."""
+        with self._lock:
+            return {"made": self._made, "shared": self._shared}
@@ -0,0 +1,728 @@
+"""A local stand-in for Home Assistant.
+
+Enough of the real API to exercise the transports end to end, over real
+sockets, without a Home Assistant or a network: the WebSocket handshake, auth,
+and `subscribe_entities` with the same compressed event format the real one
+sends. States are set from the test, and every subscriber hears about them the
+way it would from a live house.
+
+Service calls are answered both over the WebSocket and over REST, alongside
+the REST state reads. The common services act on the entity the way Home
+Assistant would, so a toggle shows up as a state change, and every call is
+recorded in `service_calls` with the transport it came in on.
+
+    with HomeAssistantStandIn({"light.a": "on"}) as ha:
+        push = HomeAssistantWebSocket(ha.websocket_url, ha.token)
+        ...
+        ha.set_state("light.a", "off")
+
+For load tests it can also stand in for a busier, less reliable house than a
+test would write out by hand: `populate()` adds synthetic entities, `latency`
+delays every REST reply, `start_churn()` keeps changing random states the way
+sensors do, and `failure_rate` and `fail_next()` answer REST requests with an
+error instead. Run on its own, it serves until interrupted:
+
+    python -m ha_launchpad.infrastructure.ha.standin --entities 2000 --churn 20
+"""
+
+import argparse
+import json
+import logging
+import random
+import socket
+import threading
+import time
+from collections.abc import Iterable, Sequence
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Self
+
+from websockets.datastructures import Headers
+from websockets.exceptions import WebSocketException
+from websockets.frames import Opcode
+from websockets.http11 import Request
+from websockets.protocol import State
+from websockets.server import ServerProtocol
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TOKEN = "standin-token"
+
+# State each service leaves the entity in, given the state it found.
+_SERVICE_STATES = {
+    "turn_on": lambda domain, state: "playing" if domain == "media_player" else "on",
+    "turn_off": lambda domain, state: "off",
+    "toggle": lambda domain, state: "off" if state in ("on", "playing") else "on",
+    "media_play_pause": lambda domain, state: (
+        "paused" if state == "playing" else "playing"
+    ),
+    "media_play": lambda domain, state: "playing",
+    "media_pause": lambda domain, state: "paused",
+    "volume_set": lambda domain, state: state,
+}
+
+# What populate() makes: mostly sensors, as in a real house, some automations,
+# and the things a pad would switch.
+_SYNTHETIC_DOMAINS = ("sensor",) * 6 + (
+    "automation",
+    "binary_sensor",
+    "light",
+    "switch",
+)
+_SYNTHETIC_ATTRIBUTES = {
+    "supported_features": 44,
+    "icon": "mdi:home",
+    "device_class": "temperature",
+    "unit_of_measurement": "°C",
+    "state_class": "measurement",
+}
+
+
+def _next_state(domain: str, state: str, rng: random.Random) -> str:
+    """A plausible next state: a sensor drifts, anything else flips."""
+    if domain == "sensor":
+        try:
+            return f"{float(state) + rng.uniform(-0.5, 0.5):.1f}"
+        except ValueError:
+            return f"{rng.uniform(15, 25):.1f}"
+    return "off" if state == "on" else "on"
+
+
+def _compress(state: dict[str, Any]) -> dict[str, Any]:
+    return {
+        "s": state["state"],
+        "a": state["attributes"],
+        "lc": state["last_changed"],
+        "lu": state["last_updated"],
+    }
+
+
+def _diff(old: dict[str, Any], new: dict[str, Any]) -> dict[str, Any]:
+    additions: dict[str, Any] = {"lu": new["last_updated"]}
+    if old["state"] != new["state"]:
+        additions["s"] = new["state"]
+        additions["lc"] = new["last_changed"]
+
+    changed = {
+        key: value
+        for key, value in new["attributes"].items()
+        if old["attributes"].get(key, object()) != value
+    }
+    if changed:
+        additions["a"] = changed
+
+    diff: dict[str, Any] = {"+": additions}
+    removed = [key for key in old["attributes"] if key not in new["attributes"]]
+    if removed:
+        diff["-"] = {"a": removed}
+    return diff
+
+
+class _ServerConnection:
+    """The stand-in's end of one WebSocket, over websockets' sans-I/O protocol.
+
+    The HTTP server has read the upgrade request by the time it is known to be
+    one, so the handshake is answered from its parsed headers, and from then on
+    the protocol does the framing and this only moves its bytes. Sending is
+    safe from any thread; receiving belongs to one.
+    """
+
+    def __init__(self, sock: socket.socket):
+        self._sock = sock
+        self._protocol = ServerProtocol(state=State.OPEN, max_size=None)
+        self._lock = threading.Lock()
+        self._received: list[str] = []
+        self._fragments: list[bytes] = []
+
+    def send_text(self, text: str) -> None:
+        with self._lock:
+            self._protocol.send_text(text.encode("utf-8"))
+            self._flush()
+
+    def recv_text(self) -> str:
+        """The next text message. Raises ConnectionError once the peer is gone."""
+        while not self._received:
+            try:
+                data = self._sock.recv(65536)
+            except OSError as exc:
+                raise ConnectionError(str(exc)) from exc
+            with self._lock:
+                if data:
+                    self._protocol.receive_data(data)
+                else:
+                    self._protocol.receive_eof()
+                events = self._protocol.events_received()
+                # Pongs and the answer to a close go out as soon as they exist.
+                self._flush()
+
+            for frame in events:
+                if frame.opcode is Opcode.CLOSE:
+                    raise ConnectionError("closed by peer")
+                if frame.opcode in (Opcode.TEXT, Opcode.CONT):
+                    self._fragments.append(frame.data)
+                    if frame.fin:
+                        self._received.append(b"".join(self._fragments).decode())
+                        self._fragments.clear()
+            if not data:
+                raise ConnectionError("connection reset")
+        return self._received.pop(0)
+
+    def close(self) -> None:
+        """Send a normal closure and drop the socket. Idempotent."""
+        with self._lock:
+            if self._protocol.state is State.OPEN:
+                self._protocol.send_close(1000)
+                try:
+                    self._flush()
+                except OSError:
+                    pass
+        try:
+            # Unblocks the receiving thread.
+            self._sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self._sock.close()
+
+    def _flush(self) -> None:
+        for data in self._protocol.data_to_send():
+            if data:
+                self._sock.sendall(data)
+            else:
+                # The protocol is done with the stream; half-close it.
+                self._sock.shutdown(socket.SHUT_WR)
+
+
+class _Subscription:
+    def __init__(self, connection: _ServerConnection, msg_id: int, entity_ids):
+        self.connection = connection
+        self.msg_id = msg_id
+        self.entity_ids = frozenset(entity_ids) if entity_ids else None
+
+    def wants(self, entity_id: str) -> bool:
+        return self.entity_ids is None or entity_id in self.entity_ids
+
+    def send(self, event: dict[str, Any]) -> None:
+        message = {"id": self.msg_id, "type": "event", "event": event}
+        try:
+            self.connection.send_text(json.dumps(message))
+        except (OSError, WebSocketException):
+            pass
+
+
+class HomeAssistantStandIn:
+    def __init__(
+        self,
+        states: dict[str, str | dict[str, Any]] | None = None,
+        token: str = DEFAULT_TOKEN,
+        *,
+        keepalive_timeout: float | None = None,
+        connect_latency: float = 0.0,
+        latency: float = 0.0,
+        failure_rate: float = 0.0,
+        seed: int | None = None,
+    ):
+        """`states` maps entity ids to a state string, or to a dict with
+        `state` and `attributes` for entities whose attributes matter.
+
+        `keepalive_timeout` closes an HTTP connection idle for that long, the
+        way Home Assistant does after 75 seconds. `connect_latency` delays the
+        first request on every new connection by that much, standing in for
+        the TCP and TLS setup that costs next to nothing on localhost.
+
+        `latency` delays every REST reply, and `failure_rate` is the fraction
+        of REST requests answered 503 instead, both adjustable while running.
+        `seed` makes the synthetic entities, the churn and the failures
+        repeatable.
+        """
+        self.token = token
+        self.keepalive_timeout = keepalive_timeout
+        self.connect_latency = connect_latency
+        # How many connections have been accepted, WebSocket ones included.
+        self.connections_accepted = 0
+        self._lock = threading.Lock()
+        self._states: dict[str, dict[str, Any]] = {}
+        self._subscriptions: list[_Subscription] = []
+        self._connections: set[_ServerConnection] = set()
+        self._server: ThreadingHTTPServer | None = None
+        self._thread: threading.Thread | None = None
+        # (transport, domain, service, data) for every call received, where
+        # transport is "websocket" or "rest".
+        self.service_calls: list[tuple[str, str, str, dict[str, Any]]] = []
+        # Seconds to sit on each service call before answering, the way a
+        # cloud light or a speaker does.
+        self.service_latency = 0.0
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self._rng = random.Random(seed)
+        # Statuses to answer the next REST requests with, in order.
+        self._failures: list[int] = []
+        # REST requests answered with an injected failure.
+        self.failures_injected = 0
+        self._churn: threading.Thread | None = None
+        self._churn_stop = threading.Event()
+        # State changes made by the churn thread.
+        self.churned = 0
+
+        for entity_id, value in (states or {}).items():
+            if isinstance(value, str):
+                self.set_state(entity_id, value)
+            else:
+                self.set_state(entity_id, value["state"], value.get("attributes") or {})
+
+    def start(self, host: str = "127.0.0.1", port: int = 0) -> Self:
+        """Serve on `host`:`port`. Port 0 picks a free one; see `url`."""
+        standin = self
+
+        class Handler(_Handler):
+            pass
+
+        Handler.standin = standin
+        Handler.timeout = self.keepalive_timeout
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="ha-standin", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.stop_churn()
+        self.drop_connections()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self) -> Self:
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    @property
+    def url(self) -> str:
+        if self._server is None:
+            raise RuntimeError("stand-in is not running")
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def websocket_url(self) -> str:
+        return self.url.replace("http://", "ws://", 1) + "/api/websocket"
+
+    @property
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return len(self._subscriptions)
+
+    def set_state(
+        self,
+        entity_id: str,
+        state: str,
+        attributes: dict[str, Any] | None = None,
+    ) -> None:
+        """Create or update an entity and tell every subscriber that cares.
+
+        Attributes are replaced wholesale when given, and kept when not.
+        """
+        now = time.time()
+        with self._lock:
+            old = self._states.get(entity_id)
+            new = {
+                "entity_id": entity_id,
+                "state": state,
+                "attributes": dict(
+                    attributes
+                    if attributes is not None
+                    else (old["attributes"] if old else {})
+                ),
+                "last_changed": now
+                if old is None or old["state"] != state
+                else old["last_changed"],
+                "last_updated": now,
+            }
+            self._states[entity_id] = new
+
+            for subscription in self._subscriptions:
+                if not subscription.wants(entity_id):
+                    continue
+                if old is None:
+                    subscription.send({"a": {entity_id: _compress(new)}})
+                else:
+                    subscription.send({"c": {entity_id: _diff(old, new)}})
+
+    def populate(self, count: int) -> list[str]:
+        """Add `count` synthetic entities and return their ids.
+
+        Each carries the handful of attributes a real one does, so a states
+        fetch weighs roughly what it would from a house that size.
+        """
+        entity_ids = []
+        for i in range(count):
+            domain = _SYNTHETIC_DOMAINS[i % len(_SYNTHETIC_DOMAINS)]
+            entity_id = f"{domain}.standin_{i}"
+            if domain == "sensor":
+                state = f"{self._rng.uniform(15, 25):.1f}"
+            else:
+                state = self._rng.choice(("on", "off"))
+            self.set_state(
+                entity_id,
+                state,
+                {"friendly_name": f"Stand-in {domain} {i}", **_SYNTHETIC_ATTRIBUTES},
+            )
+            entity_ids.append(entity_id)
+        return entity_ids
+
+    def start_churn(self, rate: float, entity_ids: Iterable[str] | None = None) -> None:
+        """Change `rate` random states a second until stop_churn().
+
+        Picks from `entity_ids`, or from every entity when not given.
+        """
+        self.stop_churn()
+        if rate <= 0:
+            return
+        with self._lock:
+            pool = list(entity_ids) if entity_ids is not None else list(self._states)
+        if not pool:
+            return
+        self._churn_stop.clear()
+        self._churn = threading.Thread(
+            target=self._run_churn,
+            args=(rate, pool),
+            name="ha-standin-churn",
+            daemon=True,
+        )
+        self._churn.start()
+
+    def stop_churn(self) -> None:
+        if self._churn is None:
+            return
+        self._churn_stop.set()
+        self._churn.join()
+        self._churn = None
+
+    def _run_churn(self, rate: float, entity_ids: list[str]) -> None:
+        interval = 1.0 / rate
+        deadline = time.monotonic()
+        while True:
+            # Paced on a deadline, so the rate holds however long set_state
+            # takes with many subscribers to tell.
+            deadline += interval
+            if self._churn_stop.wait(max(0.0, deadline - time.monotonic())):
+                return
+            entity_id = self._rng.choice(entity_ids)
+            current = self.get_state(entity_id)
+            if current is None:
+                continue
+            domain = entity_id.partition(".")[0]
+            self.set_state(entity_id, _next_state(domain, current["state"], self._rng))
+            with self._lock:
+                self.churned += 1
+
+    def fail_next(self, count: int = 1, status: int = 503) -> None:
+        """Answer the next `count` REST requests with `status`."""
+        with self._lock:
+            self._failures.extend([status] * count)
+
+    def _injected_failure(self) -> int | None:
+        """The status to fail this REST request with, if any."""
+        with self._lock:
+            if self._failures:
+                status = self._failures.pop(0)
+            elif self.failure_rate and self._rng.random() < self.failure_rate:
+                status = 503
+            else:
+                return None
+            self.failures_injected += 1
+            return status
+
+    def get_state(self, entity_id: str) -> dict[str, Any] | None:
+        with self._lock:
+            state = self._states.get(entity_id)
+            return json.loads(json.dumps(state)) if state is not None else None
+
+    def all_states(self) -> list[dict[str, Any]]:
+        with self._lock:
+            return json.loads(json.dumps(list(self._states.values())))
+
+    def call_service(
+        self, transport: str, domain: str, service: str, data: dict[str, Any]
+    ) -> bool:
+        """Run a service the way Home Assistant would. False if unknown."""
+        with self._lock:
+            self.service_calls.append((transport, domain, service, dict(data)))
+        if self.service_latency:
+            time.sleep(self.service_latency)
+        effect = _SERVICE_STATES.get(service)
+        if effect is None:
+            return False
+
+        entity_ids = data.get("entity_id") or []
+        if isinstance(entity_ids, str):
+            entity_ids = [entity_ids]
+        attributes = {k: v for k, v in data.items() if k != "entity_id"}
+        if service == "volume_set":
+            attributes = {"volume_level": attributes.get("volume_level", 0.0)}
+        for entity_id in self._known(entity_ids):
+            current = self.get_state(entity_id)
+            self.set_state(
+                entity_id,
+                effect(domain, current["state"]),
+                {**current["attributes"], **attributes},
+            )
+        return True
+
+    def _known(self, entity_ids: Iterable[str]) -> list[str]:
+        with self._lock:
+            return [e for e in entity_ids if e in self._states]
+
+    def remove_state(self, entity_id: str) -> None:
+        with self._lock:
+            if self._states.pop(entity_id, None) is None:
+                return
+            for subscription in self._subscriptions:
+                if subscription.wants(entity_id):
+                    subscription.send({"r": [entity_id]})
+
+    def drop_connections(self) -> None:
+        """Close every WebSocket, the way a Home Assistant restart would."""
+        with self._lock:
+            connections = list(self._connections)
+        for connection in connections:
+            connection.close()
+
+    def _serve_websocket(self, connection: _ServerConnection) -> None:
+        with self._lock:
+            self._connections.add(connection)
+        try:
+            self._websocket_session(connection)
+        except (OSError, WebSocketException, ValueError):
+            pass
+        finally:
+            with self._lock:
+                self._connections.discard(connection)
+                self._subscriptions = [
+                    s for s in self._subscriptions if s.connection is not connection
+                ]
+            connection.close()
+
+    def _websocket_session(self, connection: _ServerConnection) -> None:
+        def send(message: dict[str, Any]) -> None:
+            connection.send_text(json.dumps(message))
+
+        send({"type": "auth_required", "ha_version": "standin"})
+        auth = json.loads(connection.recv_text())
+        if auth.get("type") != "auth" or auth.get("access_token") != self.token:
+            send({"type": "auth_invalid", "message": "Invalid access token"})
+            return
+        send({"type": "auth_ok", "ha_version": "standin"})
+
+        while True:
+            message = json.loads(connection.recv_text())
+            msg_id = message.get("id")
+            kind = message.get("type")
+
+            if kind == "ping":
+                send({"id": msg_id, "type": "pong"})
+            elif kind == "subscribe_entities":
+                subscription = _Subscription(
+                    connection, msg_id, message.get("entity_ids")
+                )
+                # Registered and snapshotted under one lock, so no change can
+                # land between the two and be missed.
+                with self._lock:
+                    send({"id": msg_id, "type": "result", "success": True})
+                    subscription.send(
+                        {
+                            "a": {
+                                entity_id: _compress(state)
+                                for entity_id, state in self._states.items()
+                                if subscription.wants(entity_id)
+                            }
+                        }
+                    )
+                    self._subscriptions.append(subscription)
+            elif kind == "call_service":
+                data = dict(message.get("service_data") or {})
+                domain, service = message.get("domain"), message.get("service")
+                if self.call_service("websocket", domain, service, data):
+                    send({"id": msg_id, "type": "result", "success": True})
+                else:
+                    send(
+                        {
+                            "id": msg_id,
+                            "type": "result",
+                            "success": False,
+                            "error": {
+                                "code": "not_found",
+                                "message": f"Service {domain}.{service} not found.",
+                            },
+                        }
+                    )
+            else:
+                send(
+                    {
+                        "id": msg_id,
+                        "type": "result",
+                        "success": False,
+                        "error": {
+                            "code": "unknown_command",
+                            "message": "Unknown command.",
+                        },
+                    }
+                )
+
+
+class _Handler(BaseHTTPRequestHandler):
+    standin: HomeAssistantStandIn
+    protocol_version = "HTTP/1.1"
+    # As aiohttp does for Home Assistant. Otherwise a reply written in two
+    # parts waits out the client's delayed ACK, some 40 ms, on every request.
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        with self.standin._lock:
+            self.standin.connections_accepted += 1
+        if self.standin.connect_latency:
+            time.sleep(self.standin.connect_latency)
+
+    def do_GET(self):
+        if (
+            self.path == "/api/websocket"
+            and self.headers.get("Upgrade", "").lower() == "websocket"
+        ):
+            self._upgrade()
+            return
+        if not self._authorized() or self._failed():
+            return
+        if self.path == "/api/":
+            self._reply(200, {"message": "API running."})
+        elif self.path == "/api/states":
+            self._reply(200, self.standin.all_states())
+        elif self.path.startswith("/api/states/"):
+            state = self.standin.get_state(self.path.removeprefix("/api/states/"))
+            if state is None:
+                self._reply(404, {"message": "Entity not found."})
+            else:
+                self._reply(200, state)
+        else:
+            self._reply(404, {"message": "Not found"})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        if not self._authorized() or self._failed():
+            return
+        parts = self.path.split("/")
+        if len(parts) != 5 or parts[:3] != ["", "api", "services"]:
+            self._reply(404, {"message": "Not found"})
+            return
+        try:
+            data = json.loads(body or b"{}")
+        except ValueError:
+            self._reply(400, {"message": "Data should be valid JSON."})
+            return
+        if self.standin.call_service("rest", parts[3], parts[4], data):
+            self._reply(200, [])
+        else:
+            self._reply(400, {"message": f"Service {parts[3]}.{parts[4]} not found."})
+
+    def _authorized(self) -> bool:
+        if self.headers.get("Authorization") == f"Bearer {self.standin.token}":
+            return True
+        self._reply(401, {"message": "Unauthorized"})
+        return False
+
+    def _failed(self) -> bool:
+        """Answer with an injected failure, if one is due."""
+        status = self.standin._injected_failure()
+        if status is None:
+            return False
+        self._reply(status, {"message": "Injected failure"})
+        return True
+
+    def _reply(self, status: int, payload: Any) -> None:
+        # With a Content-Length the connection stays open for the next
+        # request, as it would against Home Assistant.
+        body = json.dumps(payload).encode()
+        if self.standin.latency:
+            time.sleep(self.standin.latency)
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _upgrade(self) -> None:
+        request = Request(self.path, Headers(self.headers.items()))
+        response = ServerProtocol().accept(request)
+        self.wfile.write(response.serialize())
+        self.wfile.flush()
+        self.close_connection = True
+        if response.status_code != 101:
+            return
+        # The keep-alive timeout is for HTTP. A subscription is silent for as
+        # long as the house is.
+        self.connection.settimeout(None)
+        self.standin._serve_websocket(_ServerConnection(self.connection))
+
+    def log_message(self, format, *args):
+        logger.debug("stand-in: " + format, *args)
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m ha_launchpad.infrastructure.ha.standin",
+        description="Serve a stand-in Home Assistant for benchmarks and offline use.",
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8123)
+    parser.add_argument("--token", default=DEFAULT_TOKEN)
+    parser.add_argument(
+        "--entities", type=int, default=500, help="synthetic entities to serve"
+    )
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="seconds added to each REST reply"
+    )
+    parser.add_argument(
+        "--service-latency",
+        type=float,
+        default=0.0,
+        help="seconds each service call takes to run",
+    )
+    parser.add_argument(
+        "--churn", type=float, default=0.0, help="state changes per second"
+    )
+    parser.add_argument(
+        "--failure-rate",
+        type=float,
+        default=0.0,
+        help="fraction of REST requests answered 503",
+    )
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    standin = HomeAssistantStandIn(
+        token=args.token,
+        latency=args.latency,
+        failure_rate=args.failure_rate,
+        seed=args.seed,
+    )
+    standin.service_latency = args.service_latency
+    standin.populate(args.entities)
+    standin.start(args.host, args.port)
+    standin.start_churn(args.churn)
+    logger.info("Serving %d entities at %s", args.entities, standin.url)
+    logger.info("HA_URL=%s HA_TOKEN=%s", standin.url, standin.token)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        standin.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""Decode `/api/states` a chunk at a time, keeping only the watched entities.
+
+`resp.json()` over the whole body builds a dict for every attribute of every
+entity in the house -- several thousand objects per poll -- all alive at once,
+and the renderer throws nearly all of them away. This reads the body as it
+arrives and decodes it one state at a time, with the json module's C scanner,
+keeping only the watched entities and attributes. At most one state the board
+does not show is held at a time, rather than the whole house.
+
+Each state is decoded whole, unwatched ones included. That is what tells a
+state from an attribute shaped like one -- a group or scene listing
+`{"entity_id": ...}` objects -- which is inside the state that holds it and
+never taken for the entity it names. Finding states with a regular expression
+and skipping the rest unparsed was quicker, but could not tell the two apart,
+and every way of counting brackets past the strings that was tried cost more
+in Python than the scanner does in C.
+
+A body that is not an array is decoded whole, so that json says what is wrong
+with it.
+"""
+
+import codecs
+import json
+import re
+from collections.abc import Iterable
+from typing import Any
+
+_ARRAY_START = re.compile(r"\s*\[")
+# What separates two states, and the spaces a pretty-printing proxy might add.
+_BETWEEN = re.compile(r"[\s,]*")
+
+_decoder = json.JSONDecoder()
+
+
+class StatesDecoder:
+    """Feed it the body in chunks, then `finish()` for the entity_id map."""
+
+    def __init__(self, entity_ids: Iterable[str], attributes: Iterable[str]):
+        self._entity_ids = frozenset(entity_ids)
+        self._attributes = frozenset(attributes)
+        self._text = codecs.getincrementaldecoder("utf-8")()
+        self._buffer = ""
+        self._states: dict[str, dict[str, Any]] = {}
+        # Every state in the body, watched or not.
+        self.states_seen = 0
+        # None until the start of the body has been seen and checked.
+        self._streaming: bool | None = None
+        # A state has started but not yet been decoded.
+        self._pending = False
+
+    def feed(self, chunk: bytes) -> None:
+        self._buffer += self._text.decode(chunk)
+
+        if self._streaming is None:
+            self._check_layout()
+        if self._streaming:
+            self._scan()
+
+    def finish(self) -> dict[str, dict[str, Any]]:
+        """The watched states, by entity id.
+
+        Raises ValueError if the body turned out not to be valid JSON.
+        """
+        self._buffer += self._text.decode(b"", final=True)
+
+        if self._streaming is None:
+            self._check_layout()
+        if self._streaming:
+            self._scan()
+            if self._pending:
+                raise ValueError("body ended inside a state")
+            return self._states
+
+        for state in json.loads(self._buffer):
+            self.states_seen += 1
+            self._keep(state)
+        return self._states
+
+    def _check_layout(self) -> None:
+        opening = _ARRAY_START.match(self._buffer)
+        if opening is not None:
+            self._streaming = True
+            # The scan starts at the first state.
+            self._buffer = self._buffer[opening.end() :]
+        elif self._buffer.strip():
+            # Not an array at all. Let the full decoder say what is wrong.
+            self._streaming = False
+
+    def _scan(self) -> None:
+        buffer = self._buffer
+        position = 0
+        self._pending = False
+        while True:
+            position = _BETWEEN.match(buffer, position).end()
+            if position == len(buffer) or buffer[position] == "]":
+                break
+            try:
+                state, end = _decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                # Most likely cut off at the end of this chunk. Keep it, and
+                # try again once more has arrived.
+                self._pending = True
+                break
+            self.states_seen += 1
+            if isinstance(state, dict):
+                self._keep(state)
+            position = end
+
+        if position:
+            self._buffer = buffer[position:]
+
+    def _keep(self, state: dict[str, Any]) -> None:
+        entity_id = state.get("entity_id")
+        if entity_id not in self._entity_ids:
+            return
+        attributes = state.get("attributes") or {}
+        self._states[entity_id] = {
+            "entity_id": entity_id,
+            "state": state.get("state"),
+            "attributes": {
+                key: attributes[key] for key in self._attributes if key in attributes
+            },
+        }
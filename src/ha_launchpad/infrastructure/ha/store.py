@@ -0,0 +1,127 @@
+"""One shared picture of the watched entities, for every transport to write.
+
+The poller, the push subscription and single-entity reads all learn entity
+states, and until now each kept what it learned to itself. A media or volume
+press then fetched `/api/states/<id>` before acting, although the poller had
+read that very entity a second earlier.
+
+Every transport writes into this store instead, stamped with when it was
+learned, and a command reads from it while the entry is recent enough. An
+entity the push subscription covers counts as current for as long as the
+subscription is live, however long ago it last changed: any change would
+have been pushed.
+"""
+
+import itertools
+import threading
+import time
+from collections.abc import Iterable, Mapping
+from typing import Any
+
+
+class _Entry:
+    __slots__ = ("fetched_at", "stale", "state", "version")
+
+    def __init__(self, state: dict[str, Any], version: int, fetched_at: float):
+        self.state = state
+        self.version = version
+        self.fetched_at = fetched_at
+        # Set after a call that will have changed the entity, until the
+        # change is read back.
+        self.stale = False
+
+
+class EntityStore:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: dict[str, _Entry] = {}
+        self._live: frozenset[str] = frozenset()
+        # Versions come from one counter, so they never repeat: not even for
+        # an entity that disappears and comes back.
+        self._versions = itertools.count(1)
+
+    def put(self, entity_id: str, state: dict[str, Any]) -> None:
+        """Record a state just learned for one entity."""
+        now = time.monotonic()
+        with self._lock:
+            self._write(entity_id, state, now)
+
+    def replace(self, states: Mapping[str, dict[str, Any]], covered: Iterable[str]):
+        """Record a complete read of the `covered` entities.
+
+        A covered entity missing from `states` is one Home Assistant does not
+        know, and is dropped.
+        """
+        now = time.monotonic()
+        with self._lock:
+            for entity_id in covered:
+                state = states.get(entity_id)
+                if state is None:
+                    self._entries.pop(entity_id, None)
+                else:
+                    self._write(entity_id, state, now)
+
+    def touch(self, entity_ids: Iterable[str]) -> None:
+        """Mark entries as just confirmed, without having changed."""
+        now = time.monotonic()
+        with self._lock:
+            for entity_id in entity_ids:
+                entry = self._entries.get(entity_id)
+                if entry is not None:
+                    entry.fetched_at = now
+                    entry.stale = False
+
+    def remove(self, entity_id: str) -> None:
+        with self._lock:
+            self._entries.pop(entity_id, None)
+
+    def invalidate(self, entity_id: str, seen_version: int | None = None) -> None:
+        """Stop trusting an entry until it has been read again.
+
+        For after a call that changed the entity: what is held is from before
+        it, and the next press must not act on that. With `seen_version`, the
+        version held when the call was made, an entry that has moved on since
+        is already the read-back and is left alone.
+        """
+        with self._lock:
+            entry = self._entries.get(entity_id)
+            if entry is None:
+                return
+            if seen_version is not None and entry.version > seen_version:
+                return
+            entry.stale = True
+
+    def set_live(self, entity_ids: Iterable[str]) -> None:
+        """Entities a live subscription is keeping current. Empty when none."""
+        with self._lock:
+            self._live = frozenset(entity_ids)
+
+    def get(self, entity_id: str, max_age: float) -> dict[str, Any] | None:
+        """The entity's state if it was learned within `max_age` seconds, or
+        is kept current by push. None when it has to be read afresh."""
+        with self._lock:
+            entry = self._entries.get(entity_id)
+            if entry is None or entry.stale:
+                return None
+            if entity_id in self._live:
+                return entry.state
+            if time.monotonic() - entry.fetched_at > max_age:
+                return None
+            return entry.state
+
+    def version(self, entity_id: str) -> int:
+        """Grows each time the entity's state changes. 0 if not held."""
+        with self._lock:
+            entry = self._entries.get(entity_id)
+            return entry.version if entry is not None else 0
+
+    def _write(self, entity_id: str, state: dict[str, Any], now: float) -> None:
+        entry = self._entries.get(entity_id)
+        if entry is None:
+            self._entries[entity_id] = _Entry(state, next(self._versions), now)
+            return
+        if entry.state != state:
+            entry.state = state
+            entry.version = next(self._versions)
+        entry.fetched_at = now
+        entry.stale = False
@@ -0,0 +1,488 @@
+"""Push transport over Home Assistant's WebSocket API.
+
+Polling `/api/states` downloads every entity in the house to learn about the
+thirty or so the board shows, and does it forty times a minute whether or not
+anything changed. `subscribe_entities` sends the watched entities once and then
+only what changes about them, so the board hears about a lamp the moment Home
+Assistant does and the network is quiet the rest of the time.
+
+Polling stays as the fallback. While this transport is not live -- not yet
+connected, reconnecting, or refused -- the controller goes back to fetching.
+
+The same connection carries service calls, once authenticated. A press then
+costs one frame on a socket that is already open, instead of an HTTP request
+that may have to reconnect after the board has been idle.
+"""
+
+import json
+import logging
+import threading
+from collections.abc import Callable, Iterable
+from concurrent.futures import Future
+from typing import Any
+
+from websockets.exceptions import ConnectionClosed, WebSocketException
+from websockets.sync.client import ClientConnection, connect
+
+from ha_launchpad.config.settings import (
+    HA_PUSH_MAX_DELAY,
+    HA_PUSH_RETRY_DELAY,
+)
+from ha_launchpad.infrastructure.ha.store import EntityStore
+
+logger = logging.getLogger(__name__)
+
+# Connect and handshake budget, and how long closing may wait for the peer.
+CONNECT_TIMEOUT = 5.0
+# Silence after which Home Assistant is asked whether it is still there. A
+# subscription to a quiet house can legitimately say nothing for hours, so
+# silence on its own proves nothing; an unanswered ping does.
+PING_INTERVAL = 30.0
+# How long a service call may take to be answered. The same budget as the
+# REST path's read timeout: a cloud light or a Sonos can be that slow.
+SERVICE_TIMEOUT = 10.0
+# Far beyond anything Home Assistant sends for a filtered subscription, but a
+# snapshot of a whole house can pass the library's 1 MiB default.
+MAX_MESSAGE_BYTES = 16 * 1024 * 1024
+
+# Keys of the compressed state format subscribe_entities uses, from
+# homeassistant/components/websocket_api/messages.py.
+_ADDED = "a"
+_CHANGED = "c"
+_REMOVED = "r"
+_STATE = "s"
+_ATTRIBUTES = "a"
+_DIFF_ADDITIONS = "+"
+_DIFF_REMOVALS = "-"
+
+
+class PushRefused(Exception):
+    """Home Assistant answered, but would not authenticate or subscribe."""
+
+
+def websocket_url(url: str) -> str:
+    """The WebSocket endpoint behind a Home Assistant base URL.
+
+    `http://ha:8123` becomes `ws://ha:8123/api/websocket`, and https becomes
+    wss, so the one HA_URL setting covers both transports.
+    """
+    url = url.rstrip("/")
+    for http, ws in (("https://", "wss://"), ("http://", "ws://")):
+        if url.startswith(http):
+            url = ws + url[len(http) :]
+            break
+    return f"{url}/api/websocket"
+
+
+def apply_entity_event(
+    states: dict[str, dict[str, Any]], event: dict[str, Any]
+) -> set[str]:
+    """Fold one subscribe_entities event into `states`, in place.
+
+    Entries are replaced rather than mutated, so a snapshot taken earlier never
+    changes underneath whoever is holding it. Returns the entity ids that
+    changed.
+    """
+    changed: set[str] = set()
+
+    for entity_id, compressed in event.get(_ADDED, {}).items():
+        states[entity_id] = {
+            "entity_id": entity_id,
+            "state": compressed.get(_STATE),
+            "attributes": dict(compressed.get(_ATTRIBUTES) or {}),
+        }
+        changed.add(entity_id)
+
+    for entity_id, diff in event.get(_CHANGED, {}).items():
+        previous = states.get(entity_id)
+        if previous is None:
+            # A change to something never announced: nothing to apply it to.
+            # The next resync will bring it in whole.
+            continue
+
+        additions = diff.get(_DIFF_ADDITIONS, {})
+        removals = diff.get(_DIFF_REMOVALS, {})
+
+        attributes = dict(previous["attributes"])
+        attributes.update(additions.get(_ATTRIBUTES) or {})
+        for key in removals.get(_ATTRIBUTES) or ():
+            attributes.pop(key, None)
+
+        states[entity_id] = {
+            "entity_id": entity_id,
+            "state": additions.get(_STATE, previous["state"]),
+            "attributes": attributes,
+        }
+        changed.add(entity_id)
+
+    for entity_id in event.get(_REMOVED, ()):
+        if states.pop(entity_id, None) is not None:
+            changed.add(entity_id)
+
+    return changed
+
+
+class HomeAssistantWebSocket:
+    """A self-healing `subscribe_entities` subscription on its own thread.
+
+    Holds the latest state of every watched entity in the same shape
+    `/api/states` returns, and calls `on_change` with the ids that moved. After
+    any gap -- a dropped connection, a Home Assistant restart -- it reconnects
+    with backoff and resubscribes, and the fresh snapshot that comes back
+    replaces everything held, so nothing missed during the gap survives.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        token: str,
+        on_change: Callable[[set[str]], None] | None = None,
+        *,
+        retry_delay: float = HA_PUSH_RETRY_DELAY,
+        max_delay: float = HA_PUSH_MAX_DELAY,
+        store: EntityStore | None = None,
+    ):
+        self.url = url
+        self._token = token
+        self.on_change = on_change
+        # Shared with the HTTP client, so a press acts on what was pushed.
+        self.store = store
+        self._retry_delay = retry_delay
+        self._max_delay = max_delay
+
+        self._entity_ids: frozenset[str] = frozenset()
+        self._states: dict[str, dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._live = threading.Event()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._connection: ClientConnection | None = None
+        self._next_id = 1
+        # The connection once authenticated, which is when it can take calls.
+        self._authenticated: ClientConnection | None = None
+        # Calls sent and not yet answered, by message id.
+        self._pending: dict[int, Future] = {}
+
+        # Set when Home Assistant rejected the token. Push gives up for good,
+        # and the polling fallback then meets the same rejection and reports
+        # it the way it always has.
+        self.unauthorized = False
+        # Same idea as the HTTP client's: report an outage once, not per retry.
+        self._offline = False
+
+    def watch(self, entity_ids: Iterable[str]) -> None:
+        """Set the entities to subscribe to. Takes effect on the next connect."""
+        self._entity_ids = frozenset(entity_ids)
+
+    @property
+    def is_live(self) -> bool:
+        """Whether `snapshot()` is current: subscribed and fully synced."""
+        return self._live.is_set()
+
+    def snapshot(self) -> dict[str, dict[str, Any]]:
+        """The latest known state of every watched entity, by entity id."""
+        with self._lock:
+            return dict(self._states)
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="ha-websocket", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        connection = self._connection
+        if connection is not None:
+            connection.close()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=CONNECT_TIMEOUT)
+        self._thread = None
+        self._go_offline()
+
+    def _run(self) -> None:
+        attempt = 0
+        while not self._stop.is_set():
+            try:
+                self._session()
+            except PushRefused as exc:
+                logger.error("Home Assistant refused the push connection: %s", exc)
+                return
+            except (OSError, ValueError, WebSocketException) as exc:
+                # Closing the link is how stop() ends a session; not an outage.
+                if not self._stop.is_set():
+                    self._report_unreachable(exc)
+            finally:
+                # A session that synced is a fresh gap when it ends, however it
+                # ended, rather than a continuing outage: retry quickly. Most
+                # end by the link dropping, which raises.
+                if self._live.is_set():
+                    attempt = 0
+                self._go_offline()
+                self._connection = None
+
+            if self._stop.is_set():
+                return
+
+            attempt += 1
+            delay = min(self._retry_delay * (2 ** (attempt - 1)), self._max_delay)
+            logger.debug("Push reconnecting in %.1fs", delay)
+            if self._stop.wait(delay):
+                return
+
+    def _session(self) -> None:
+        """Connect, authenticate, subscribe and stream until the link drops."""
+        with connect(
+            self.url,
+            open_timeout=CONNECT_TIMEOUT,
+            close_timeout=CONNECT_TIMEOUT,
+            # Home Assistant is pinged at the API level instead, below, which
+            # also proves its event loop is still answering.
+            ping_interval=None,
+            max_size=MAX_MESSAGE_BYTES,
+        ) as connection:
+            self._connection = connection
+            if self._stop.is_set():
+                return
+
+            try:
+                self._authenticate(connection)
+                with self._lock:
+                    self._authenticated = connection
+                subscription = self._subscribe(connection)
+                self._stream(connection, subscription)
+            finally:
+                with self._lock:
+                    self._authenticated = None
+
+    def _authenticate(self, connection: ClientConnection) -> None:
+        greeting = self._recv(connection, CONNECT_TIMEOUT)
+        if greeting.get("type") != "auth_required":
+            raise ConnectionError(f"unexpected greeting {greeting.get('type')!r}")
+
+        self._send(connection, {"type": "auth", "access_token": self._token})
+        reply = self._recv(connection, CONNECT_TIMEOUT)
+        if reply.get("type") == "auth_invalid":
+            self.unauthorized = True
+            raise PushRefused(reply.get("message", "access token rejected"))
+        if reply.get("type") != "auth_ok":
+            raise ConnectionError(f"unexpected auth reply {reply.get('type')!r}")
+
+    def _subscribe(self, connection: ClientConnection) -> int:
+        request: dict[str, Any] = {"type": "subscribe_entities"}
+        if self._entity_ids:
+            request["entity_ids"] = sorted(self._entity_ids)
+        return self._send(connection, request)
+
+    def _stream(self, connection: ClientConnection, subscription: int) -> None:
+        # The first event after subscribing is a complete snapshot of the
+        # watched entities. Until it has been applied, what is held may be
+        # from before a gap, and the transport does not claim to be live.
+        resynced = False
+        awaiting_pong = False
+
+        while not self._stop.is_set():
+            try:
+                raw = connection.recv(timeout=PING_INTERVAL)
+            except TimeoutError:
+                if awaiting_pong:
+                    raise ConnectionError("ping went unanswered") from None
+                self._send(connection, {"type": "ping"})
+                awaiting_pong = True
+                continue
+
+            awaiting_pong = False
+            message = json.loads(raw)
+
+            if message.get("type") == "result" and self._answer(message):
+                continue
+
+            if message.get("id") != subscription:
+                continue
+
+            if message.get("type") == "result":
+                if not message.get("success", False):
+                    error = message.get("error") or {}
+                    raise PushRefused(error.get("message", "subscription refused"))
+                continue
+
+            if message.get("type") != "event":
+                continue
+
+            event = message.get("event") or {}
+            if not resynced:
+                changed = self._resync(event)
+                resynced = True
+                self._report_reachable()
+                self._live.set()
+            else:
+                with self._lock:
+                    changed = apply_entity_event(self._states, event)
+                    current = {e: self._states.get(e) for e in changed}
+                if self.store is not None:
+                    for entity_id, state in current.items():
+                        if state is None:
+                            self.store.remove(entity_id)
+                        else:
+                            self.store.put(entity_id, state)
+
+            if changed:
+                self._notify(changed)
+
+    def _resync(self, event: dict[str, Any]) -> set[str]:
+        """Replace everything held with a fresh snapshot; report what moved."""
+        fresh: dict[str, dict[str, Any]] = {}
+        apply_entity_event(fresh, event)
+
+        with self._lock:
+            previous = self._states
+            self._states = fresh
+
+        if self.store is not None:
+            covered = self._entity_ids or fresh.keys()
+            self.store.replace(fresh, covered)
+            self.store.set_live(covered)
+
+        return {
+            entity_id
+            for entity_id in previous.keys() | fresh.keys()
+            if previous.get(entity_id) != fresh.get(entity_id)
+        }
+
+    def call_service(
+        self,
+        domain: str,
+        service: str,
+        data: dict[str, Any],
+        timeout: float = SERVICE_TIMEOUT,
+    ) -> bool | None:
+        """Call a service over the open connection and wait for the answer.
+
+        Returns None if the call could not be sent -- no authenticated
+        connection, or it failed mid-send -- and only then, so the caller can
+        safely make it some other way. Once a call is on the wire it is never
+        sent again: a `light.toggle` that timed out may well have run, and a
+        second one would flip the light straight back. Such a call is
+        reported as failed instead, as is one whose connection dropped before
+        the answer came.
+        """
+        connection = self._authenticated
+        if connection is None:
+            return None
+
+        future: Future = Future()
+        with self._lock:
+            # Checked again where the call is registered. If the link went
+            # offline since, its calls have already been failed, and this one
+            # would wait out the whole timeout for an answer nobody will match.
+            if self._authenticated is not connection:
+                return None
+            msg_id = self._next_id
+            self._next_id += 1
+            self._pending[msg_id] = future
+
+        message = {
+            "id": msg_id,
+            "type": "call_service",
+            "domain": domain,
+            "service": service,
+            "service_data": data,
+        }
+        try:
+            try:
+                connection.send(json.dumps(message))
+            except (OSError, ConnectionClosed):
+                # At most part of the frame went out, and Home Assistant
+                # acts on nothing less than a whole one.
+                return None
+
+            try:
+                reply = future.result(timeout)
+            except TimeoutError:
+                logger.error(
+                    "No answer to %s.%s within %.0fs", domain, service, timeout
+                )
+                return False
+        finally:
+            with self._lock:
+                self._pending.pop(msg_id, None)
+
+        if reply is None:
+            logger.error("Connection lost before %s.%s was answered", domain, service)
+            return False
+        if not reply.get("success", False):
+            error = reply.get("error") or {}
+            logger.error(
+                "Home Assistant refused %s.%s: %s",
+                domain,
+                service,
+                error.get("message", error.get("code", "unknown error")),
+            )
+            return False
+        return True
+
+    def _answer(self, message: dict[str, Any]) -> bool:
+        """Hand a result to the call waiting on it, if one is."""
+        with self._lock:
+            future = self._pending.pop(message.get("id"), None)
+        if future is None:
+            return False
+        future.set_result(message)
+        return True
+
+    def _go_offline(self) -> None:
+        self._live.clear()
+        if self.store is not None:
+            self.store.set_live(())
+        # Whatever was in flight may or may not have run. Its callers hear
+        # that it failed, and no call can join them from here on.
+        with self._lock:
+            self._authenticated = None
+            pending = list(self._pending.values())
+            self._pending.clear()
+        for future in pending:
+            future.set_result(None)
+
+    def _notify(self, changed: set[str]) -> None:
+        if self.on_change is None:
+            return
+        try:
+            self.on_change(changed)
+        except Exception:
+            # A rendering fault must not take the subscription down with it.
+            logger.warning("Push change handler failed", exc_info=True)
+
+    def _send(self, connection: ClientConnection, message: dict[str, Any]) -> int:
+        if message.get("type") != "auth":
+            with self._lock:
+                message = {"id": self._next_id, **message}
+                self._next_id += 1
+        connection.send(json.dumps(message))
+        return message.get("id", 0)
+
+    def _recv(self, connection: ClientConnection, timeout: float) -> dict:
+        try:
+            raw = connection.recv(timeout=timeout)
+        except TimeoutError:
+            raise ConnectionError("timed out waiting for Home Assistant") from None
+        return json.loads(raw)
+
+    def _report_unreachable(self, error) -> None:
+        if self._offline:
+            logger.debug("Push still unavailable: %s", error)
+            return
+        logger.warning("Push connection lost, falling back to polling: %s", error)
+        self._offline = True
+
+    def _report_reachable(self) -> None:
+        if self._offline:
+            logger.info("Push connection restored")
+            self._offline = False
+        else:
+            logger.info(
+                "Subscribed to %d entities over the WebSocket API",
+                len(self._entity_ids),
+            )
@@ -1,4 +1,5 @@
 from abc import ABC, abstractmethod
+from collections.abc import Callable, Iterable
 from typing import Any
 
 
@@ -19,6 +20,16 @@ class MidiBackend(ABC):
         for the colour lab, which addresses all 128 and has no names for them.
         """
 
+    def send_frame(self, pads: Iterable[tuple[int, int, int]]) -> None:
+        """Light several grid pads at once, each as (note, velocity, channel).
+
+        One send_velocity() per pad unless the backend can say it in fewer
+        messages. Repainting the whole board is the case that matters: 64
+        note-ons otherwise.
+        """
+        for note, velocity, channel in pads:
+            self.send_velocity(note, velocity, channel)
+
     @abstractmethod
     def send_cc(self, control: int, velocity: int, channel: int = 0) -> None:
         """Light one of the buttons around the grid with a raw palette entry.
@@ -31,6 +42,15 @@ class MidiBackend(ABC):
     def iter_incoming(self) -> Any | None:
         """Return an iterator for incoming messages."""
 
+    def listen(self, on_message: Callable[[Any], None]) -> bool:
+        """Hand every incoming message to on_message the moment it arrives.
+
+        It is called on whatever thread the backend reads on, and from then on
+        nothing is left for iter_incoming(). False if the backend cannot do
+        this, and input has to be polled.
+        """
+        return False
+
     @abstractmethod
     def is_connected(self) -> bool:
         """Check if the device is connected."""
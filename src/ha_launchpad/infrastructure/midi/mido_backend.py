@@ -1,6 +1,7 @@
 """MIDI backend using mido + python-rtmidi (RtMidi) for Launchpad access."""
 
 import logging
+from collections.abc import Iterable
 
 import mido
 import usb.core
@@ -21,8 +22,26 @@ logger = logging.getLogger(__name__)
 PROGRAMMER_MODE_SYSEX = [0x00, 0x20, 0x29, 0x02, 0x0D, 0x0E, 0x01]
 LIVE_MODE_SYSEX = [0x00, 0x20, 0x29, 0x02, 0x0D, 0x0E, 0x00]
 
+# Same reference, "LED lighting SysEx message": this header, then one colour
+# spec per LED of <lighting type> <LED index> <colour>. In programmer mode an
+# LED's index is its pad's note number.
+LED_LIGHTING_SYSEX = [0x00, 0x20, 0x29, 0x02, 0x0D, 0x03]
+# At most one spec per LED on the device in a single message.
+LED_SPECS_PER_MESSAGE = 81
+# MIDI channel -> lighting type: static and pulsing. Flashing takes two
+# colours in the SysEx where the note-on takes one, so it stays a note-on.
+_LIGHTING_TYPES = {0: 0x00, 2: 0x02}
+
 
 class MidoBackend(MidiBackend):
+    """The Launchpad over mido.
+
+    A write to an open port that fails raises. The writer thread reports it,
+    so that what the board is believed to show can be forgotten and written
+    again; swallowed here, the pad would stay wrong until something else
+    changed it.
+    """
+
     def __init__(self, ident: str | None = None):
         self.usb_device = None
         self.ident = ident or LAUNCHPAD_IDENT
@@ -83,12 +102,32 @@ class MidoBackend(MidiBackend):
             # Not a valid MIDI data byte; nothing on the device answers to it.
             logger.debug("send_velocity: skipping out-of-range note %s", note)
             return
-        try:
-            msg = mido.Message("note_on", note=note, velocity=velocity, channel=channel)
+        msg = mido.Message("note_on", note=note, velocity=velocity, channel=channel)
+        self.midi_out.send(msg)
+        logger.debug("Sent note (off)=%s channel=%s", note, channel)
+
+    def send_frame(self, pads: Iterable[tuple[int, int, int]]) -> None:
+        """Light every pad in one LED lighting SysEx, rather than a note-on
+        each. A whole-board repaint is one USB MIDI message, not 64."""
+        if not self.midi_out:
+            logger.debug("send_frame: output not open")
+            return
+        specs: list[int] = []
+        for note, velocity, channel in pads:
+            lighting = _LIGHTING_TYPES.get(channel)
+            if lighting is None or not 0 <= note <= 127:
+                # send_velocity() knows what to do with both.
+                self.send_velocity(note, velocity, channel)
+                continue
+            specs += (lighting, note, velocity)
+
+        step = LED_SPECS_PER_MESSAGE * 3
+        for start in range(0, len(specs), step):
+            msg = mido.Message(
+                "sysex", data=LED_LIGHTING_SYSEX + specs[start : start + step]
+            )
             self.midi_out.send(msg)
-            logger.debug("Sent note (off)=%s channel=%s", note, channel)
-        except Exception as exc:
-            logger.warning("Failed to send note=%s: %s", note, exc)
+        logger.debug("Sent frame of %d pad(s)", len(specs) // 3)
 
     def send_cc(self, control: int, velocity: int, channel: int = 0):
         if not self.midi_out:
@@ -97,19 +136,25 @@ class MidoBackend(MidiBackend):
         if not 0 <= control <= 127:
             logger.debug("send_cc: skipping out-of-range control %s", control)
             return
-        try:
-            msg = mido.Message(
-                "control_change", control=control, value=velocity, channel=channel
-            )
-            self.midi_out.send(msg)
-            logger.debug("Sent cc=%s value=%s channel=%s", control, velocity, channel)
-        except Exception as exc:
-            logger.warning("Failed to send cc=%s: %s", control, exc)
+        msg = mido.Message(
+            "control_change", control=control, value=velocity, channel=channel
+        )
+        self.midi_out.send(msg)
+        logger.debug("Sent cc=%s value=%s channel=%s", control, velocity, channel)
 
     def iter_incoming(self):
         # Return the input object which supports iteration over incoming messages.
         return self.midi_in
 
+    def listen(self, on_message) -> bool:
+        # rtmidi reads the port on a thread of its own, and mido calls this
+        # from it for each message, starting with any already waiting. Only
+        # mido's rtmidi ports take a callback.
+        if self.midi_in is None or not hasattr(self.midi_in, "callback"):
+            return False
+        self.midi_in.callback = on_message
+        return True
+
     def is_connected(self) -> bool:
         """Check if the USB device is still available."""
         self.usb_device = usb.core.find(
@@ -1,3 +1,4 @@
+from collections.abc import Callable, Iterable
 from typing import Any
 
 from ha_launchpad.utils.rotate_pad import inverse_rotation, rotate_pad
@@ -5,6 +6,14 @@ from ha_launchpad.utils.rotate_pad import inverse_rotation, rotate_pad
 from .interface import MidiBackend
 
 
+def rotate_incoming(msg, rotation: int):
+    """Turn a message from the hardware's pad numbering into the logical one."""
+    if hasattr(msg, "note"):
+        # Rotate from physical to logical
+        msg.note = rotate_pad(msg.note, rotation)
+    return msg
+
+
 class RotatedMidiIn:
     """Wrapper for MIDI input iterator that rotates incoming notes."""
 
@@ -26,10 +35,7 @@ class RotatedMidiIn:
             yield self._rotate_msg(msg)
 
     def _rotate_msg(self, msg):
-        if hasattr(msg, "note"):
-            # Rotate from physical to logical
-            msg.note = rotate_pad(msg.note, self._rotation)
-        return msg
+        return rotate_incoming(msg, self._rotation)
 
 
 class RotatedBackend(MidiBackend):
@@ -57,6 +63,15 @@ class RotatedBackend(MidiBackend):
         physical_note = rotate_pad(note, self._inv_rotation)
         self._backend.send_velocity(physical_note, velocity, channel)
 
+    def send_frame(self, pads: Iterable[tuple[int, int, int]]) -> None:
+        inv = self._inv_rotation
+        self._backend.send_frame(
+            [
+                (rotate_pad(note, inv), velocity, channel)
+                for note, velocity, channel in pads
+            ]
+        )
+
     def send_cc(self, control: int, velocity: int, channel: int = 0) -> None:
         # Deliberately not rotated. The buttons around the grid are physical
         # positions on the case, not squares in an 8x8 that can be turned; there
@@ -70,6 +85,12 @@ class RotatedBackend(MidiBackend):
             return None
         return RotatedMidiIn(source, self._rotation)
 
+    def listen(self, on_message: Callable[[Any], None]) -> bool:
+        rotation = self._rotation
+        return self._backend.listen(
+            lambda msg: on_message(rotate_incoming(msg, rotation))
+        )
+
     def is_connected(self) -> bool:
         return self._backend.is_connected()
 
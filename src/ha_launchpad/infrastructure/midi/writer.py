@@ -0,0 +1,204 @@
+"""Own the MIDI output on one thread, and keep only the newest colour per pad.
+
+Every thread that repaints -- the MIDI loop, the poll thread, the push thread
+-- used to write to the rtmidi output port itself, and wait while it did. A
+burst of changes to one pad went out as every colour it passed through, each
+one queued behind the last on a link that carries a full-board frame every
+few milliseconds at best.
+
+A write is now a note of what a pad or button should show, and it returns at
+once. A single writer thread takes whatever has built up and sends it as one
+frame, at most once every LAUNCHPAD_WRITE_INTERVAL. A pad written three times
+in the meantime is sent once, with the last colour. Only that thread touches
+the port, so two writers can no longer interleave on it.
+
+Until start(), and after stop(), writes go straight to the backend, as they
+did before there was a writer.
+
+A write that fails on the writer thread has nobody to raise to, so it is
+reported to `on_error` with the pads and buttons it was for, and whoever keeps
+track of what the board shows can forget them.
+"""
+
+import logging
+import threading
+import time
+from collections.abc import Callable, Iterable
+from typing import Any
+
+from ha_launchpad.config.mapping import COLORS
+from ha_launchpad.config.settings import LAUNCHPAD_WRITE_INTERVAL
+
+from .interface import MidiBackend
+
+logger = logging.getLogger(__name__)
+
+# How long stop() waits for the last writes to go out.
+STOP_TIMEOUT = 1.0
+
+
+class MidiWriter(MidiBackend):
+    def __init__(
+        self, backend: MidiBackend, interval: float = LAUNCHPAD_WRITE_INTERVAL
+    ):
+        self._backend = backend
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._ready = threading.Condition(self._lock)
+        # note -> (velocity, channel), and the same for the buttons around the
+        # grid, as they should be once the next flush has gone out.
+        self._pads: dict[int, tuple[int, int]] = {}
+        self._controls: dict[int, tuple[int, int]] = {}
+        self._thread: threading.Thread | None = None
+        self._stopping = False
+        self._last_flush = 0.0
+        self._queued = 0
+        self._coalesced = 0
+        self._flushes = 0
+        # Called from the writer thread with the notes and the control
+        # numbers of a write that failed.
+        self.on_error: Callable[[list[int], list[int]], None] | None = None
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stopping = False
+        self._thread = threading.Thread(
+            target=self._run, name="midi-writer", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Send what is still waiting, then go back to writing directly."""
+        thread = self._thread
+        if thread is None:
+            return
+        with self._ready:
+            self._stopping = True
+            self._ready.notify()
+        thread.join(STOP_TIMEOUT)
+        self._thread = None
+        # Anything written while it was finishing up.
+        with self._lock:
+            pads, self._pads = self._pads, {}
+            controls, self._controls = self._controls, {}
+        self._send(pads, controls)
+
+    def find_and_open(self) -> bool:
+        return self._backend.find_and_open()
+
+    def send_note(self, note: int, color: str, channel: int = 0) -> None:
+        if self._thread is None:
+            self._backend.send_note(note, color, channel)
+            return
+        self._queue(self._pads, note, COLORS.get(color, 0), channel)
+
+    def send_velocity(self, note: int, velocity: int, channel: int = 0) -> None:
+        if self._thread is None:
+            self._backend.send_velocity(note, velocity, channel)
+            return
+        self._queue(self._pads, note, velocity, channel)
+
+    def send_frame(self, pads: Iterable[tuple[int, int, int]]) -> None:
+        if self._thread is None:
+            self._backend.send_frame(pads)
+            return
+        with self._ready:
+            for note, velocity, channel in pads:
+                self._put(self._pads, note, velocity, channel)
+            self._ready.notify()
+
+    def send_cc(self, control: int, velocity: int, channel: int = 0) -> None:
+        if self._thread is None:
+            self._backend.send_cc(control, velocity, channel)
+            return
+        self._queue(self._controls, control, velocity, channel)
+
+    def iter_incoming(self) -> Any | None:
+        return self._backend.iter_incoming()
+
+    def listen(self, on_message: Callable[[Any], None]) -> bool:
+        return self._backend.listen(on_message)
+
+    def is_connected(self) -> bool:
+        return self._backend.is_connected()
+
+    def close(self) -> None:
+        self.stop()
+        self._backend.close()
+
+    def metrics(self) -> dict[str, int]:
+        """Writes taken, writes overtaken by a newer one for the same pad or
+        button before they went out, and flushes made."""
+        with self._lock:
+            return {
+                "queued": self._queued,
+                "coalesced": self._coalesced,
+                "flushes": self._flushes,
+            }
+
+    def _queue(
+        self, waiting: dict[int, tuple[int, int]], key: int, velocity: int, channel: int
+    ) -> None:
+        with self._ready:
+            self._put(waiting, key, velocity, channel)
+            self._ready.notify()
+
+    def _put(
+        self, waiting: dict[int, tuple[int, int]], key: int, velocity: int, channel: int
+    ) -> None:
+        self._queued += 1
+        if key in waiting:
+            self._coalesced += 1
+        waiting[key] = (velocity, channel)
+
+    def _run(self) -> None:
+        while True:
+            with self._ready:
+                while not (self._pads or self._controls or self._stopping):
+                    self._ready.wait()
+                if self._stopping and not (self._pads or self._controls):
+                    return
+
+            # Anything written while this waits joins the same flush.
+            delay = self._last_flush + self.interval - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+
+            with self._lock:
+                pads, self._pads = self._pads, {}
+                controls, self._controls = self._controls, {}
+                self._flushes += 1
+            self._last_flush = time.monotonic()
+            self._send(pads, controls)
+
+    def _send(
+        self, pads: dict[int, tuple[int, int]], controls: dict[int, tuple[int, int]]
+    ) -> None:
+        # Nobody is waiting on a write to raise to, and the thread has to
+        # survive for the next one.
+        failed_pads: list[int] = []
+        failed_controls: list[int] = []
+        try:
+            if len(pads) == 1:
+                ((note, (velocity, channel)),) = pads.items()
+                self._backend.send_velocity(note, velocity, channel)
+            elif pads:
+                self._backend.send_frame(
+                    [(note, v, ch) for note, (v, ch) in sorted(pads.items())]
+                )
+        except Exception:
+            logger.warning("MIDI write of %d pad(s) failed", len(pads), exc_info=True)
+            failed_pads = list(pads)
+        for control, (velocity, channel) in controls.items():
+            try:
+                self._backend.send_cc(control, velocity, channel)
+            except Exception:
+                logger.warning("MIDI write of cc=%s failed", control, exc_info=True)
+                failed_controls.append(control)
+
+        if (failed_pads or failed_controls) and self.on_error is not None:
+            try:
+                self.on_error(failed_pads, failed_controls)
+            except Exception:
+                logger.warning("MIDI write failure not recorded", exc_info=True)
@@ -0,0 +1,18 @@
+import time
+
+import pytest
+
+
+def _wait_for(condition, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.005)
+    return False
+
+
+@pytest.fixture
+def wait_for():
+    """Poll `condition` until it holds or `timeout` runs out. True if it held."""
+    return _wait_for
@@ -1,7 +1,9 @@
 import pytest
 import requests_mock
 
+from ha_launchpad.infrastructure.ha.breaker import BreakerState
 from ha_launchpad.infrastructure.ha.client import (
+    UNCHANGED,
     HomeAssistantClient,
     HomeAssistantUnauthorized,
 )
@@ -49,7 +51,7 @@ def test_toggle_entity_script(ha_client):
         assert m.called
 
 
-def test_volume_up(ha_client):
+def test_adjust_volume(ha_client):
     with requests_mock.Mocker() as m:
         # Mock initial state get
         m.get(
@@ -63,7 +65,7 @@ def test_volume_up(ha_client):
             additional_matcher=lambda r: round(r.json()["volume_level"], 2) == 0.57,
         )
 
-        success = ha_client.volume_up("media_player.test")
+        success = ha_client.adjust_volume("media_player.test", 0.07)
         assert success
 
 
@@ -249,3 +251,304 @@ def test_active_media_player_toggles_play_pause(ha_client):
 
         assert ha_client.toggle_entity("media_player.tv")
         assert m.request_history[-1].path.endswith("/media_play_pause")
+
+
+@pytest.fixture
+def watching_client(ha_client):
+    ha_client.watch({"light.a", "switch.b"}, {"brightness"})
+    return ha_client
+
+
+def test_state_map_is_rendered_by_the_template_endpoint(watching_client):
+    with requests_mock.Mocker() as m:
+        m.post(
+            "http://test.local/api/template",
+            text='{"light.a":{"state":"on","attributes":{ "brightness":120}},'
+            '"switch.b":null}',
+        )
+
+        states = watching_client.get_state_map()
+
+        assert states == {
+            "light.a": {
+                "entity_id": "light.a",
+                "state": "on",
+                "attributes": {"brightness": 120},
+            }
+        }
+        template = m.request_history[0].json()["template"]
+        assert '"light.a"' in template
+        assert '"switch.b"' in template
+        assert "brightness" in template
+
+
+@pytest.mark.parametrize("status", [400, 401, 404])
+def test_a_refused_template_falls_back_to_the_full_states(watching_client, status):
+    """A non-admin token gets 401 from /api/template and nothing else, so that
+    must read as "use the other endpoint", not "the token is dead"."""
+    with requests_mock.Mocker() as m:
+        m.post("http://test.local/api/template", status_code=status)
+        m.get(
+            "http://test.local/api/states",
+            json=[
+                {"entity_id": "light.a", "state": "on", "attributes": {}},
+                {"entity_id": "sensor.unwatched", "state": "1", "attributes": {}},
+            ],
+        )
+
+        first = watching_client.get_state_map()
+        second = watching_client.get_state_map()
+
+        assert set(first) == {"light.a"}
+        assert second == first
+        # Refused once, not asked again on every poll.
+        assert [r.path for r in m.request_history].count("/api/template") == 1
+
+
+def test_a_template_blip_is_not_mistaken_for_a_refusal(watching_client):
+    with requests_mock.Mocker() as m:
+        m.post("http://test.local/api/template", status_code=503)
+
+        assert watching_client.get_state_map() is None
+
+        m.post("http://test.local/api/template", text='{"light.a":null}')
+        assert watching_client.get_state_map() == {}
+
+
+def test_state_map_is_none_when_nothing_could_be_fetched(ha_client):
+    with requests_mock.Mocker() as m:
+        m.get("http://test.local/api/states", status_code=500)
+
+        assert ha_client.get_state_map() is None
+
+
+def test_the_states_fallback_decodes_only_what_is_watched(watching_client):
+    with requests_mock.Mocker() as m:
+        m.post("http://test.local/api/template", status_code=401)
+        m.get(
+            "http://test.local/api/states",
+            json=[
+                {
+                    "entity_id": "light.a",
+                    "state": "on",
+                    "attributes": {"brightness": 80, "friendly_name": "A"},
+                    "last_changed": "2026-01-01T00:00:00+00:00",
+                },
+                {"entity_id": "sensor.unwatched", "state": "1", "attributes": {}},
+            ],
+        )
+
+        states = watching_client.get_state_map()
+
+        assert states == {
+            "light.a": {
+                "entity_id": "light.a",
+                "state": "on",
+                "attributes": {"brightness": 80},
+            }
+        }
+
+
+def test_the_states_fallback_treats_an_empty_house_as_unknown(watching_client):
+    with requests_mock.Mocker() as m:
+        m.post("http://test.local/api/template", status_code=401)
+        m.get("http://test.local/api/states", json=[])
+
+        assert watching_client.get_state_map() is None
+
+
+def test_an_identical_template_body_is_reported_unchanged(watching_client):
+    body = '{"light.a":{"state":"on","attributes":{ "brightness":120}}}'
+    with requests_mock.Mocker() as m:
+        m.post("http://test.local/api/template", text=body)
+
+        first = watching_client.get_state_map(if_changed=True)
+        second = watching_client.get_state_map(if_changed=True)
+        # A caller with nothing to compare against still gets the states.
+        third = watching_client.get_state_map()
+
+        assert first["light.a"]["state"] == "on"
+        assert second is UNCHANGED
+        assert third == first
+
+
+def test_the_states_fallback_ignores_timestamps_and_unwatched_entities(
+    watching_client,
+):
+    """Every poll of /api/states differs somewhere; only a difference in what
+    the board shows counts."""
+
+    def house(tick, light="on"):
+        return [
+            {
+                "entity_id": "light.a",
+                "state": light,
+                "attributes": {"brightness": 80},
+                "last_updated": f"2026-01-01T00:00:{tick:02}+00:00",
+            },
+            {"entity_id": "sensor.clock", "state": str(tick), "attributes": {}},
+        ]
+
+    with requests_mock.Mocker() as m:
+        m.post("http://test.local/api/template", status_code=401)
+        m.get("http://test.local/api/states", json=house(1))
+        watching_client.get_state_map(if_changed=True)
+
+        m.get("http://test.local/api/states", json=house(2))
+        assert watching_client.get_state_map(if_changed=True) is UNCHANGED
+
+        m.get("http://test.local/api/states", json=house(3, light="off"))
+        changed = watching_client.get_state_map(if_changed=True)
+        assert changed["light.a"]["state"] == "off"
+
+
+def test_a_media_press_acts_on_the_polled_state(watching_client):
+    """The poll read the player a moment ago; reading it again before every
+    press doubled the round trips."""
+    watching_client.watch({"media_player.tv"}, {"supported_features"})
+    with requests_mock.Mocker() as m:
+        m.post(
+            "http://test.local/api/template",
+            text='{"media_player.tv":{"state":"playing","attributes":{ }}}',
+        )
+        m.post(
+            "http://test.local/api/services/media_player/media_play_pause",
+            status_code=200,
+        )
+        watching_client.get_state_map()
+
+        assert watching_client.toggle_entity("media_player.tv")
+
+        assert [r.path for r in m.request_history] == [
+            "/api/template",
+            "/api/services/media_player/media_play_pause",
+        ]
+
+
+def test_a_stale_entry_is_read_again_before_acting(watching_client, monkeypatch):
+    watching_client.store.put(
+        "media_player.x",
+        {"entity_id": "media_player.x", "state": "on", "attributes": {}},
+    )
+    monkeypatch.setattr("ha_launchpad.infrastructure.ha.client.HA_STATE_MAX_AGE", 0)
+    with requests_mock.Mocker() as m:
+        m.get(
+            "http://test.local/api/states/media_player.x",
+            json={"state": "on", "attributes": {"volume_level": 0.5}},
+        )
+        m.post("http://test.local/api/services/media_player/volume_set")
+
+        assert watching_client.adjust_volume("media_player.x", 0.1)
+
+        assert m.request_history[0].path == "/api/states/media_player.x"
+
+
+def test_the_next_volume_step_does_not_reuse_the_level_it_just_changed(
+    watching_client,
+):
+    watching_client.store.put(
+        "media_player.x",
+        {
+            "entity_id": "media_player.x",
+            "state": "on",
+            "attributes": {"volume_level": 0.5},
+        },
+    )
+    with requests_mock.Mocker() as m:
+        m.get(
+            "http://test.local/api/states/media_player.x",
+            json={"state": "on", "attributes": {"volume_level": 0.6}},
+        )
+        m.post("http://test.local/api/services/media_player/volume_set")
+
+        watching_client.adjust_volume("media_player.x", 0.1)
+        watching_client.adjust_volume("media_player.x", 0.1)
+
+        levels = [
+            r.json()["volume_level"]
+            for r in m.request_history
+            if r.path.endswith("/volume_set")
+        ]
+        assert levels == [pytest.approx(0.6), pytest.approx(0.7)]
+
+
+def test_an_outage_stops_fetches_and_probes_the_health_endpoint(ha_client):
+    with requests_mock.Mocker() as m:
+        m.get("http://test.local/api/states", status_code=503)
+        m.get("http://test.local/api/", status_code=503)
+
+        for _ in range(3):
+            assert ha_client.get_state_map() is None
+        m.reset_mock()
+
+        ha_client.breaker._next_probe = 0.0
+        assert ha_client.get_state_map() is None
+        assert ha_client.get_state_map() is None
+
+        # One probe when it fell due, and no fetch at all.
+        assert [r.path for r in m.request_history] == ["/api/"]
+
+
+def test_failed_service_calls_are_not_an_outage(ha_client):
+    with requests_mock.Mocker() as m:
+        m.post(
+            "http://test.local/api/services/media_player/media_play_pause",
+            status_code=500,
+        )
+        m.get("http://test.local/api/states/light.a", json={"state": "on"})
+
+        for _ in range(5):
+            assert not ha_client.call_service(
+                "media_player", "media_play_pause", "media_player.kitchen"
+            )
+
+        assert ha_client.breaker.state is BreakerState.CLOSED
+        assert ha_client.get_state("light.a") == {"state": "on"}
+
+
+def test_fetches_resume_after_consecutive_answered_probes(ha_client):
+    with requests_mock.Mocker() as m:
+        m.get("http://test.local/api/states", status_code=503)
+        for _ in range(3):
+            ha_client.get_state_map()
+
+        m.get("http://test.local/api/", json={"message": "API running."})
+        m.get("http://test.local/api/states", json=[{"entity_id": "light.a"}])
+        ha_client.breaker._next_probe = 0.0
+        m.reset_mock()
+
+        assert ha_client.get_state_map() is None
+        assert ha_client.get_state_map() == {"light.a": {"entity_id": "light.a"}}
+        assert [r.path for r in m.request_history] == ["/api/", "/api/", "/api/states"]
+
+
+def test_requests_are_measured_by_endpoint_class(watching_client):
+    with requests_mock.Mocker() as m:
+        m.post("http://test.local/api/template", text='{"light.a":null}')
+        m.get("http://test.local/api/states/light.a", json={"state": "on"})
+        m.post("http://test.local/api/services/light/toggle", status_code=503)
+
+        watching_client.get_state_map()
+        watching_client.get_state("light.a")
+        watching_client.toggle_entity("light.a")
+
+    metrics = watching_client.metrics.snapshot()
+    assert set(metrics) == {"states", "state", "service"}
+    assert metrics["states"]["response_bytes"]["max"] == len('{"light.a":null}')
+    assert metrics["states"]["decode_ms"]["count"] == 1
+    assert metrics["state"]["statuses"] == {200: 1}
+    assert metrics["service"]["statuses"] == {503: 1}
+
+
+def test_a_streamed_states_body_is_measured_once_read(ha_client):
+    with requests_mock.Mocker() as m:
+        m.get("http://test.local/api/states", json=[{"entity_id": "light.a"}])
+        ha_client.watch({"light.a"}, ())
+        ha_client._template_refused = True
+
+        ha_client.get_state_map()
+
+    states = ha_client.metrics.snapshot()["states"]
+    assert states["latency_ms"]["count"] == 1
+    assert states["response_bytes"]["max"] == len('[{"entity_id": "light.a"}]')
+    assert states["decode_ms"]["count"] == 1
@@ -0,0 +1,287 @@
+import threading
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+from ha_launchpad.infrastructure.ha.client import HomeAssistantClient
+from ha_launchpad.infrastructure.ha.lanes import TrafficClass
+from ha_launchpad.infrastructure.ha.standin import HomeAssistantStandIn
+from ha_launchpad.infrastructure.ha.websocket import HomeAssistantWebSocket
+
+
+@pytest.fixture
+def ha():
+    with HomeAssistantStandIn(
+        {"light.a": "on", "switch.b": "off", "media_player.c": "playing"}
+    ) as standin:
+        yield standin
+
+
+@pytest.fixture
+def push(ha, wait_for):
+    ws = HomeAssistantWebSocket(
+        ha.websocket_url, ha.token, retry_delay=0.05, max_delay=0.1
+    )
+    ws.watch({"light.a", "switch.b"})
+    ws.start()
+    assert wait_for(lambda: ws.is_live)
+    yield ws
+    ws.stop()
+
+
+@pytest.fixture
+def client(ha, push):
+    client = HomeAssistantClient(ha.url, ha.token)
+    client.use_websocket(push)
+    return client
+
+
+def _transports(ha):
+    return [call[0] for call in ha.service_calls]
+
+
+def test_service_call_goes_over_the_websocket(ha, client):
+    assert client.toggle_entity("light.a")
+
+    assert _transports(ha) == ["websocket"]
+    assert ha.get_state("light.a")["state"] == "off"
+
+
+def test_service_data_reaches_home_assistant(ha, client):
+    assert client.call_service(
+        "media_player", "volume_set", "media_player.c", volume_level=0.4
+    )
+
+    assert ha.service_calls == [
+        (
+            "websocket",
+            "media_player",
+            "volume_set",
+            {"entity_id": "media_player.c", "volume_level": 0.4},
+        )
+    ]
+    assert ha.get_state("media_player.c")["attributes"]["volume_level"] == 0.4
+
+
+def test_refused_call_is_a_failure(ha, client):
+    assert not client.call_service("light", "explode", "light.a")
+
+    assert _transports(ha) == ["websocket"]
+
+
+def test_websocket_calls_are_measured_apart_from_rest(ha, client, push):
+    client.toggle_entity("light.a")
+    client.call_service("light", "explode", "light.a")
+    push.stop()
+    client.toggle_entity("switch.b")
+
+    metrics = client.metrics.snapshot()
+    assert metrics["websocket"]["statuses"] == {"ok": 1, "failed": 1}
+    assert metrics["websocket"]["latency_ms"]["count"] == 2
+    assert metrics["service"]["statuses"] == {200: 1}
+
+
+def test_falls_back_to_rest_while_the_socket_is_down(ha, client, push):
+    push.stop()
+
+    assert client.toggle_entity("switch.b")
+
+    assert _transports(ha) == ["rest"]
+    assert ha.get_state("switch.b")["state"] == "on"
+
+
+def test_call_lost_with_the_connection_is_not_replayed(ha, client, wait_for):
+    ha.service_latency = 0.3
+    result = {}
+    caller = threading.Thread(
+        target=lambda: result.setdefault("ok", client.toggle_entity("light.a"))
+    )
+    caller.start()
+    assert wait_for(lambda: ha.service_calls)
+
+    ha.drop_connections()
+    caller.join(3.0)
+
+    # It may or may not have run; a second toggle would undo it if it did.
+    assert result == {"ok": False}
+    assert _transports(ha) == ["websocket"]
+
+
+def test_unanswered_call_times_out_without_replay(ha, push):
+    ha.service_latency = 0.5
+
+    assert push.call_service("light", "toggle", {"entity_id": "light.a"}, 0.1) is False
+    assert _transports(ha) == ["websocket"]
+
+
+class _DropsFirst:
+    """A lock the push thread wins once: the link goes offline just before the
+    caller gets to register its call."""
+
+    def __init__(self, push):
+        self._push = push
+        self._lock = threading.Lock()
+        self._dropped = False
+
+    def __enter__(self):
+        if not self._dropped:
+            self._dropped = True
+            self._push._go_offline()
+        self._lock.acquire()
+
+    def __exit__(self, *exc_info):
+        self._lock.release()
+
+
+def test_a_call_that_loses_the_race_with_the_link_is_never_sent():
+    push = HomeAssistantWebSocket("ws://127.0.0.1:9/api/websocket", "token")
+    connection = MagicMock()
+    push._authenticated = connection
+    push._lock = _DropsFirst(push)
+
+    assert push.call_service("light", "toggle", {"entity_id": "light.a"}, 0.5) is None
+    connection.send.assert_not_called()
+
+
+def test_concurrent_calls_get_their_own_answers(ha, push):
+    results = {}
+
+    def call(entity_id, service):
+        results[entity_id] = push.call_service(
+            "light", service, {"entity_id": entity_id}
+        )
+
+    callers = [
+        threading.Thread(target=call, args=("light.a", "turn_off")),
+        threading.Thread(target=call, args=("switch.b", "explode")),
+    ]
+    for caller in callers:
+        caller.start()
+    for caller in callers:
+        caller.join(3.0)
+
+    assert results == {"light.a": True, "switch.b": False}
+
+
+def test_batched_calls_arrive_as_one_request_for_every_entity(ha, client):
+    futures = [
+        client.call_service_batched("light", "turn_off", entity_id)
+        for entity_id in ("light.a", "switch.b")
+    ]
+
+    assert all(f.result(2) for f in futures)
+    assert ha.service_calls == [
+        ("websocket", "light", "turn_off", {"entity_id": ["light.a", "switch.b"]})
+    ]
+    assert ha.get_state("light.a")["state"] == "off"
+
+
+def test_each_kind_of_traffic_uses_its_own_pool(ha):
+    client = HomeAssistantClient(ha.url, ha.token)
+
+    client.get_state_map()
+    client.toggle_entity("light.a")
+    client.call_service("light", "turn_on", "light.a", lane=TrafficClass.BACKGROUND)
+
+    metrics = client.pool_metrics()
+    assert {lane: m["requests"] for lane, m in metrics.items()} == {
+        "state": 1,
+        "command": 1,
+        "background": 1,
+    }
+    assert all(m["connections_opened"] == 1 for m in metrics.values())
+
+
+def test_slow_commands_do_not_hold_up_the_poll(ha, wait_for):
+    client = HomeAssistantClient(ha.url, ha.token)
+    ha.service_latency = 0.5
+    callers = [
+        threading.Thread(target=client.toggle_entity, args=("switch.b",))
+        for _ in range(4)
+    ]
+    for caller in callers:
+        caller.start()
+    assert wait_for(lambda: len(ha.service_calls) == 4)
+
+    started = time.monotonic()
+    assert client.get_state_map()
+    assert time.monotonic() - started < 0.4
+
+    for caller in callers:
+        caller.join(3.0)
+
+
+def test_background_traffic_never_opens_a_second_connection(ha):
+    client = HomeAssistantClient(ha.url, ha.token)
+    ha.service_latency = 0.1
+    callers = [
+        threading.Thread(
+            target=client.call_service,
+            args=("light", "turn_on", "light.a"),
+            kwargs={"lane": TrafficClass.BACKGROUND},
+        )
+        for _ in range(3)
+    ]
+    for caller in callers:
+        caller.start()
+    for caller in callers:
+        caller.join(3.0)
+
+    assert client.pool_metrics()["background"]["connections_opened"] == 1
+
+
+def test_keep_alive_only_touches_an_idle_command_pool(ha):
+    client = HomeAssistantClient(ha.url, ha.token)
+    client.toggle_entity("light.a")
+
+    client.keep_alive(interval=60.0)
+    assert client.pool_metrics()["command"]["requests"] == 1
+
+    time.sleep(0.05)
+    client.keep_alive(interval=0.01)
+    assert client.pool_metrics()["command"]["requests"] == 2
+    # On the socket the press opened, not a new one.
+    assert client.pool_metrics()["command"]["connections_opened"] == 1
+
+
+def test_keep_alive_holds_the_connection_open_past_the_server_timeout():
+    with HomeAssistantStandIn({"light.a": "on"}, keepalive_timeout=0.3) as ha:
+        client = HomeAssistantClient(ha.url, ha.token)
+        client.toggle_entity("light.a")
+        accepted = ha.connections_accepted
+
+        deadline = time.monotonic() + 0.6
+        while time.monotonic() < deadline:
+            client.keep_alive(interval=0.1)
+            time.sleep(0.02)
+        client.toggle_entity("light.a")
+
+        assert ha.connections_accepted == accepted
+
+
+def test_prewarm_opens_connections_before_the_press():
+    # The connect latency keeps both warm-ups in flight at once, as they are
+    # against a real house. On bare localhost the first can finish before the
+    # second starts, and the second then reuses its socket.
+    with HomeAssistantStandIn(
+        {"light.a": "on"}, keepalive_timeout=0.2, connect_latency=0.05
+    ) as ha:
+        client = HomeAssistantClient(ha.url, ha.token)
+        client.toggle_entity("light.a")
+        time.sleep(0.4)
+
+        futures = client.prewarm(connections=2)
+        assert all(f.result(2) for f in futures)
+        accepted = ha.connections_accepted
+        client.toggle_entity("light.a")
+
+        assert ha.connections_accepted == accepted
+        assert client.pool_metrics()["command"]["connections_opened"] >= 2
+
+
+def test_nothing_to_warm_while_calls_go_over_the_websocket(ha, client):
+    assert client.prewarm() == []
+    client.keep_alive(interval=0.0)
+
+    assert client.pool_metrics()["command"]["requests"] == 0
@@ -0,0 +1,109 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from ha_launchpad.infrastructure.ha.client import HomeAssistantClient
+from ha_launchpad.infrastructure.ha.standin import HomeAssistantStandIn
+from ha_launchpad.infrastructure.ha.websocket import HomeAssistantWebSocket
+
+
+@pytest.fixture
+def ha():
+    with HomeAssistantStandIn({"light.a": "on"}, seed=7) as standin:
+        yield standin
+
+
+def test_populated_entities_are_served(ha):
+    added = ha.populate(200)
+    client = HomeAssistantClient(ha.url, ha.token)
+
+    states = client.get_all_states()
+
+    assert len(added) == 200
+    assert len(states) == 201
+    assert {s["entity_id"] for s in states} >= set(added)
+    assert {e.partition(".")[0] for e in added} == {
+        "sensor",
+        "automation",
+        "binary_sensor",
+        "light",
+        "switch",
+    }
+
+
+def test_population_is_repeatable_with_a_seed():
+    with (
+        HomeAssistantStandIn(seed=3) as first,
+        HomeAssistantStandIn(seed=3) as second,
+    ):
+        first.populate(20)
+        second.populate(20)
+        assert [s["state"] for s in first.all_states()] == [
+            s["state"] for s in second.all_states()
+        ]
+
+
+def test_churn_changes_states_and_subscribers_hear_it(ha, wait_for):
+    switches = ha.populate(10)
+    push = HomeAssistantWebSocket(ha.websocket_url, ha.token)
+    push.watch(switches)
+    changes = []
+    push.on_change = changes.append
+    push.start()
+    try:
+        assert wait_for(lambda: push.is_live)
+        ha.start_churn(100, switches)
+
+        assert wait_for(lambda: ha.churned >= 10 and changes)
+    finally:
+        ha.stop_churn()
+        push.stop()
+
+    churned = ha.churned
+    time.sleep(0.05)
+    assert ha.churned == churned
+
+
+def test_fail_next_answers_the_next_requests_with_the_status(ha):
+    client = HomeAssistantClient(ha.url, ha.token)
+    ha.fail_next(1, status=502)
+
+    # The health check is never retried, so it sees the failure as it is.
+    assert not client.is_available()
+    assert client.is_available()
+    assert ha.failures_injected == 1
+    assert client.metrics.snapshot()["health"]["statuses"] == {502: 1, 200: 1}
+
+
+def test_failure_rate_fails_about_that_fraction(ha):
+    client = HomeAssistantClient(ha.url, ha.token)
+    ha.failure_rate = 0.5
+
+    answered = sum(client.is_available() for _ in range(100))
+
+    assert 25 < answered < 75
+    assert ha.failures_injected == 100 - answered
+
+
+def test_latency_delays_every_reply(ha):
+    client = HomeAssistantClient(ha.url, ha.token)
+    assert client.is_available()
+    ha.latency = 0.05
+
+    started = time.perf_counter()
+    assert client.get_state("light.a")["state"] == "on"
+
+    assert time.perf_counter() - started >= 0.05
+
+
+def test_concurrent_reads_of_an_entity_make_one_request(ha):
+    client = HomeAssistantClient(ha.url, ha.token)
+    ha.latency = 0.1
+
+    with ThreadPoolExecutor(5) as pool:
+        states = list(pool.map(lambda _: client.get_state("light.a"), range(5)))
+
+    assert all(state["state"] == "on" for state in states)
+    assert client.metrics.snapshot()["state"]["latency_ms"]["count"] == 1
+    assert client.reads.metrics() == {"made": 1, "shared": 4}
@@ -0,0 +1,201 @@
+import logging
+import threading
+from typing import NamedTuple
+
+import pytest
+
+from ha_launchpad.infrastructure.ha.standin import HomeAssistantStandIn
+from ha_launchpad.infrastructure.ha.store import EntityStore
+from ha_launchpad.infrastructure.ha.websocket import (
+    HomeAssistantWebSocket,
+    apply_entity_event,
+    websocket_url,
+)
+
+
+@pytest.fixture
+def ha():
+    with HomeAssistantStandIn(
+        {
+            "light.a": {"state": "on", "attributes": {"brightness": 255}},
+            "switch.b": "off",
+            "sensor.unwatched": "12.5",
+        }
+    ) as standin:
+        yield standin
+
+
+class Push(NamedTuple):
+    ws: HomeAssistantWebSocket
+    changes: list[set[str]]
+
+
+@pytest.fixture
+def push(ha):
+    changes = []
+    ws = HomeAssistantWebSocket(
+        ha.websocket_url, ha.token, changes.append, retry_delay=0.05, max_delay=0.1
+    )
+    ws.watch({"light.a", "switch.b"})
+    ws.start()
+    yield Push(ws, changes)
+    ws.stop()
+
+
+def test_websocket_url_follows_the_http_scheme():
+    assert websocket_url("http://ha.local:8123/") == "ws://ha.local:8123/api/websocket"
+    assert websocket_url("https://ha.example") == "wss://ha.example/api/websocket"
+
+
+def test_subscription_holds_only_the_watched_entities(push, wait_for):
+    assert wait_for(lambda: push.ws.is_live)
+
+    snapshot = push.ws.snapshot()
+
+    assert set(snapshot) == {"light.a", "switch.b"}
+    assert snapshot["light.a"] == {
+        "entity_id": "light.a",
+        "state": "on",
+        "attributes": {"brightness": 255},
+    }
+
+
+def test_a_change_is_pushed_without_being_asked_for(ha, push, wait_for):
+    assert wait_for(lambda: push.ws.is_live)
+
+    ha.set_state("switch.b", "on")
+
+    assert wait_for(lambda: push.ws.snapshot()["switch.b"]["state"] == "on")
+    assert {"switch.b"} in push.changes
+
+
+def test_unwatched_entities_never_arrive(ha, push, wait_for):
+    assert wait_for(lambda: push.ws.is_live)
+    ha.set_state("sensor.unwatched", "13.0")
+    ha.set_state("switch.b", "on")
+
+    assert wait_for(lambda: push.ws.snapshot()["switch.b"]["state"] == "on")
+    assert all("sensor.unwatched" not in changed for changed in push.changes)
+
+
+def test_removed_attributes_are_dropped(ha, push, wait_for):
+    assert wait_for(lambda: push.ws.is_live)
+
+    ha.set_state("light.a", "off", {})
+
+    assert wait_for(lambda: push.ws.snapshot()["light.a"]["state"] == "off")
+    assert push.ws.snapshot()["light.a"]["attributes"] == {}
+
+
+def test_reconnects_and_resyncs_after_a_gap(ha, push, wait_for):
+    """Whatever happened while the link was down arrives in the fresh snapshot
+    the resubscription brings, and is reported as a change."""
+    assert wait_for(lambda: push.ws.is_live)
+    ha.stop()
+    assert wait_for(lambda: not push.ws.is_live)
+
+    # Changed while nobody was listening.
+    ha.set_state("switch.b", "on")
+    ha.start()
+    push.ws.url = ha.websocket_url
+
+    assert wait_for(lambda: push.ws.is_live)
+    assert push.ws.snapshot()["switch.b"]["state"] == "on"
+    assert {"switch.b"} in push.changes
+
+
+def test_a_dropped_connection_is_not_live_until_resynced(ha, push, wait_for):
+    assert wait_for(lambda: push.ws.is_live)
+
+    ha.drop_connections()
+
+    assert wait_for(lambda: ha.subscriber_count == 0)
+    assert wait_for(lambda: push.ws.is_live and ha.subscriber_count == 1)
+
+
+def test_every_gap_after_a_sync_is_retried_at_the_base_delay(ha, wait_for, caplog):
+    """Separate Wi-Fi blips are separate gaps, not one outage to back off from."""
+    caplog.set_level(logging.DEBUG, logger="ha_launchpad.infrastructure.ha.websocket")
+    ws = HomeAssistantWebSocket(
+        ha.websocket_url, ha.token, retry_delay=0.2, max_delay=10.0
+    )
+    ws.start()
+    try:
+        for _ in range(2):
+            assert wait_for(lambda: ws.is_live)
+            ha.drop_connections()
+            assert wait_for(lambda: not ws.is_live)
+        assert wait_for(lambda: ws.is_live)
+    finally:
+        ws.stop()
+
+    retries = [
+        record.getMessage()
+        for record in caplog.records
+        if record.getMessage().startswith("Push reconnecting")
+    ]
+    assert retries == ["Push reconnecting in 0.2s"] * 2
+
+
+def test_a_rejected_token_gives_up_instead_of_retrying(ha, wait_for):
+    ws = HomeAssistantWebSocket(ha.websocket_url, "wrong", retry_delay=0.01)
+    ws.start()
+    try:
+        assert wait_for(lambda: ws.unauthorized)
+        assert not ws.is_live
+        assert wait_for(lambda: not ws._thread.is_alive())
+    finally:
+        ws.stop()
+
+
+def test_change_handler_failures_do_not_kill_the_subscription(ha, wait_for):
+    calls = threading.Event()
+
+    def explode(_changed):
+        calls.set()
+        raise RuntimeError("render fault")
+
+    ws = HomeAssistantWebSocket(ha.websocket_url, ha.token, explode)
+    ws.watch({"switch.b"})
+    ws.start()
+    try:
+        assert wait_for(lambda: ws.is_live)
+        ha.set_state("switch.b", "on")
+        assert wait_for(lambda: ws.snapshot()["switch.b"]["state"] == "on")
+        assert calls.is_set()
+        assert ws.is_live
+    finally:
+        ws.stop()
+
+
+def test_apply_entity_event_replaces_rather_than_mutates():
+    states = {}
+    apply_entity_event(states, {"a": {"light.a": {"s": "on", "a": {"x": 1}}}})
+    held = states["light.a"]
+
+    changed = apply_entity_event(
+        states, {"c": {"light.a": {"+": {"s": "off", "a": {"y": 2}}}}}
+    )
+
+    assert changed == {"light.a"}
+    assert held["state"] == "on"
+    assert states["light.a"]["attributes"] == {"x": 1, "y": 2}
+
+
+def test_pushed_states_land_in_the_shared_store(ha, wait_for):
+    store = EntityStore()
+    ws = HomeAssistantWebSocket(ha.websocket_url, ha.token, store=store)
+    ws.watch({"switch.b"})
+    ws.start()
+    try:
+        assert wait_for(lambda: ws.is_live)
+        assert store.get("switch.b", max_age=0)["state"] == "off"
+
+        ha.set_state("switch.b", "on")
+
+        assert wait_for(lambda: store.get("switch.b", max_age=0)["state"] == "on")
+    finally:
+        ws.stop()
+
+    # No longer kept current by anyone.
+    assert store.get("switch.b", max_age=0) is None
@@ -2,8 +2,13 @@ from unittest.mock import MagicMock
 
 import pytest
 
-from ha_launchpad.config.mapping import SCENE_COLUMN_CC
+from ha_launchpad.config.mapping import ALL_PADS, COLORS, SCENE_COLUMN_CC
+from ha_launchpad.config.settings import LAUNCHPAD_ROTATION
 from ha_launchpad.core.controller import LaunchpadController
+from ha_launchpad.utils.rotate_pad import inverse_rotation, rotate_pad
+
+# Where logical pad 81 lands on the hardware, through the rotation layer.
+PAD_81 = rotate_pad(81, inverse_rotation(LAUNCHPAD_ROTATION))
 
 
 class ControlChange:
@@ -60,26 +65,47 @@ def test_a_swatch_press_never_reaches_home_assistant(controller):
     assert not controller.color_picker.active
 
 
+def _house(controller, state):
+    controller.ha_client.get_state_map.return_value = {
+        "light.test": {"entity_id": "light.test", "state": state, "attributes": {}}
+    }
+
+
 def test_polling_leaves_the_palette_alone(controller):
-    controller.led_manager = MagicMock()
+    _house(controller, "off")
+    controller.update_led_states()
     controller.color_lab.enter()
+    board = controller.backend._backend
+    board.reset_mock()
 
+    _house(controller, "on")
     controller.update_led_states()
 
-    controller.led_manager.update_all.assert_not_called()
+    board.send_note.assert_not_called()
+    board.send_velocity.assert_not_called()
+    board.send_frame.assert_not_called()
 
 
-def test_closing_repaints_the_whole_board(controller):
-    """The lab lights all 64 pads, including the ones no entity owns, so the
-    LED manager alone would leave strays behind."""
-    controller.led_manager = MagicMock()
-    controller.led_manager.update_all.return_value = ([], False)
+def test_closing_uncovers_the_board_as_it_is_now_without_a_fetch(controller):
+    """The state underneath the lab is kept current, so closing it writes what
+    the lab covered, changes included, and asks Home Assistant for nothing."""
+    _house(controller, "off")
+    controller.update_led_states()
     controller.color_lab.enter()
+    _house(controller, "on")
+    controller.update_led_states()
+    controller.ha_client.get_state_map.reset_mock()
+    board = controller.backend._backend
+    board.reset_mock()
 
     controller.handle_midi_message(ControlChange(controller.color_lab.toggle_button))
 
-    controller.led_manager.invalidate_cache.assert_called()
-    controller.led_manager.update_all.assert_called()
+    controller.ha_client.get_state_map.assert_not_called()
+    # Every swatch, in one frame: the lab covered the whole grid.
+    board.send_frame.assert_called_once()
+    frame = board.send_frame.call_args.args[0]
+    assert len(frame) == len(ALL_PADS)
+    assert (PAD_81, COLORS["green_1"], 0) in frame
 
 
 def test_opening_from_standby_wakes_the_board_first(controller):
@@ -0,0 +1,114 @@
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+from ha_launchpad.config.mapping import IDLE_MODE_BUTTON_ID
+from ha_launchpad.config.settings import LAUNCHPAD_ROTATION
+from ha_launchpad.core.controller import LaunchpadController
+from ha_launchpad.core.logic.pad_plans import OFF_COLOR
+from ha_launchpad.infrastructure.ha.commands import Toggle
+from ha_launchpad.infrastructure.ha.executor import Completion
+from ha_launchpad.utils.rotate_pad import inverse_rotation, rotate_pad
+
+# Where logical pad 81 lands on the hardware, through the rotation layer.
+PAD_81 = rotate_pad(81, inverse_rotation(LAUNCHPAD_ROTATION))
+
+
+@pytest.fixture
+def controller():
+    controller = LaunchpadController(MagicMock(), {81: "light.a"}, MagicMock())
+    controller.executor = MagicMock()
+    return controller
+
+
+def test_a_press_hands_the_call_to_the_executor(controller):
+    controller._handle_note_off(81)
+
+    controller.executor.submit.assert_called_once_with(Toggle("light.a", note=81))
+    controller.ha_client.toggle_entity.assert_not_called()
+
+
+def test_an_accepted_call_is_confirmed_on_its_pad(controller):
+    controller._inbox.put(Completion(Toggle("light.a", note=81), True))
+
+    controller._serve_inbox()
+
+    controller.backend._backend.send_note.assert_any_call(PAD_81, "yellow_3", 2)
+
+
+def test_confirming_a_call_neither_sleeps_nor_fetches(controller):
+    controller._inbox.put(Completion(Toggle("light.a", note=81), True))
+
+    started = time.perf_counter()
+    controller._serve_inbox()
+
+    assert time.perf_counter() - started < 0.1
+    controller.ha_client.get_state_map.assert_not_called()
+
+
+def test_a_failed_call_is_not_confirmed(controller):
+    controller._inbox.put(Completion(Toggle("light.a", note=81), False))
+
+    controller._serve_inbox()
+
+    controller.backend._backend.send_note.assert_not_called()
+
+
+def test_a_late_confirmation_does_not_light_a_sleeping_board(controller):
+    controller.idle_manager.set_manual_sleep()
+    controller.backend._backend.reset_mock()
+    controller._inbox.put(Completion(Toggle("light.a", note=81), True))
+
+    controller._serve_inbox()
+
+    controller.backend._backend.send_note.assert_not_called()
+
+
+def _show_light_on(controller):
+    controller.led_manager.update_all(
+        state_map={"light.a": {"entity_id": "light.a", "state": "on", "attributes": {}}}
+    )
+    controller.backend._backend.reset_mock()
+
+
+def test_a_predictable_toggle_lights_before_the_call_is_made(controller):
+    _show_light_on(controller)
+
+    controller._handle_note_off(81)
+
+    controller.backend._backend.send_note.assert_called_once_with(PAD_81, OFF_COLOR, 0)
+    controller.executor.submit.assert_called_once_with(
+        Toggle("light.a", note=81, predicted=True)
+    )
+
+
+def test_a_predicted_toggle_is_not_pulsed(controller):
+    _show_light_on(controller)
+    controller._handle_note_off(81)
+    controller.backend._backend.reset_mock()
+
+    controller._inbox.put(Completion(Toggle("light.a", note=81, predicted=True), True))
+    controller._serve_inbox()
+
+    controller.backend._backend.send_note.assert_not_called()
+
+
+def test_a_failed_predicted_toggle_puts_the_old_colour_back(controller):
+    _show_light_on(controller)
+    controller._handle_note_off(81)
+    controller.backend._backend.reset_mock()
+
+    controller._inbox.put(Completion(Toggle("light.a", note=81, predicted=True), False))
+    controller._serve_inbox()
+
+    controller.backend._backend.send_note.assert_called_once_with(PAD_81, "green_1", 0)
+
+
+def test_waking_the_board_prewarms_the_press_connections(controller):
+    controller.idle_manager.set_manual_sleep()
+
+    controller.handle_button_press(IDLE_MODE_BUTTON_ID)
+
+    assert not controller.idle_manager.is_idle
+    controller.ha_client.prewarm.assert_called_once_with()
@@ -0,0 +1,88 @@
+import threading
+import time
+from unittest.mock import MagicMock
+
+import mido
+import pytest
+
+from ha_launchpad.config.settings import LAUNCHPAD_ROTATION
+from ha_launchpad.core.controller import LaunchpadController
+from ha_launchpad.infrastructure.ha.commands import Toggle
+from ha_launchpad.infrastructure.ha.executor import Completion
+from ha_launchpad.utils.rotate_pad import rotate_pad
+
+
+@pytest.fixture
+def controller():
+    controller = LaunchpadController(MagicMock(), {81: "light.a"}, MagicMock())
+    controller.executor = MagicMock()
+    controller.handle_midi_message = MagicMock()
+    controller._handle_completion = MagicMock()
+    return controller
+
+
+@pytest.fixture
+def loop(controller):
+    controller.running = True
+    thread = threading.Thread(target=controller._midi_loop, daemon=True)
+    yield thread
+    controller.stop()
+    thread.join(2)
+
+
+def test_a_message_heard_is_handled_on_the_loop_thread(controller, loop, wait_for):
+    board = controller.backend._backend
+    board.listen.return_value = True
+    handled_on = []
+    controller.handle_midi_message.side_effect = lambda _msg: handled_on.append(
+        threading.current_thread()
+    )
+    loop.start()
+    assert wait_for(lambda: board.listen.called)
+
+    (hear,) = board.listen.call_args.args
+    hear(mido.Message("note_on", note=18, velocity=127))
+
+    assert wait_for(lambda: handled_on == [loop])
+    board.iter_incoming.assert_not_called()
+
+
+def test_presses_and_completions_are_handled_in_the_order_they_came():
+    controller = LaunchpadController(MagicMock(), {}, MagicMock())
+    order = []
+    controller.handle_midi_message = lambda msg: order.append(msg.note)
+    controller._handle_completion = lambda c: order.append(c.command.note)
+
+    controller._inbox.put(mido.Message("note_on", note=11))
+    controller._inbox.put(Completion(Toggle("light.a", note=81), True))
+    controller._inbox.put(mido.Message("note_on", note=12))
+    controller._serve_inbox()
+
+    assert order == [11, 81, 12]
+
+
+def test_stopping_wakes_a_loop_with_nothing_to_do(controller, loop):
+    controller.backend._backend.listen.return_value = True
+    loop.start()
+    time.sleep(0.05)
+
+    started = time.monotonic()
+    controller.stop()
+    loop.join(2)
+
+    assert not loop.is_alive()
+    assert time.monotonic() - started < 0.5
+
+
+def test_a_backend_that_cannot_listen_is_polled(controller, loop, wait_for):
+    board = controller.backend._backend
+    board.listen.return_value = False
+    board.iter_incoming.return_value.iter_pending.side_effect = [
+        [mido.Message("note_on", note=18, velocity=127)],
+        *[[]] * 100,
+    ]
+    loop.start()
+
+    assert wait_for(lambda: controller.handle_midi_message.called)
+    (msg,) = controller.handle_midi_message.call_args.args
+    assert msg.note == rotate_pad(18, LAUNCHPAD_ROTATION)
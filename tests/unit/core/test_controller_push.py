@@ -0,0 +1,64 @@
+from unittest.mock import MagicMock
+
+import pytest
+
+from ha_launchpad.config.mapping import COLORS
+from ha_launchpad.config.settings import LAUNCHPAD_ROTATION
+from ha_launchpad.core.controller import LaunchpadController
+from ha_launchpad.utils.rotate_pad import inverse_rotation, rotate_pad
+
+# Where logical pad 81 lands on the hardware, through the rotation layer.
+PAD_81 = rotate_pad(81, inverse_rotation(LAUNCHPAD_ROTATION))
+
+
+def _frame(board):
+    """The pads in the last frame written, as (note, velocity, channel)."""
+    return board.send_frame.call_args.args[0]
+
+
+@pytest.fixture
+def push():
+    push = MagicMock()
+    push.is_live = True
+    push.snapshot.return_value = {
+        "light.a": {"entity_id": "light.a", "state": "on", "attributes": {}}
+    }
+    return push
+
+
+@pytest.fixture
+def controller(push):
+    return LaunchpadController(
+        MagicMock(), {81: "light.a", 66: "volume_up.media_player.x"}, MagicMock(), push
+    )
+
+
+def test_push_is_told_exactly_what_the_board_renders(controller, push):
+    push.watch.assert_called_once_with(frozenset({"light.a", "media_player.x"}))
+
+
+def test_a_live_subscription_replaces_the_poll(controller, push):
+    controller.update_led_states()
+
+    controller.ha_client.get_state_map.assert_not_called()
+    assert (PAD_81, COLORS["green_1"], 0) in _frame(controller.backend._backend)
+
+
+def test_polling_takes_over_while_push_is_down(controller, push):
+    push.is_live = False
+    controller.ha_client.get_state_map.return_value = {
+        "light.a": {"entity_id": "light.a", "state": "off", "attributes": {}}
+    }
+
+    controller.update_led_states()
+
+    controller.ha_client.get_state_map.assert_called_once()
+    push.snapshot.assert_not_called()
+
+
+def test_a_pushed_change_repaints_straight_away(controller, push):
+    controller.running = True
+
+    controller._on_push_change({"light.a"})
+
+    assert (PAD_81, COLORS["green_1"], 0) in _frame(controller.backend._backend)
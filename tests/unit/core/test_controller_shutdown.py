@@ -1,3 +1,4 @@
+import logging
 import os
 import signal
 from unittest.mock import MagicMock
@@ -5,6 +6,7 @@ from unittest.mock import MagicMock
 import pytest
 
 from ha_launchpad.core.controller import LaunchpadController
+from ha_launchpad.core.logic.framebuffer import Layer
 from ha_launchpad.core.logic.led_manager import UNAVAILABLE_COLOR
 
 
@@ -47,6 +49,26 @@ def test_exits_non_zero_when_the_launchpad_is_never_found(monkeypatch):
     backend.close.assert_called()
 
 
+def test_call_and_pool_metrics_are_logged_at_shutdown(monkeypatch, caplog):
+    ha_client = MagicMock()
+    ha_client.pool_metrics.return_value = {"command": {"requests": 3}}
+    controller = LaunchpadController(ha_client, {}, backend=MagicMock())
+    monkeypatch.setattr(controller, "state_polling_thread", lambda: None)
+    monkeypatch.setattr(controller, "usb_monitor_thread", lambda: None)
+
+    def interrupted():
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(controller, "_midi_loop", interrupted)
+    caplog.set_level(logging.INFO, logger="ha_launchpad.core.controller")
+
+    controller.run()
+
+    (line,) = [r.getMessage() for r in caplog.records if "HA calls" in r.getMessage()]
+    assert "'completed': 0" in line
+    assert "{'command': {'requests': 3}}" in line
+
+
 def test_handlers_are_installed_for_both_signals(controller):
     controller._install_signal_handlers()
 
@@ -60,23 +82,26 @@ def test_pressing_an_unavailable_pad_does_nothing_but_blank_it(controller):
     colour-pick mode (which pulsed yellow) or fire a service call."""
     # Bypass the rotation decorator so the assertion is about controller
     # behaviour, not about which physical pad the note lands on.
-    controller.backend = MagicMock()
+    board = controller.framebuffer.backend = MagicMock()
+    controller.framebuffer.paint(Layer.STATE, 81, UNAVAILABLE_COLOR)
+    board.reset_mock()
     controller.led_manager._unavailable_notes = {81}
     controller.button_map = {81: "light.bedroom"}
 
     controller._handle_note_on(81)
 
-    controller.backend.send_note.assert_called_once_with(81, "off")
+    board.send_note.assert_called_once_with(81, "off", 0)
     assert not controller.color_picker.active
 
 
 def test_releasing_an_unavailable_pad_restores_its_colour(controller):
-    controller.backend = MagicMock()
+    board = controller.framebuffer.backend = MagicMock()
+    controller.framebuffer.paint(Layer.STATE, 81, UNAVAILABLE_COLOR)
     controller.led_manager._unavailable_notes = {81}
     controller.button_map = {81: "light.bedroom"}
 
     controller._handle_note_on(81)
-    controller.backend.send_note.reset_mock()
+    board.send_note.reset_mock()
     controller._handle_note_off(81)
 
-    controller.backend.send_note.assert_called_once_with(81, UNAVAILABLE_COLOR)
+    board.send_note.assert_called_once_with(81, UNAVAILABLE_COLOR, 0)
@@ -0,0 +1,51 @@
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+from ha_launchpad.core.logic.feedback_manager import PULSE_CHANNEL, FeedbackManager
+from ha_launchpad.core.logic.framebuffer import FrameBuffer, Layer, pack_color
+
+
+@pytest.fixture
+def fb():
+    fb = FrameBuffer(MagicMock())
+    fb.paint(Layer.STATE, 81, "green_1")
+    fb.paint(Layer.STATE, 82, "gray_3")
+    return fb
+
+
+@pytest.fixture
+def feedback(fb):
+    return FeedbackManager(fb.surface(Layer.FEEDBACK))
+
+
+def test_a_pulse_returns_at_once_and_ends_on_its_own(fb, feedback):
+    started = time.perf_counter()
+    feedback.pulse(81, "yellow_3", 0.05, clear_note=82)
+
+    assert time.perf_counter() - started < 0.04
+    assert fb.composite(81) == pack_color("yellow_3", PULSE_CHANNEL)
+    assert fb.composite(82) == pack_color("off", 0)
+
+    time.sleep(0.3)
+    assert fb.composite(81) == pack_color("green_1", 0)
+    assert fb.composite(82) == pack_color("gray_3", 0)
+
+
+def test_a_pulse_ending_leaves_a_later_one_on_the_same_pad(fb, feedback):
+    feedback.pulse(81, "yellow_3", 0.05)
+    feedback.pulse(81, "white", 1.0)
+
+    time.sleep(0.3)
+
+    assert fb.composite(81) == pack_color("white", PULSE_CHANNEL)
+
+
+def test_a_held_pad_outlasts_the_pulse_it_replaced(fb, feedback):
+    feedback.pulse(81, "yellow_3", 0.05)
+    feedback.hold(81, "off")
+
+    time.sleep(0.3)
+
+    assert fb.composite(81) == pack_color("off", 0)
@@ -0,0 +1,238 @@
+import threading
+from unittest.mock import MagicMock
+
+import pytest
+
+from ha_launchpad.config.mapping import ALL_PADS, COLORS
+from ha_launchpad.core.logic.framebuffer import (
+    UNPAINTED,
+    FrameBuffer,
+    Layer,
+    pack_color,
+    unpack_color,
+)
+from ha_launchpad.infrastructure.midi.mido_backend import MidoBackend
+from ha_launchpad.infrastructure.midi.writer import MidiWriter
+
+
+@pytest.fixture
+def fb():
+    return FrameBuffer(MagicMock())
+
+
+def _writes(fb):
+    """Every pad written, as (note, colour, channel), alone or in a frame."""
+    writes = []
+    for name, args, _ in fb.backend.method_calls:
+        if name == "send_note":
+            writes.append(args)
+        elif name == "send_frame":
+            for note, velocity, channel in args[0]:
+                writes.append((note, *unpack_color(channel << 7 | velocity)))
+    return writes
+
+
+@pytest.mark.parametrize("channel", [0, 1, 2])
+def test_every_colour_survives_packing(channel):
+    for color in COLORS:
+        assert unpack_color(pack_color(color, channel)) == (color, channel)
+
+
+def test_an_unknown_colour_packs_as_what_is_sent_for_it():
+    assert unpack_color(pack_color("no_such_colour", 0)) == ("off", 0)
+    assert pack_color("off", 0) != UNPAINTED
+
+
+def test_a_pad_shows_the_topmost_layer_holding_it(fb):
+    fb.paint(Layer.STATE, 81, "green_1")
+    fb.paint(Layer.PICKER, 81, "yellow_3", 2)
+    fb.paint(Layer.STATE, 81, "gray_3")
+
+    assert _writes(fb) == [(81, "green_1", 0), (81, "yellow_3", 2)]
+    assert fb.composite(81) == pack_color("yellow_3", 2)
+
+
+def test_taking_an_overlay_off_writes_only_the_pads_that_look_different(fb):
+    fb.paint(Layer.STATE, 81, "green_1")
+    fb.paint(Layer.STATE, 82, "gray_3")
+    fb.paint(Layer.PICKER, 81, "red_1")
+    fb.paint(Layer.PICKER, 82, "gray_3")
+    fb.paint(Layer.PICKER, 83, "blue_1")
+    fb.backend.reset_mock()
+
+    fb.clear_layer(Layer.PICKER)
+
+    assert _writes(fb) == [(81, "green_1", 0), (83, "off", 0)]
+
+
+def test_off_on_an_overlay_covers_the_pad(fb):
+    fb.paint(Layer.STATE, 81, "green_1")
+    fb.paint(Layer.FEEDBACK, 81, "off")
+    fb.clear(Layer.FEEDBACK, 81)
+
+    assert _writes(fb) == [(81, "green_1", 0), (81, "off", 0), (81, "green_1", 0)]
+
+
+def test_painting_what_the_pad_already_shows_writes_nothing(fb):
+    fb.paint(Layer.STATE, 81, "green_1")
+    fb.backend.reset_mock()
+
+    fb.paint(Layer.STATE, 81, "green_1")
+    fb.clear(Layer.PICKER, 81)
+
+    fb.backend.send_note.assert_not_called()
+    assert fb.writes == 1
+
+
+def test_a_hidden_layer_keeps_its_pads_for_when_it_is_shown(fb):
+    fb.paint(Layer.STATE, 81, "green_1")
+    fb.paint(Layer.NOTIFICATION, 71, "red_2", 2)
+
+    fb.hide(Layer.STATE)
+    fb.paint(Layer.STATE, 81, "cyan_0", 2)
+    fb.show(Layer.STATE)
+
+    assert _writes(fb) == [
+        (81, "green_1", 0),
+        (71, "red_2", 2),
+        (81, "off", 0),
+        (81, "cyan_0", 2),
+    ]
+
+
+def test_a_batch_writes_each_pad_once_with_where_it_ended_up(fb):
+    with fb.batch():
+        fb.paint(Layer.STATE, 81, "green_1")
+        with fb.batch():
+            fb.paint(Layer.LAB, 81, "red_1")
+        fb.paint(Layer.STATE, 82, "gray_3")
+        fb.clear_layer(Layer.LAB)
+        assert fb.backend.method_calls == []
+
+    assert _writes(fb) == [(81, "green_1", 0), (82, "gray_3", 0)]
+
+
+def test_a_velocity_without_a_name_is_sent_raw(fb):
+    unnamed = next(v for v in range(128) if v not in COLORS.values())
+
+    fb.paint_velocity(Layer.LAB, 81, unnamed)
+
+    fb.backend.send_velocity.assert_called_once_with(81, unnamed, 0)
+
+
+def test_one_pad_is_a_note_and_more_are_one_frame(fb):
+    fb.paint(Layer.STATE, 81, "green_1")
+    with fb.batch():
+        fb.paint(Layer.STATE, 82, "gray_3")
+        fb.paint(Layer.STATE, 83, "cyan_0", 2)
+
+    fb.backend.send_note.assert_called_once_with(81, "green_1", 0)
+    fb.backend.send_frame.assert_called_once_with(
+        [(82, COLORS["gray_3"], 0), (83, COLORS["cyan_0"], 2)]
+    )
+    assert fb.writes == 3
+
+
+def test_a_failed_write_is_tried_again_with_the_next(fb):
+    fb.backend.send_note.side_effect = OSError("gone")
+    fb.paint(Layer.STATE, 81, "green_1")
+
+    fb.paint(Layer.STATE, 82, "gray_3")
+
+    fb.backend.send_frame.assert_called_once_with(
+        [(81, COLORS["green_1"], 0), (82, COLORS["gray_3"], 0)]
+    )
+    assert fb.writes == 2
+
+
+def test_resend_writes_whatever_the_board_is_believed_to_show(fb):
+    fb.paint(Layer.STATE, 81, "green_1")
+    fb.backend.reset_mock()
+
+    fb.resend([81, 82])
+
+    assert _writes(fb) == [(81, "green_1", 0), (82, "off", 0)]
+
+
+def test_a_surface_paints_its_own_layer(fb):
+    state = fb.surface(Layer.STATE)
+    picker = fb.surface(Layer.PICKER)
+    state.send_note(81, "green_1")
+    picker.send_note(81, "red_1")
+    fb.backend.reset_mock()
+
+    picker.clear_all()
+
+    assert _writes(fb) == [(81, "green_1", 0)]
+
+
+def test_a_write_the_board_already_shows_is_counted_as_dropped(fb):
+    fb.paint(Layer.STATE, 81, "green_1")
+    fb.paint(Layer.STATE, 81, "green_1")
+    fb.paint(Layer.PICKER, 82, "off")
+
+    assert fb.writes == 2
+    assert fb.suppressed == 1
+
+
+def test_a_button_is_not_lit_again_with_what_it_shows(fb):
+    fb.send_cc(95, 3)
+    fb.send_cc(95, 3)
+    fb.send_cc(95, 0)
+
+    assert [c.args for c in fb.backend.send_cc.call_args_list] == [
+        (95, 3, 0),
+        (95, 0, 0),
+    ]
+    assert fb.suppressed == 1
+
+
+def test_a_button_write_that_failed_is_not_remembered(fb):
+    fb.backend.send_cc.side_effect = [OSError("gone"), None]
+
+    with pytest.raises(OSError):
+        fb.send_cc(95, 3)
+    fb.send_cc(95, 3)
+
+    assert fb.backend.send_cc.call_count == 2
+
+
+def test_resync_writes_everything_whatever_the_board_is_believed_to_show(fb):
+    fb.paint(Layer.STATE, 81, "green_1")
+    fb.paint(Layer.STATE, 5, "red_1")
+    fb.send_cc(95, 3)
+    fb.backend.reset_mock()
+
+    fb.resync()
+
+    frame = fb.backend.send_frame.call_args.args[0]
+    assert len(frame) == len(ALL_PADS) + 1
+    assert (81, COLORS["green_1"], 0) in frame
+    assert (5, COLORS["red_1"], 0) in frame
+    fb.backend.send_cc.assert_called_once_with(95, 3, 0)
+
+
+def test_a_write_that_failed_on_the_writer_thread_is_made_again():
+    backend = MidoBackend()
+    backend.midi_out = MagicMock()
+    backend.midi_out.send.side_effect = [OSError("gone"), None]
+    writer = MidiWriter(backend, interval=0.01)
+    fb = FrameBuffer(writer)
+    reported = threading.Event()
+
+    def write_failed(notes, controls):
+        fb.write_failed(notes, controls)
+        reported.set()
+
+    writer.on_error = write_failed
+    writer.start()
+    try:
+        fb.paint(Layer.STATE, 81, "green_1")
+        assert reported.wait(2)
+        fb.paint(Layer.STATE, 81, "green_1")
+    finally:
+        writer.stop()
+
+    assert backend.midi_out.send.call_count == 2
+    msg = backend.midi_out.send.call_args.args[0]
+    assert (msg.type, msg.note, msg.velocity) == ("note_on", 81, COLORS["green_1"])
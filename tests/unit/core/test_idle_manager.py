@@ -3,14 +3,31 @@ from unittest.mock import MagicMock, patch
 import pytest
 
 from ha_launchpad.config.mapping import IDLE_MODE_BUTTON_ID
+from ha_launchpad.core.logic.framebuffer import (
+    FrameBuffer,
+    Layer,
+    pack_color,
+    unpack_color,
+)
 from ha_launchpad.core.logic.idle_manager import IdleManager
 
 
+def _written(idle_manager):
+    """Every pad written to the board, as (note, colour, channel)."""
+    writes = []
+    for name, args, _ in idle_manager.framebuffer.backend.method_calls:
+        if name == "send_note":
+            writes.append(args)
+        elif name == "send_frame":
+            for note, velocity, channel in args[0]:
+                writes.append((note, *unpack_color(channel << 7 | velocity)))
+    return writes
+
+
 @pytest.fixture
 def idle_manager():
-    backend = MagicMock()
-    # Mock settings.IDLE_TIMEOUT if possible, or just rely on patching time
-    return IdleManager(backend)
+    # A real framebuffer, so the assertions are about what reaches the board.
+    return IdleManager(FrameBuffer(MagicMock()))
 
 
 def test_initial_state(idle_manager):
@@ -21,7 +38,7 @@ def test_manual_sleep(idle_manager):
     idle_manager.set_manual_sleep()
     assert idle_manager.is_idle
     # Should have cleared LEDs
-    assert idle_manager.backend.send_note.call_count >= 1
+    assert idle_manager.framebuffer.backend.send_note.call_count >= 1
 
 
 def test_activity_updates_timestamp(idle_manager):
@@ -77,20 +94,20 @@ def test_wake_up(idle_manager):
 
 
 def test_standby_preview_lights_changed_pads_without_waking(idle_manager):
-    idle_manager.backend.is_connected.return_value = True
+    idle_manager.framebuffer.backend.is_connected.return_value = True
     idle_manager.enter_idle()
-    idle_manager.backend.send_note.reset_mock()
+    idle_manager.framebuffer.backend.send_note.reset_mock()
 
     idle_manager.show_standby_preview([(81, "green_1", 0)])
 
-    idle_manager.backend.send_note.assert_called_once_with(81, "green_1", 0)
+    idle_manager.framebuffer.backend.send_note.assert_called_once_with(81, "green_1", 0)
     assert idle_manager.is_idle
 
 
 def test_standby_preview_turns_itself_off_when_it_expires(idle_manager):
     from ha_launchpad.config.settings import STANDBY_PREVIEW_DURATION
 
-    idle_manager.backend.is_connected.return_value = True
+    idle_manager.framebuffer.backend.is_connected.return_value = True
 
     with patch("time.time") as mock_time:
         mock_time.return_value = 0
@@ -98,59 +115,61 @@ def test_standby_preview_turns_itself_off_when_it_expires(idle_manager):
 
         # Still within the window: leave it lit.
         mock_time.return_value = STANDBY_PREVIEW_DURATION - 1
-        idle_manager.backend.send_note.reset_mock()
+        idle_manager.framebuffer.backend.send_note.reset_mock()
         idle_manager.expire_standby_preview()
-        idle_manager.backend.send_note.assert_not_called()
+        idle_manager.framebuffer.backend.send_note.assert_not_called()
 
         # Past the window: turn it back off.
         mock_time.return_value = STANDBY_PREVIEW_DURATION + 1
         idle_manager.expire_standby_preview()
-        idle_manager.backend.send_note.assert_called_once_with(81, "off")
+        idle_manager.framebuffer.backend.send_note.assert_called_once_with(81, "off", 0)
 
 
 def test_standby_preview_leaves_the_wake_button_alone(idle_manager):
-    idle_manager.backend.is_connected.return_value = True
+    idle_manager.framebuffer.backend.is_connected.return_value = True
 
     idle_manager.show_standby_preview([(IDLE_MODE_BUTTON_ID, "green_1", 0)])
 
-    idle_manager.backend.send_note.assert_not_called()
+    idle_manager.framebuffer.backend.send_note.assert_not_called()
 
 
 def test_wake_button_has_one_colour_whatever_is_happening(idle_manager):
     """It used to turn orange on any notification, which told you something was
     wrong without telling you what. The pads carry that now."""
-    idle_manager.backend.is_connected.return_value = True
+    idle_manager.framebuffer.backend.is_connected.return_value = True
 
     idle_manager.enter_idle()
-    idle_manager.backend.send_note.assert_any_call(IDLE_MODE_BUTTON_ID, "white")
+    idle_manager.framebuffer.backend.send_note.assert_any_call(
+        IDLE_MODE_BUTTON_ID, "white", 0
+    )
 
-    idle_manager.backend.send_note.reset_mock()
+    idle_manager.framebuffer.backend.send_note.reset_mock()
     idle_manager.sync_notification_pads([(81, "red_2", 2)])
 
     wake_calls = [
         c
-        for c in idle_manager.backend.send_note.call_args_list
+        for c in idle_manager.framebuffer.backend.send_note.call_args_list
         if c.args and c.args[0] == IDLE_MODE_BUTTON_ID
     ]
     assert wake_calls == []
 
 
 def test_notification_pads_stay_lit_through_sleep(idle_manager):
-    idle_manager.backend.is_connected.return_value = True
+    idle_manager.framebuffer.backend.is_connected.return_value = True
     idle_manager.enter_idle()
-    idle_manager.backend.send_note.reset_mock()
+    idle_manager.framebuffer.backend.send_note.reset_mock()
 
     idle_manager.sync_notification_pads([(81, "red_2", 2)])
-    idle_manager.backend.send_note.assert_called_once_with(81, "red_2", 2)
+    idle_manager.framebuffer.backend.send_note.assert_called_once_with(81, "red_2", 2)
 
     # Already lit and unchanged: do not repaint it on every poll.
-    idle_manager.backend.send_note.reset_mock()
+    idle_manager.framebuffer.backend.send_note.reset_mock()
     idle_manager.sync_notification_pads([(81, "red_2", 2)])
-    idle_manager.backend.send_note.assert_not_called()
+    idle_manager.framebuffer.backend.send_note.assert_not_called()
 
     # Problem resolved: the pad goes dark again.
     idle_manager.sync_notification_pads([])
-    idle_manager.backend.send_note.assert_called_once_with(81, "off")
+    idle_manager.framebuffer.backend.send_note.assert_called_once_with(81, "off", 0)
 
 
 def test_notification_pad_survives_the_standby_preview_timer(idle_manager):
@@ -158,7 +177,7 @@ def test_notification_pad_survives_the_standby_preview_timer(idle_manager):
     off when the preview window closes."""
     from ha_launchpad.config.settings import STANDBY_PREVIEW_DURATION
 
-    idle_manager.backend.is_connected.return_value = True
+    idle_manager.framebuffer.backend.is_connected.return_value = True
 
     with patch("time.time") as mock_time:
         mock_time.return_value = 0
@@ -166,23 +185,77 @@ def test_notification_pad_survives_the_standby_preview_timer(idle_manager):
         idle_manager.sync_notification_pads([(81, "red_2", 2)])
 
         mock_time.return_value = STANDBY_PREVIEW_DURATION + 1
-        idle_manager.backend.send_note.reset_mock()
+        idle_manager.framebuffer.backend.send_note.reset_mock()
         idle_manager.expire_standby_preview()
-        idle_manager.backend.send_note.assert_not_called()
+        idle_manager.framebuffer.backend.send_note.assert_not_called()
 
 
 def test_standby_preview_does_not_repaint_a_notification_pad(idle_manager):
-    idle_manager.backend.is_connected.return_value = True
+    idle_manager.framebuffer.backend.is_connected.return_value = True
     idle_manager.sync_notification_pads([(81, "red_2", 2)])
-    idle_manager.backend.send_note.reset_mock()
+    idle_manager.framebuffer.backend.send_note.reset_mock()
 
     idle_manager.show_standby_preview([(81, "green_1", 0)])
-    idle_manager.backend.send_note.assert_not_called()
+    idle_manager.framebuffer.backend.send_note.assert_not_called()
 
 
 def test_sync_ignores_the_wake_button(idle_manager):
-    idle_manager.backend.is_connected.return_value = True
-    idle_manager.backend.send_note.reset_mock()
+    idle_manager.framebuffer.backend.is_connected.return_value = True
+    idle_manager.framebuffer.backend.send_note.reset_mock()
 
     idle_manager.sync_notification_pads([(IDLE_MODE_BUTTON_ID, "red_2", 2)])
-    idle_manager.backend.send_note.assert_not_called()
+    idle_manager.framebuffer.backend.send_note.assert_not_called()
+
+
+def test_sleep_darkens_only_what_the_state_layer_lit(idle_manager):
+    framebuffer = idle_manager.framebuffer
+    framebuffer.paint(Layer.STATE, 81, "green_1")
+    framebuffer.paint(Layer.STATE, 82, "off")
+    idle_manager.framebuffer.backend.reset_mock()
+
+    idle_manager.enter_idle()
+
+    assert sorted(_written(idle_manager)) == sorted(
+        [
+            (81, "off", 0),
+            (IDLE_MODE_BUTTON_ID, "white", 0),
+        ]
+    )
+
+
+def test_sleep_darkens_an_open_picker_and_waking_brings_it_back(idle_manager):
+    framebuffer = idle_manager.framebuffer
+    framebuffer.paint(Layer.STATE, 81, "green_1")
+    framebuffer.paint(Layer.PICKER, 81, "yellow_3", 2)
+    framebuffer.paint(Layer.PICKER, 11, "red_1")
+    framebuffer.paint(Layer.FEEDBACK, 12, "white", 2)
+
+    idle_manager.enter_idle()
+
+    dark = pack_color("off", 0)
+    assert [framebuffer.composite(note) for note in (81, 11, 12)] == [dark] * 3
+
+    idle_manager.wake_up()
+
+    assert framebuffer.composite(81) == pack_color("yellow_3", 2)
+    assert framebuffer.composite(11) == pack_color("red_1", 0)
+
+
+def test_waking_puts_the_state_back_and_takes_the_sleeping_board_off(idle_manager):
+    framebuffer = idle_manager.framebuffer
+    framebuffer.paint(Layer.STATE, 81, "green_1")
+    idle_manager.enter_idle()
+    idle_manager.sync_notification_pads([(71, "red_2", 2)])
+    idle_manager.show_standby_preview([(72, "green_1", 0)])
+    idle_manager.framebuffer.backend.reset_mock()
+
+    idle_manager.wake_up()
+
+    assert sorted(_written(idle_manager)) == sorted(
+        [
+            (71, "off", 0),
+            (72, "off", 0),
+            (81, "green_1", 0),
+            (IDLE_MODE_BUTTON_ID, "off", 0),
+        ]
+    )
@@ -29,8 +29,8 @@ class TestInputHandlerRestart(unittest.TestCase):
     def test_restart_chord_not_idle(self):
         # 1. First button
         res1 = self.handler.handle_press(RESTART_CHORD[0], is_idle=False)
-        # Should be a toggle action
-        self.assertIn("update_leds", res1)
+        # Should be a toggle action, handed back for the executor to run
+        self.assertIn("command", res1)
 
         # 2. Second button
         res2 = self.handler.handle_press(RESTART_CHORD[1], is_idle=False)
@@ -4,11 +4,11 @@ import pytest
 
 from ha_launchpad.config.mapping import COLORS
 from ha_launchpad.config.palette import PALETTE_HEX
-from ha_launchpad.core.logic.led_manager import (
-    OFF_COLOR,
-    UNAVAILABLE_COLOR,
-    LEDManager,
-)
+from ha_launchpad.config.settings import DISCO_LIGHTS
+from ha_launchpad.core.logic.framebuffer import UNPAINTED, pack_color
+from ha_launchpad.core.logic.led_manager import UNAVAILABLE_COLOR, LEDManager
+from ha_launchpad.core.logic.pad_plans import OFF_COLOR
+from ha_launchpad.infrastructure.ha.client import UNCHANGED
 
 
 @pytest.fixture
@@ -18,12 +18,19 @@ def led_manager():
     return LEDManager(MagicMock(), MagicMock(), {81: "light.a"}, disco)
 
 
+def _by_id(states):
+    """The shape get_state_map() returns: states keyed by entity id."""
+    return {s["entity_id"]: s for s in states}
+
+
 def _states(state):
-    return [{"entity_id": "light.a", "state": state, "attributes": {"brightness": 255}}]
+    return _by_id(
+        [{"entity_id": "light.a", "state": state, "attributes": {"brightness": 255}}]
+    )
 
 
 def test_dry_run_reports_the_change_without_emitting(led_manager):
-    led_manager.ha_client.get_all_states.return_value = _states("on")
+    led_manager.ha_client.get_state_map.return_value = _states("on")
 
     changed, _ = led_manager.update_all(dry_run=True)
 
@@ -39,7 +46,7 @@ def test_dry_run_does_not_consume_the_change(led_manager):
     would come back blank -- lighting up only pads that happened to change
     afterwards.
     """
-    led_manager.ha_client.get_all_states.return_value = _states("on")
+    led_manager.ha_client.get_state_map.return_value = _states("on")
 
     led_manager.update_all(dry_run=True)
     changed, _ = led_manager.update_all(dry_run=False)
@@ -49,7 +56,7 @@ def test_dry_run_does_not_consume_the_change(led_manager):
 
 
 def test_unchanged_state_is_not_resent(led_manager):
-    led_manager.ha_client.get_all_states.return_value = _states("on")
+    led_manager.ha_client.get_state_map.return_value = _states("on")
 
     led_manager.update_all(dry_run=False)
     led_manager.backend.send_note.reset_mock()
@@ -62,7 +69,7 @@ def test_unchanged_state_is_not_resent(led_manager):
 def test_commit_stops_a_change_being_reported_twice(led_manager):
     """The standby preview paints the board itself, then commits, so the next
     poll does not keep re-reporting the same change forever."""
-    led_manager.ha_client.get_all_states.return_value = _states("on")
+    led_manager.ha_client.get_state_map.return_value = _states("on")
 
     changes, _ = led_manager.update_all(dry_run=True)
     assert changes
@@ -74,7 +81,7 @@ def test_commit_stops_a_change_being_reported_twice(led_manager):
 
 
 def test_failed_fetch_leaves_the_board_alone(led_manager):
-    led_manager.ha_client.get_all_states.return_value = []
+    led_manager.ha_client.get_state_map.return_value = None
 
     changed, has_notifications = led_manager.update_all(dry_run=False)
 
@@ -84,7 +91,7 @@ def test_failed_fetch_leaves_the_board_alone(led_manager):
 
 
 def test_outage_is_reported_once_not_every_poll(led_manager, caplog):
-    led_manager.ha_client.get_all_states.return_value = []
+    led_manager.ha_client.get_state_map.return_value = None
 
     with caplog.at_level("WARNING"):
         for _ in range(5):
@@ -96,13 +103,13 @@ def test_outage_is_reported_once_not_every_poll(led_manager, caplog):
 
 def test_outage_warning_rearms_after_recovery(led_manager, caplog):
     with caplog.at_level("WARNING"):
-        led_manager.ha_client.get_all_states.return_value = []
+        led_manager.ha_client.get_state_map.return_value = None
         led_manager.update_all(dry_run=False)
 
-        led_manager.ha_client.get_all_states.return_value = _states("on")
+        led_manager.ha_client.get_state_map.return_value = _states("on")
         led_manager.update_all(dry_run=False)
 
-        led_manager.ha_client.get_all_states.return_value = []
+        led_manager.ha_client.get_state_map.return_value = None
         led_manager.update_all(dry_run=False)
 
     warnings = [r for r in caplog.records if "No states returned" in r.message]
@@ -115,9 +122,9 @@ def test_unavailable_is_not_rendered_as_off():
     disco = MagicMock()
     disco.active = False
     lm = LEDManager(MagicMock(), MagicMock(), {81: "light.a"}, disco)
-    lm.ha_client.get_all_states.return_value = [
-        {"entity_id": "light.a", "state": "unavailable", "attributes": {}}
-    ]
+    lm.ha_client.get_state_map.return_value = _by_id(
+        [{"entity_id": "light.a", "state": "unavailable", "attributes": {}}]
+    )
 
     changes, _ = lm.update_all(dry_run=False)
 
@@ -128,9 +135,9 @@ def test_an_entity_that_does_not_exist_is_treated_as_unavailable(led_manager):
     """A pad mapped to something Home Assistant has never heard of used to
     glow red and still fire service calls. It cannot control anything, so it
     belongs in the same bucket as an unreachable device."""
-    led_manager.ha_client.get_all_states.return_value = [
-        {"entity_id": "light.something_else", "state": "on", "attributes": {}}
-    ]
+    led_manager.ha_client.get_state_map.return_value = _by_id(
+        [{"entity_id": "light.something_else", "state": "on", "attributes": {}}]
+    )
 
     changes, _ = led_manager.update_all(dry_run=False)
 
@@ -139,9 +146,9 @@ def test_an_entity_that_does_not_exist_is_treated_as_unavailable(led_manager):
 
 
 def test_a_missing_entity_is_reported_once_not_every_poll(led_manager, caplog):
-    led_manager.ha_client.get_all_states.return_value = [
-        {"entity_id": "light.something_else", "state": "on", "attributes": {}}
-    ]
+    led_manager.ha_client.get_state_map.return_value = _by_id(
+        [{"entity_id": "light.something_else", "state": "on", "attributes": {}}]
+    )
 
     with caplog.at_level("WARNING"):
         for _ in range(5):
@@ -154,14 +161,14 @@ def test_a_missing_entity_is_reported_once_not_every_poll(led_manager, caplog):
 def test_a_missing_entity_recovers_once_it_appears(led_manager):
     """Creating the script in Home Assistant must light its pad without a
     restart of the controller."""
-    led_manager.ha_client.get_all_states.return_value = [
-        {"entity_id": "light.something_else", "state": "on", "attributes": {}}
-    ]
+    led_manager.ha_client.get_state_map.return_value = _by_id(
+        [{"entity_id": "light.something_else", "state": "on", "attributes": {}}]
+    )
     led_manager.update_all(dry_run=False)
 
-    led_manager.ha_client.get_all_states.return_value = [
-        {"entity_id": "light.a", "state": "on", "attributes": {"brightness": 255}}
-    ]
+    led_manager.ha_client.get_state_map.return_value = _by_id(
+        [{"entity_id": "light.a", "state": "on", "attributes": {"brightness": 255}}]
+    )
     changes, _ = led_manager.update_all(dry_run=False)
 
     assert changes == [(81, "green_1", 0)]
@@ -185,10 +192,16 @@ def test_pad_greys_out_when_the_thing_behind_it_is_powered_off(monkeypatch):
         {45: "binary_sensor.the_machine"},
     )
     lm = _gated_manager()
-    lm.ha_client.get_all_states.return_value = [
-        {"entity_id": "script.do_a_thing", "state": "off", "attributes": {}},
-        {"entity_id": "binary_sensor.the_machine", "state": "off", "attributes": {}},
-    ]
+    lm.ha_client.get_state_map.return_value = _by_id(
+        [
+            {"entity_id": "script.do_a_thing", "state": "off", "attributes": {}},
+            {
+                "entity_id": "binary_sensor.the_machine",
+                "state": "off",
+                "attributes": {},
+            },
+        ]
+    )
 
     changes, _ = lm.update_all(dry_run=False)
 
@@ -202,10 +215,12 @@ def test_pad_lights_normally_once_the_dependency_is_up(monkeypatch):
         {45: "binary_sensor.the_machine"},
     )
     lm = _gated_manager()
-    lm.ha_client.get_all_states.return_value = [
-        {"entity_id": "script.do_a_thing", "state": "off", "attributes": {}},
-        {"entity_id": "binary_sensor.the_machine", "state": "on", "attributes": {}},
-    ]
+    lm.ha_client.get_state_map.return_value = _by_id(
+        [
+            {"entity_id": "script.do_a_thing", "state": "off", "attributes": {}},
+            {"entity_id": "binary_sensor.the_machine", "state": "on", "attributes": {}},
+        ]
+    )
 
     changes, _ = lm.update_all(dry_run=False)
 
@@ -220,9 +235,9 @@ def test_a_missing_gate_entity_closes_the_pad(monkeypatch):
         {45: "binary_sensor.typo"},
     )
     lm = _gated_manager()
-    lm.ha_client.get_all_states.return_value = [
-        {"entity_id": "script.do_a_thing", "state": "off", "attributes": {}}
-    ]
+    lm.ha_client.get_state_map.return_value = _by_id(
+        [{"entity_id": "script.do_a_thing", "state": "off", "attributes": {}}]
+    )
 
     changes, _ = lm.update_all(dry_run=False)
 
@@ -237,9 +252,9 @@ def test_pads_without_a_gate_are_untouched(monkeypatch):
     disco = MagicMock()
     disco.active = False
     lm = LEDManager(MagicMock(), MagicMock(), {81: "light.a"}, disco)
-    lm.ha_client.get_all_states.return_value = [
-        {"entity_id": "light.a", "state": "on", "attributes": {"brightness": 255}}
-    ]
+    lm.ha_client.get_state_map.return_value = _by_id(
+        [{"entity_id": "light.a", "state": "on", "attributes": {"brightness": 255}}]
+    )
 
     changes, _ = lm.update_all(dry_run=False)
 
@@ -252,13 +267,15 @@ def test_idle_player_with_an_empty_queue_greys_out():
     disco = MagicMock()
     disco.active = False
     lm = LEDManager(MagicMock(), MagicMock(), {55: "media_player.speaker"}, disco)
-    lm.ha_client.get_all_states.return_value = [
-        {
-            "entity_id": "media_player.speaker",
-            "state": "idle",
-            "attributes": {"volume_level": 0.19, "source": "Music Assistant Queue"},
-        }
-    ]
+    lm.ha_client.get_state_map.return_value = _by_id(
+        [
+            {
+                "entity_id": "media_player.speaker",
+                "state": "idle",
+                "attributes": {"volume_level": 0.19, "source": "Music Assistant Queue"},
+            }
+        ]
+    )
 
     changes, _ = lm.update_all(dry_run=False)
 
@@ -274,13 +291,15 @@ def test_pad_stays_lit_for_a_player_that_queues_on_the_device():
     lm = LEDManager(
         MagicMock(), MagicMock(), {65: "media_player.living_room_sonos"}, disco
     )
-    lm.ha_client.get_all_states.return_value = [
-        {
-            "entity_id": "media_player.living_room_sonos",
-            "state": "idle",
-            "attributes": {"volume_level": 0.15},
-        }
-    ]
+    lm.ha_client.get_state_map.return_value = _by_id(
+        [
+            {
+                "entity_id": "media_player.living_room_sonos",
+                "state": "idle",
+                "attributes": {"volume_level": 0.15},
+            }
+        ]
+    )
 
     changes, _ = lm.update_all(dry_run=False)
 
@@ -292,9 +311,9 @@ def test_paused_player_stays_lit():
     disco = MagicMock()
     disco.active = False
     lm = LEDManager(MagicMock(), MagicMock(), {55: "media_player.speaker"}, disco)
-    lm.ha_client.get_all_states.return_value = [
-        {"entity_id": "media_player.speaker", "state": "paused", "attributes": {}}
-    ]
+    lm.ha_client.get_state_map.return_value = _by_id(
+        [{"entity_id": "media_player.speaker", "state": "paused", "attributes": {}}]
+    )
 
     changes, _ = lm.update_all(dry_run=False)
 
@@ -306,9 +325,9 @@ def test_volume_pad_greys_out_when_its_player_is_unavailable():
     disco = MagicMock()
     disco.active = False
     lm = LEDManager(MagicMock(), MagicMock(), {66: "volume_up.media_player.x"}, disco)
-    lm.ha_client.get_all_states.return_value = [
-        {"entity_id": "media_player.x", "state": "unavailable", "attributes": {}}
-    ]
+    lm.ha_client.get_state_map.return_value = _by_id(
+        [{"entity_id": "media_player.x", "state": "unavailable", "attributes": {}}]
+    )
 
     changes, _ = lm.update_all(dry_run=False)
 
@@ -322,9 +341,9 @@ def test_volume_pad_greys_out_when_the_player_reports_no_level():
     lm = LEDManager(
         MagicMock(), MagicMock(), {56: "volume_down.media_player.tv"}, disco
     )
-    lm.ha_client.get_all_states.return_value = [
-        {"entity_id": "media_player.tv", "state": "off", "attributes": {}}
-    ]
+    lm.ha_client.get_state_map.return_value = _by_id(
+        [{"entity_id": "media_player.tv", "state": "off", "attributes": {}}]
+    )
 
     changes, _ = lm.update_all(dry_run=False)
 
@@ -335,13 +354,15 @@ def test_volume_pad_is_active_when_a_level_is_reported():
     disco = MagicMock()
     disco.active = False
     lm = LEDManager(MagicMock(), MagicMock(), {56: "volume_down.media_player.x"}, disco)
-    lm.ha_client.get_all_states.return_value = [
-        {
-            "entity_id": "media_player.x",
-            "state": "idle",
-            "attributes": {"volume_level": 0.4},
-        }
-    ]
+    lm.ha_client.get_state_map.return_value = _by_id(
+        [
+            {
+                "entity_id": "media_player.x",
+                "state": "idle",
+                "attributes": {"volume_level": 0.4},
+            }
+        ]
+    )
 
     changes, _ = lm.update_all(dry_run=False)
 
@@ -356,17 +377,19 @@ def plant_manager():
 
 
 def _plant(problem):
-    return [
-        {
-            "entity_id": "plant.monstera",
-            "state": "problem" if problem != "none" else "ok",
-            "attributes": {"problem": problem},
-        }
-    ]
+    return _by_id(
+        [
+            {
+                "entity_id": "plant.monstera",
+                "state": "problem" if problem != "none" else "ok",
+                "attributes": {"problem": problem},
+            }
+        ]
+    )
 
 
 def test_notification_pads_names_the_pad_not_just_the_fact(plant_manager):
-    plant_manager.ha_client.get_all_states.return_value = _plant("moisture low")
+    plant_manager.ha_client.get_state_map.return_value = _plant("moisture low")
 
     _, has_notifications = plant_manager.update_all(dry_run=False)
 
@@ -377,7 +400,7 @@ def test_notification_pads_names_the_pad_not_just_the_fact(plant_manager):
 def test_notification_pads_survive_a_dry_run(plant_manager):
     """Every poll is a dry run while the board sleeps, which is exactly when
     the sleeping board needs to know which pads to hold lit."""
-    plant_manager.ha_client.get_all_states.return_value = _plant("moisture low")
+    plant_manager.ha_client.get_state_map.return_value = _plant("moisture low")
 
     plant_manager.update_all(dry_run=True)
 
@@ -386,7 +409,7 @@ def test_notification_pads_survive_a_dry_run(plant_manager):
 
 
 def test_healthy_plant_reports_no_notification_pads(plant_manager):
-    plant_manager.ha_client.get_all_states.return_value = _plant("none")
+    plant_manager.ha_client.get_state_map.return_value = _plant("none")
 
     _, has_notifications = plant_manager.update_all(dry_run=False)
 
@@ -404,3 +427,328 @@ def test_unreachable_is_dimmer_than_merely_switched_off():
         return 0.2126 * r + 0.7152 * g + 0.0722 * b
 
     assert luminance(UNAVAILABLE_COLOR) < luminance(OFF_COLOR)
+
+
+def test_unchanged_states_skip_the_render(led_manager):
+    led_manager.ha_client.get_state_map.return_value = _states("on")
+    led_manager.update_all()
+    led_manager.ha_client.get_state_map.return_value = UNCHANGED
+
+    changed, _ = led_manager.update_all()
+
+    assert changed == []
+    assert led_manager.skipped_renders == 1
+    led_manager.ha_client.get_state_map.assert_called_with(if_changed=True)
+
+
+def test_nothing_to_compare_against_asks_for_the_full_states(led_manager):
+    """After invalidate_cache() the manager has no states of its own, so it
+    must not be told "unchanged"."""
+    led_manager.ha_client.get_state_map.return_value = _states("on")
+    led_manager.update_all()
+    led_manager.invalidate_cache()
+
+    changed, _ = led_manager.update_all()
+
+    led_manager.ha_client.get_state_map.assert_called_with(if_changed=False)
+    assert changed
+    assert led_manager.skipped_renders == 0
+
+
+def test_identical_pushed_snapshots_skip_the_render(led_manager):
+    led_manager.update_all(state_map=_states("on"))
+
+    led_manager.update_all(state_map=_states("on"))
+
+    assert led_manager.skipped_renders == 1
+    led_manager.backend.send_note.assert_called_once()
+
+
+def test_disco_renders_even_unchanged_states(led_manager):
+    """The disco pad picks a new colour on every render."""
+    led_manager.disco.active = True
+    led_manager.update_all(state_map=_states("on"))
+
+    led_manager.update_all(state_map=_states("on"))
+
+    assert led_manager.skipped_renders == 0
+
+
+def test_a_committed_dry_run_is_not_undone_by_a_skip(led_manager):
+    """Asleep, a change is previewed and committed. When the house goes back
+    to the states last painted, that is a change all over again."""
+    led_manager.update_all(state_map=_states("on"))
+    changed, _ = led_manager.update_all(dry_run=True, state_map=_states("off"))
+    led_manager.commit(changed)
+
+    changed, _ = led_manager.update_all(dry_run=True, state_map=_states("on"))
+
+    assert changed == [(81, "green_1", 0)]
+
+
+HOUSE = {
+    "light.a": "on",
+    "light.b": "off",
+    "media_player.sonos": "paused",
+    "switch.machine_power": "off",
+    "binary_sensor.machine": "on",
+}
+
+
+def _house(**changed):
+    """HOUSE as a state map, with some entities changed by id."""
+    states = {**HOUSE, **changed}
+    return {
+        entity_id: {
+            "entity_id": entity_id,
+            "state": state,
+            "attributes": {"volume_level": 0.3},
+        }
+        for entity_id, state in states.items()
+    }
+
+
+@pytest.fixture
+def board(monkeypatch):
+    monkeypatch.setattr(
+        "ha_launchpad.core.logic.led_manager.PAD_AVAILABILITY",
+        {45: "binary_sensor.machine"},
+    )
+    disco = MagicMock()
+    disco.active = False
+    return LEDManager(
+        MagicMock(),
+        MagicMock(),
+        {
+            81: "light.a",
+            82: "light.b",
+            65: "media_player.sonos",
+            66: "volume_up.media_player.sonos",
+            45: "switch.machine_power",
+            78: "disco_toggle",
+        },
+        disco,
+    )
+
+
+class _Spy:
+    """A pad plan that notes every time it is asked for a colour."""
+
+    def __init__(self, plan, calls):
+        self._plan = plan
+        self._calls = calls
+
+    def __getattr__(self, name):
+        return getattr(self._plan, name)
+
+    def color(self, state_map):
+        self._calls.append(self._plan.entity_id)
+        return self._plan.color(state_map)
+
+
+def _rendered(board, state_map):
+    """The entities of the pads update_all() looked at."""
+    calls = []
+    plans = board._plans
+    board._plans = {note: _Spy(plan, calls) for note, plan in plans.items()}
+    board.update_all(state_map=state_map)
+    board._plans = plans
+    return calls
+
+
+def test_the_dependency_index_covers_volume_targets_and_gates(board):
+    assert board._pads_by_entity == {
+        "light.a": {81},
+        "light.b": {82},
+        "media_player.sonos": {65, 66},
+        "switch.machine_power": {45},
+        "binary_sensor.machine": {45},
+    }
+    assert board.watched_entities() == set(board._pads_by_entity)
+
+
+def test_only_pads_behind_a_changed_entity_are_rendered(board):
+    assert len(_rendered(board, _house())) == 6
+
+    rendered = _rendered(board, _house(**{"media_player.sonos": "playing"}))
+
+    assert sorted(rendered) == [
+        "media_player.sonos",
+        "volume_up.media_player.sonos",
+    ]
+    assert board.partial_renders == 1
+    board.backend.send_note.assert_called_with(65, "cyan_0", 2)
+
+
+def test_a_gate_going_down_rerenders_the_pad_it_gates(board):
+    board.update_all(state_map=_house())
+
+    changes, _ = board.update_all(state_map=_house(**{"binary_sensor.machine": "off"}))
+
+    assert changes == [(45, UNAVAILABLE_COLOR, 0)]
+    assert board.is_unavailable(45)
+
+
+def test_a_forced_repaint_renders_every_pad(board):
+    board.update_all(state_map=_house())
+    board.invalidate_cache()
+
+    assert len(_rendered(board, _house(**{"light.a": "off"}))) == 6
+    assert board.partial_renders == 0
+
+
+def test_stopping_disco_rerenders_every_pad(board):
+    board.disco.active = True
+    board.update_all(state_map=_house())
+    assert _rendered(board, _house(**{"light.b": "on"})) == [
+        "light.b",
+        "disco_toggle",
+    ]
+
+    board.disco.active = False
+
+    assert len(_rendered(board, _house(**{"light.b": "on"}))) == 6
+
+
+def _light(state, brightness=None):
+    attributes = {} if brightness is None else {"brightness": brightness}
+    return {
+        "light.a": {"entity_id": "light.a", "state": state, "attributes": attributes}
+    }
+
+
+def test_a_toggle_is_painted_before_home_assistant_answers(led_manager):
+    led_manager.update_all(state_map=_light("on", 255))
+    led_manager.backend.reset_mock()
+
+    assert led_manager.paint_prediction(81)
+
+    led_manager.backend.send_note.assert_called_once_with(81, OFF_COLOR, 0)
+    assert led_manager.is_provisional(81)
+
+
+def test_a_dimmed_light_is_predicted_back_at_its_dimmed_shade(led_manager):
+    """Home Assistant turns a light back on at the brightness it had."""
+    led_manager.update_all(state_map=_light("on", 60))
+    led_manager.update_all(state_map=_light("off"))
+    led_manager.backend.reset_mock()
+
+    assert led_manager.paint_prediction(81)
+
+    led_manager.backend.send_note.assert_called_once_with(81, "green_3", 0)
+
+
+def test_a_disco_light_is_not_predicted_while_disco_runs():
+    disco = MagicMock()
+    disco.active = True
+    light = DISCO_LIGHTS[0]
+    lm = LEDManager(MagicMock(), MagicMock(), {81: light}, disco)
+    lm.update_all(
+        state_map={light: {"entity_id": light, "state": "off", "attributes": {}}}
+    )
+
+    assert not lm.paint_prediction(81)
+
+
+def test_a_prediction_outlives_polls_that_predate_the_toggle(led_manager):
+    """The poll in flight when the pad was pressed still says "on". Repainting
+    from it would flick the pad back and forth."""
+    led_manager.update_all(state_map=_light("on", 255))
+    led_manager.paint_prediction(81)
+    led_manager.backend.reset_mock()
+
+    changed, _ = led_manager.update_all(state_map=_light("on", 255))
+
+    assert changed == []
+    led_manager.backend.send_note.assert_not_called()
+    assert led_manager.is_provisional(81)
+
+
+def test_the_reported_state_settles_the_prediction(led_manager):
+    """Predicted bright, came back dim: what Home Assistant says wins."""
+    led_manager.update_all(state_map=_light("off"))
+    led_manager.paint_prediction(81)
+    led_manager.backend.reset_mock()
+
+    led_manager.update_all(state_map=_light("on", 60))
+
+    led_manager.backend.send_note.assert_called_once_with(81, "green_3", 0)
+    assert not led_manager.is_provisional(81)
+
+
+def test_a_prediction_that_never_lands_times_out(led_manager, monkeypatch):
+    led_manager.update_all(state_map=_light("on", 255))
+    led_manager.paint_prediction(81)
+    led_manager.backend.reset_mock()
+
+    later = led_manager._provisional[81].deadline + 0.1
+    monkeypatch.setattr(
+        "ha_launchpad.core.logic.led_manager.time.monotonic", lambda: later
+    )
+    led_manager.update_all(state_map=_light("on", 255))
+
+    led_manager.backend.send_note.assert_called_once_with(81, "green_1", 0)
+    assert not led_manager.is_provisional(81)
+
+
+def test_a_failed_toggle_rolls_the_pad_back(led_manager):
+    led_manager.update_all(state_map=_light("on", 255))
+    led_manager.paint_prediction(81)
+    led_manager.backend.reset_mock()
+
+    led_manager.roll_back(81)
+
+    led_manager.backend.send_note.assert_called_once_with(81, "green_1", 0)
+    assert not led_manager.is_provisional(81)
+
+
+@pytest.mark.parametrize(
+    ("entity_id", "state", "attributes", "expected"),
+    [
+        ("media_player.x", "playing", {}, (OFF_COLOR, 0)),
+        ("media_player.x", "paused", {"media_title": "Song"}, ("cyan_0", 2)),
+        # Nothing loaded, so a press cannot start anything.
+        ("media_player.x", "idle", {}, None),
+        # Whether a TV comes up idle, on or playing is anybody's guess.
+        ("media_player.x", "off", {"supported_features": 128}, None),
+        ("scene.evening", "scening", {}, None),
+        ("light.a", "unavailable", {}, None),
+    ],
+)
+def test_only_certain_outcomes_are_predicted(entity_id, state, attributes, expected):
+    disco = MagicMock()
+    disco.active = False
+    lm = LEDManager(MagicMock(), MagicMock(), {81: entity_id}, disco)
+    lm.update_all(
+        state_map={
+            entity_id: {
+                "entity_id": entity_id,
+                "state": state,
+                "attributes": attributes,
+            }
+        }
+    )
+    lm.backend.reset_mock()
+
+    painted = lm.paint_prediction(81)
+
+    assert painted == (expected is not None)
+    if expected is not None:
+        lm.backend.send_note.assert_called_once_with(81, *expected)
+
+
+def test_a_second_press_in_flight_gives_up_predicting(led_manager):
+    led_manager.update_all(state_map=_light("on", 255))
+    led_manager.paint_prediction(81)
+
+    assert not led_manager.paint_prediction(81)
+    assert not led_manager.is_provisional(81)
+
+
+def test_invalidate_cache_blanks_the_painted_board(led_manager):
+    led_manager.update_all(state_map=_states("on"))
+    assert led_manager._painted[81] == pack_color("green_1", 0)
+
+    led_manager.invalidate_cache()
+
+    assert set(led_manager._painted) == {UNPAINTED}
@@ -0,0 +1,101 @@
+from unittest.mock import MagicMock
+
+import pytest
+
+from ha_launchpad.config.mapping import BUTTON_MAP, PAD_AVAILABILITY
+from ha_launchpad.core.logic.led_manager import LEDManager
+from ha_launchpad.core.logic.pad_plans import (
+    DiscoPlan,
+    EntityPlan,
+    MediaPlayerPlan,
+    PlantPlan,
+    SleepPlan,
+    SwitchPlan,
+    VolumePlan,
+    compile_plans,
+)
+
+
+def _compile(button_map, availability=None, disco_lights=()):
+    disco = MagicMock()
+    disco.active = False
+    return compile_plans(button_map, availability or {}, disco, disco_lights, set())
+
+
+def test_the_real_map_compiles():
+    plans = _compile(BUTTON_MAP, PAD_AVAILABILITY)
+
+    assert list(plans) == list(BUTTON_MAP)
+
+
+def test_each_kind_of_pad_gets_its_own_plan():
+    plans = _compile(
+        {
+            11: "light.a",
+            12: "switch.b",
+            13: "media_player.c",
+            14: "volume_up.media_player.c",
+            15: "plant.d",
+            16: "disco_toggle",
+            17: "manual_sleep",
+            18: "input_boolean.e",
+        }
+    )
+
+    assert [type(plan) for plan in plans.values()] == [
+        SwitchPlan,
+        SwitchPlan,
+        MediaPlayerPlan,
+        VolumePlan,
+        PlantPlan,
+        DiscoPlan,
+        SleepPlan,
+        EntityPlan,
+    ]
+    assert plans[11].domain == "light"
+    assert plans[14].target == "media_player.c"
+    assert plans[15].notifies
+
+
+def test_a_plan_knows_everything_it_depends_on():
+    plans = _compile(
+        {14: "volume_up.media_player.c", 16: "disco_toggle"},
+        availability={14: "binary_sensor.amp", 16: "binary_sensor.power"},
+    )
+
+    assert plans[14].depends_on == ("media_player.c", "binary_sensor.amp")
+    assert plans[14].gate == "binary_sensor.amp"
+    assert plans[16].depends_on == ("binary_sensor.power",)
+
+
+def test_disco_lights_are_marked():
+    plans = _compile({11: "light.a", 12: "light.b"}, disco_lights=["light.b"])
+
+    assert [plan.disco_light for plan in plans.values()] == [False, True]
+
+
+def test_plans_carry_no_instance_dict():
+    for plan in _compile(BUTTON_MAP, PAD_AVAILABILITY).values():
+        assert not hasattr(plan, "__dict__")
+
+
+@pytest.mark.parametrize(
+    ("button_map", "availability", "message"),
+    [
+        ({11: "light"}, {}, "not an entity id"),
+        ({11: "light."}, {}, "not an entity id"),
+        ({11: ".a"}, {}, "not an entity id"),
+        ({11: "volume_up.light.a"}, {}, "does not name a media player"),
+        ({11: "volume_down.sonos"}, {}, "does not name a media player"),
+        ({128: "light.a"}, {}, "not a MIDI note"),
+        ({11: "light.a"}, {11: "amp"}, "availability gate"),
+    ],
+)
+def test_malformed_entries_are_rejected(button_map, availability, message):
+    with pytest.raises(ValueError, match=message):
+        _compile(button_map, availability)
+
+
+def test_a_malformed_map_fails_when_the_manager_is_built():
+    with pytest.raises(ValueError, match="Pad 11"):
+        LEDManager(MagicMock(), MagicMock(), {11: "lamp"}, MagicMock())
@@ -0,0 +1,142 @@
+import random
+import threading
+import time
+
+import pytest
+
+from ha_launchpad.core.logic.poll_scheduler import PollScheduler
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def _scheduler(clock, **kwargs):
+    options = {"boost": 5.0, "growth": 2.0, "jitter": 0.0, "idle_interval": 10.0}
+    options.update(kwargs)
+    return PollScheduler(1.0, 8.0, clock=clock, **options)
+
+
+def test_deadlines_do_not_drift_by_the_poll_time(clock):
+    scheduler = _scheduler(clock)
+
+    first = scheduler.next_deadline()
+    # The poll took 0.4s; the next one is still due a whole interval after
+    # the previous deadline, not after the poll finished.
+    clock.now = first + 0.4
+    second = scheduler.next_deadline()
+
+    assert second - first == pytest.approx(1.0)
+
+
+def test_interval_stretches_once_the_boost_has_passed(clock):
+    scheduler = _scheduler(clock)
+
+    clock.now += 2.0
+    scheduler.record(changed=False)
+    assert scheduler.interval == 1.0
+
+    intervals = []
+    for _ in range(4):
+        clock.now += 6.0
+        scheduler.record(changed=False)
+        intervals.append(scheduler.interval)
+
+    assert intervals == [2.0, 4.0, 8.0, 8.0]
+
+
+def test_a_change_snaps_back_to_the_minimum(clock):
+    scheduler = _scheduler(clock)
+    clock.now += 6.0
+    scheduler.record(changed=False)
+    scheduler.record(changed=False)
+    assert scheduler.interval == 4.0
+
+    scheduler.record(changed=True)
+    assert scheduler.interval == 1.0
+
+    # And holds there for the boost, even through quiet polls.
+    clock.now += 4.0
+    scheduler.record(changed=False)
+    assert scheduler.interval == 1.0
+
+
+def test_activity_brings_a_distant_poll_forward(clock):
+    scheduler = _scheduler(clock)
+    clock.now += 6.0
+    for _ in range(3):
+        scheduler.record(changed=False)
+    deadline = scheduler.next_deadline()
+    assert deadline - clock.now > 1.0
+
+    scheduler.activity()
+
+    assert scheduler.interval == 1.0
+    assert scheduler._deadline == pytest.approx(clock.now + 1.0)
+
+
+def test_an_overrun_poll_does_not_fire_the_missed_ones(clock):
+    scheduler = _scheduler(clock)
+    scheduler.next_deadline()
+
+    clock.now += 30.0
+
+    assert scheduler.next_deadline() == clock.now + 1.0
+
+
+def test_a_poll_slower_than_the_interval_still_waits(clock):
+    scheduler = _scheduler(clock, boost=1000.0)
+    deadline = scheduler.next_deadline()
+
+    waits = []
+    for _ in range(5):
+        # Each poll starts when it is due and takes 2s, against a 1s interval.
+        clock.now = max(clock.now, deadline) + 2.0
+        deadline = scheduler.next_deadline()
+        waits.append(deadline - clock.now)
+
+    assert all(wait > 0 for wait in waits)
+
+
+def test_asleep_polls_at_the_idle_interval(clock):
+    scheduler = _scheduler(clock)
+    start = scheduler.next_deadline()
+
+    assert scheduler.next_deadline(idle=True) - start == pytest.approx(10.0)
+
+
+def test_jitter_stays_within_its_fraction(clock):
+    scheduler = _scheduler(clock, jitter=0.1, rng=random.Random(7))
+
+    previous = scheduler.next_deadline()
+    gaps = []
+    for _ in range(200):
+        deadline = scheduler.next_deadline()
+        gaps.append(deadline - previous)
+        previous = deadline
+
+    assert all(0.9 <= gap <= 1.1 for gap in gaps)
+    assert len(set(gaps)) > 1
+
+
+def test_stop_ends_a_wait_at_once():
+    scheduler = PollScheduler(60.0, 60.0, jitter=0.0)
+    scheduler.next_deadline()
+    waiter = threading.Thread(target=scheduler.wait)
+    started = time.monotonic()
+    waiter.start()
+
+    scheduler.stop()
+    waiter.join(2.0)
+
+    assert not waiter.is_alive()
+    assert time.monotonic() - started < 2.0
@@ -3,13 +3,14 @@ from unittest.mock import MagicMock
 import pytest
 
 from ha_launchpad.features.color_picker import ColorPicker
+from ha_launchpad.infrastructure.ha.commands import CallService, Toggle
 
 
 @pytest.fixture
 def color_picker():
-    ha_client = MagicMock()
+    executor = MagicMock()
     backend = MagicMock()
-    return ColorPicker(ha_client, backend)
+    return ColorPicker(executor, backend)
 
 
 def test_initial_state(color_picker):
@@ -33,16 +34,15 @@ def test_exit_mode(color_picker):
     assert not color_picker.active
     assert color_picker.target_entity is None
 
-    # Should turn off palettes
-    color_picker.backend.send_note.assert_any_call(41, "off")  # color note
-    color_picker.backend.send_note.assert_any_call(21, "off")  # brightness note
+    # Takes the palettes off, uncovering the board underneath
+    color_picker.backend.clear_all.assert_called_once_with()
 
 
 def test_handle_input_brightness_pick(color_picker):
     color_picker.enter("light.test", 81)
 
     # Reset mocks
-    color_picker.ha_client.reset_mock()
+    color_picker.executor.reset_mock()
 
     # Press brightness note (e.g. 21 is 0.1)
     res = color_picker.handle_input(21)
@@ -53,8 +53,8 @@ def test_handle_input_brightness_pick(color_picker):
     assert not color_picker.active
 
     # Should call turn_on with brightness
-    color_picker.ha_client.call_service.assert_called_with(
-        "light", "turn_on", "light.test", brightness=int(0.1 * 255)
+    color_picker.executor.submit.assert_called_with(
+        CallService("light", "turn_on", "light.test", {"brightness": int(0.1 * 255)})
     )
 
 
@@ -62,7 +62,7 @@ def test_handle_input_source_note_toggle(color_picker):
     color_picker.enter("light.test", 81)
 
     # Reset mocks
-    color_picker.ha_client.reset_mock()
+    color_picker.executor.reset_mock()
 
     # Press source note -> should toggle
     res = color_picker.handle_input(81)
@@ -71,14 +71,14 @@ def test_handle_input_source_note_toggle(color_picker):
     assert res["source_note"] == 81
     assert res["pulse_color"] is None
     assert not color_picker.active
-    color_picker.ha_client.toggle_entity.assert_called_with("light.test")
+    color_picker.executor.submit.assert_called_with(Toggle("light.test"))
 
 
 def test_handle_input_palette_pick(color_picker):
     color_picker.enter("light.test", 81)
 
     # Reset mocks
-    color_picker.ha_client.reset_mock()
+    color_picker.executor.reset_mock()
 
     # Press palette note (e.g. 41 is red_1)
     res = color_picker.handle_input(41)
@@ -89,10 +89,13 @@ def test_handle_input_palette_pick(color_picker):
     assert not color_picker.active
 
     # Should call turn_on with rgb
-    color_picker.ha_client.call_service.assert_called()
-    call_args = color_picker.ha_client.call_service.call_args
-    assert call_args[0] == ("light", "turn_on", "light.test")
-    assert "rgb_color" in call_args[1]
+    command = color_picker.executor.submit.call_args.args[0]
+    assert (command.domain, command.service, command.entity_id) == (
+        "light",
+        "turn_on",
+        "light.test",
+    )
+    assert "rgb_color" in command.data
 
 
 def test_handle_input_ignore_unmapped(color_picker):
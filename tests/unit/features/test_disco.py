@@ -1,10 +1,17 @@
+from concurrent.futures import Future
 from itertools import pairwise
 from unittest.mock import MagicMock
 
 import pytest
 
-from ha_launchpad.config.settings import DISCO_LIGHTS, DISCO_TRANSITION
+from ha_launchpad.config.settings import (
+    DISCO_BRIGHTNESS,
+    DISCO_LIGHTS,
+    DISCO_TRANSITION,
+)
 from ha_launchpad.features.disco import DiscoMode
+from ha_launchpad.infrastructure.ha.client import HomeAssistantClient
+from ha_launchpad.infrastructure.ha.standin import HomeAssistantStandIn
 
 
 @pytest.fixture
@@ -28,10 +35,10 @@ def test_brightness_is_set_once_at_start_not_per_step(disco):
 
     brightness_calls = [
         c
-        for c in disco.ha_client.call_service.call_args_list
+        for c in disco.ha_client.call_service_batched.call_args_list
         if "brightness" in c.kwargs
     ]
-    assert len(brightness_calls) == len(DISCO_LIGHTS)
+    assert [c.args[2] for c in brightness_calls] == DISCO_LIGHTS
 
     colour_calls = _colour_calls(disco.ha_client)
     assert colour_calls, "expected at least one colour step"
@@ -78,3 +85,42 @@ def test_lights_are_never_turned_off_mid_effect(disco):
     assert all(
         c.args[1] != "turn_off" for c in disco.ha_client.call_service.call_args_list
     )
+
+
+def test_brightness_for_every_bulb_is_batched_and_not_awaited():
+    """One request for all the bulbs rather than a burst at the gateway, and
+    the disco press does not wait on it."""
+    with HomeAssistantStandIn(dict.fromkeys(DISCO_LIGHTS, "off")) as ha:
+        disco = DiscoMode(HomeAssistantClient(ha.url, ha.token))
+        disco.start()
+        assert all(f.result(2) for f in disco._setup)
+        disco.stop()
+
+    assert [call for call in ha.service_calls if "brightness" in call[3]] == [
+        (
+            "rest",
+            "light",
+            "turn_on",
+            {
+                "entity_id": DISCO_LIGHTS,
+                "brightness": DISCO_BRIGHTNESS,
+                "transition": 1,
+            },
+        )
+    ]
+
+
+def test_colour_steps_wait_for_the_brightness_to_land():
+    client = MagicMock()
+    pending = Future()
+    client.call_service_batched.return_value = pending
+    disco = DiscoMode(client)
+
+    disco.start()
+    disco._stop_event.wait(0.2)
+    assert not _colour_calls(client)
+
+    pending.set_result(True)
+    disco._stop_event.wait(0.2)
+    disco.stop()
+    assert _colour_calls(client)
@@ -0,0 +1,87 @@
+from unittest.mock import MagicMock
+
+import pytest
+
+from ha_launchpad.infrastructure.ha.batcher import ServiceBatcher
+from ha_launchpad.infrastructure.ha.client import HomeAssistantClient
+from ha_launchpad.infrastructure.ha.lanes import TrafficClass
+
+
+@pytest.fixture
+def send():
+    return MagicMock(return_value=True)
+
+
+@pytest.fixture
+def batcher(send):
+    return ServiceBatcher(send, window=0.05)
+
+
+def test_identical_calls_in_the_window_become_one_request(batcher, send):
+    futures = [
+        batcher.submit("light", "turn_on", light, {"brightness": 254})
+        for light in ("light.a", "light.b", "light.c")
+    ]
+
+    assert all(f.result(1) for f in futures)
+    send.assert_called_once_with(
+        "light", "turn_on", ["light.a", "light.b", "light.c"], {"brightness": 254}
+    )
+    assert batcher.metrics() == {"sent": 1, "batched": 2}
+
+
+def test_calls_with_different_data_are_never_merged(batcher, send):
+    a = batcher.submit("light", "turn_on", "light.a", {"brightness": 100})
+    b = batcher.submit("light", "turn_on", "light.b", {"brightness": 200})
+    c = batcher.submit("light", "turn_off", "light.c", {"brightness": 100})
+    for future in (a, b, c):
+        future.result(1)
+
+    assert sorted(call.args[2] for call in send.call_args_list) == [
+        ["light.a"],
+        ["light.b"],
+        ["light.c"],
+    ]
+
+
+def test_data_compares_by_value_whatever_the_key_order(batcher, send):
+    a = batcher.submit("light", "turn_on", "light.a", {"rgb_color": [1, 2, 3], "x": 1})
+    b = batcher.submit("light", "turn_on", "light.b", {"x": 1, "rgb_color": [1, 2, 3]})
+    a.result(1)
+    b.result(1)
+
+    send.assert_called_once()
+
+
+def test_an_entity_asked_for_twice_is_named_once(batcher, send):
+    first = batcher.submit("light", "turn_on", "light.a", {})
+    second = batcher.submit("light", "turn_on", "light.a", {})
+
+    assert first.result(1) and second.result(1)
+    send.assert_called_once_with("light", "turn_on", ["light.a"], {})
+
+
+def test_every_caller_hears_a_failure(batcher, send):
+    send.side_effect = RuntimeError("boom")
+    futures = [batcher.submit("light", "turn_on", e, {}) for e in ("light.a", "b.b")]
+
+    assert [f.result(1) for f in futures] == [False, False]
+
+
+def test_client_sends_a_batch_as_an_entity_id_list():
+    client = HomeAssistantClient("http://test.local", "token")
+    client.call_service = MagicMock(return_value=True)
+
+    futures = [
+        client.call_service_batched("light", "turn_on", light, brightness=254)
+        for light in ("light.a", "light.b")
+    ]
+
+    assert all(f.result(1) for f in futures)
+    client.call_service.assert_called_once_with(
+        "light",
+        "turn_on",
+        ["light.a", "light.b"],
+        lane=TrafficClass.COMMAND,
+        brightness=254,
+    )
@@ -0,0 +1,105 @@
+import logging
+
+import pytest
+
+from ha_launchpad.infrastructure.ha.breaker import BreakerState, CircuitBreaker
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def breaker(clock):
+    return CircuitBreaker(3, 2, probe_interval=2.0, max_probe_interval=8.0, clock=clock)
+
+
+def _open(breaker):
+    for _ in range(3):
+        breaker.record_failure("refused")
+
+
+def test_opens_after_consecutive_failures_only(breaker):
+    breaker.record_failure("refused")
+    breaker.record_failure("refused")
+    breaker.record_success()
+    breaker.record_failure("refused")
+    breaker.record_failure("refused")
+    assert breaker.allows_requests()
+
+    breaker.record_failure("refused")
+
+    assert breaker.state is BreakerState.OPEN
+    assert not breaker.allows_requests()
+
+
+def test_open_probes_on_a_growing_backoff(breaker, clock):
+    _open(breaker)
+    assert not breaker.probe_due()
+
+    clock.now += 2.0
+    assert breaker.probe_due()
+    breaker.record_failure("still down")
+
+    clock.now += 2.0
+    assert not breaker.probe_due()
+    clock.now += 2.0
+    assert breaker.probe_due()
+
+    for _ in range(5):
+        breaker.record_failure("still down")
+    clock.now += 7.9
+    assert not breaker.probe_due()
+    clock.now += 0.1
+    assert breaker.probe_due()
+
+
+def test_closes_after_consecutive_successful_probes(breaker, clock):
+    _open(breaker)
+    clock.now += 2.0
+
+    breaker.record_success()
+    assert breaker.state is BreakerState.HALF_OPEN
+    assert not breaker.allows_requests()
+    # Half-open confirms before every request, not on the backoff.
+    assert breaker.probe_due()
+
+    breaker.record_success()
+    assert breaker.state is BreakerState.CLOSED
+    assert breaker.allows_requests()
+    assert not breaker.probe_due()
+
+
+def test_a_failure_while_half_open_reopens(breaker, clock):
+    _open(breaker)
+    clock.now += 2.0
+    breaker.record_success()
+
+    breaker.record_failure("flapping")
+
+    assert breaker.state is BreakerState.OPEN
+    assert not breaker.probe_due()
+
+
+def test_an_outage_is_logged_once_each_way(breaker, clock, caplog):
+    caplog.set_level(logging.INFO, logger="ha_launchpad.infrastructure.ha.breaker")
+
+    for _ in range(10):
+        breaker.record_failure("refused")
+        clock.now += 10.0
+    breaker.record_success()
+    breaker.record_success()
+
+    messages = [r.getMessage() for r in caplog.records]
+    assert len(messages) == 3
+    assert "unreachable" in messages[0]
+    assert "reachable again" in messages[-1]
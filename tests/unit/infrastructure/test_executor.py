@@ -0,0 +1,205 @@
+import threading
+import time
+from typing import NamedTuple
+from unittest.mock import MagicMock
+
+import pytest
+
+from ha_launchpad.infrastructure.ha.commands import AdjustVolume, CallService, Toggle
+from ha_launchpad.infrastructure.ha.executor import Completion, ServiceExecutor
+
+
+@pytest.fixture
+def client():
+    return MagicMock()
+
+
+class Running(NamedTuple):
+    executor: ServiceExecutor
+    completions: list[Completion]
+
+
+@pytest.fixture
+def running(client):
+    completions = []
+    executor = ServiceExecutor(client, completions.append, workers=2, max_pending=2)
+    executor.start()
+    yield Running(executor, completions)
+    executor.stop()
+
+
+def test_each_command_runs_the_matching_client_call(running, client, wait_for):
+    executor, completions = running
+    executor.submit(Toggle("light.a")).result(1)
+    executor.submit(CallService("light", "turn_on", "light.a", {"brightness": 9}))
+    executor.submit(AdjustVolume("media_player.x", -0.07)).result(1)
+
+    assert wait_for(lambda: len(completions) == 3)
+    client.toggle_entity.assert_called_once_with("light.a")
+    client.call_service.assert_called_once_with(
+        "light", "turn_on", "light.a", brightness=9
+    )
+    client.adjust_volume.assert_called_once_with("media_player.x", -0.07)
+
+
+def test_a_slow_call_holds_up_neither_the_caller_nor_the_next_call(running, client):
+    """The point of it all: a 10 s Sonos must not freeze every other pad."""
+    executor = running.executor
+    release = threading.Event()
+    client.toggle_entity.side_effect = lambda entity_id: (
+        release.wait(2) if entity_id == "media_player.slow" else True
+    )
+
+    started = time.monotonic()
+    slow = executor.submit(Toggle("media_player.slow"))
+    fast = executor.submit(Toggle("light.fast"))
+    assert time.monotonic() - started < 0.1
+
+    assert fast.result(1) is True
+    assert not slow.done()
+    assert executor.metrics()["in_flight"] == 1
+
+    release.set()
+    assert slow.result(1) is True
+
+
+def test_completions_carry_the_command_and_its_result(running, client, wait_for):
+    executor, completions = running
+    client.toggle_entity.return_value = False
+
+    executor.submit(Toggle("light.a", note=81)).result(1)
+
+    assert wait_for(lambda: completions)
+    assert completions == [Completion(Toggle("light.a", note=81), False)]
+
+
+def test_a_full_queue_drops_the_press(client, wait_for):
+    """Mashing a pad while Home Assistant hangs must not queue up a minute of
+    presses to replay once it answers."""
+    release = threading.Event()
+    client.toggle_entity.side_effect = lambda _entity_id: release.wait(2)
+    executor = ServiceExecutor(client, workers=1, max_pending=1)
+    executor.start()
+    try:
+        executor.submit(Toggle("light.a"))
+        assert wait_for(lambda: executor.metrics()["in_flight"] == 1)
+        executor.submit(Toggle("light.b"))
+
+        dropped = executor.submit(Toggle("light.c"))
+
+        assert dropped.result(0) is False
+        assert executor.metrics() == {
+            "queue_depth": 1,
+            "in_flight": 1,
+            "completed": 0,
+            "failed": 0,
+            "rejected": 1,
+            "coalesced": 0,
+        }
+    finally:
+        release.set()
+        executor.stop()
+
+
+def test_a_raising_call_counts_as_failed(running, client, wait_for):
+    executor = running.executor
+    client.toggle_entity.side_effect = RuntimeError("boom")
+
+    assert executor.submit(Toggle("light.a")).result(1) is False
+    assert wait_for(lambda: executor.metrics()["failed"] == 1)
+
+
+def test_stop_fails_whatever_is_still_queued(client):
+    executor = ServiceExecutor(client, workers=1)
+
+    pending = executor.submit(Toggle("light.a"))
+    executor.stop()
+
+    assert pending.result(0) is False
+    client.toggle_entity.assert_not_called()
+
+
+class Blocked(NamedTuple):
+    executor: ServiceExecutor
+    release: threading.Event
+
+
+@pytest.fixture
+def blocked(client):
+    """An executor whose first call hangs until released, so the rest queue."""
+    release = threading.Event()
+    client.adjust_volume.side_effect = lambda *_args: release.wait(2)
+    client.toggle_entity.side_effect = lambda *_args: release.wait(2)
+    client.call_service.side_effect = lambda *_args, **_kwargs: release.wait(2)
+    executor = ServiceExecutor(client, workers=2)
+    executor.start()
+    yield Blocked(executor, release)
+    release.set()
+    executor.stop()
+
+
+def test_volume_taps_add_up_into_one_call(blocked, client, wait_for):
+    """Seven taps used to be seven reads and seven volume_sets in a row."""
+    executor, release = blocked
+    first = executor.submit(AdjustVolume("media_player.x", 0.07))
+    assert wait_for(lambda: executor.metrics()["in_flight"] == 1)
+
+    later = [executor.submit(AdjustVolume("media_player.x", 0.07)) for _ in range(6)]
+    release.set()
+
+    assert first.result(1) is True
+    assert all(future.result(1) is True for future in later)
+    # The tap in flight is left alone; the six behind it go as one.
+    assert client.adjust_volume.call_count == 2
+    assert client.adjust_volume.call_args.args == (
+        "media_player.x",
+        pytest.approx(0.42),
+    )
+    assert executor.metrics()["coalesced"] == 5
+
+
+def test_the_next_step_waits_for_the_one_in_flight(blocked, client, wait_for):
+    """Two workers free, but a volume step must not read a level the step
+    before it is still changing."""
+    executor = blocked.executor
+    executor.submit(AdjustVolume("media_player.x", 0.07))
+    assert wait_for(lambda: executor.metrics()["in_flight"] == 1)
+
+    executor.submit(AdjustVolume("media_player.x", -0.07))
+    time.sleep(0.05)
+
+    assert client.adjust_volume.call_count == 1
+    assert executor.metrics()["queue_depth"] == 1
+
+
+def test_only_the_last_brightness_is_sent(blocked, client, wait_for):
+    executor, release = blocked
+    executor.submit(Toggle("light.other"))
+    executor.submit(Toggle("light.other2"))
+    assert wait_for(lambda: executor.metrics()["in_flight"] == 2)
+
+    for level in (25, 127, 204):
+        executor.submit(
+            CallService("light", "turn_on", "light.a", {"brightness": level})
+        )
+    executor.submit(
+        CallService("light", "turn_on", "light.a", {"rgb_color": [1, 2, 3]})
+    )
+    release.set()
+
+    assert wait_for(lambda: executor.metrics()["completed"] == 4)
+    assert [c.kwargs for c in client.call_service.call_args_list] == [
+        {"brightness": 204},
+        {"rgb_color": [1, 2, 3]},
+    ]
+
+
+def test_toggles_are_never_merged(blocked, client, wait_for):
+    executor, release = blocked
+    executor.submit(Toggle("light.a"))
+    executor.submit(Toggle("light.a"))
+    executor.submit(Toggle("light.a"))
+    release.set()
+
+    assert wait_for(lambda: executor.metrics()["completed"] == 3)
+    assert client.toggle_entity.call_count == 3
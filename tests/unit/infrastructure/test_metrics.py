@@ -0,0 +1,76 @@
+import logging
+
+import pytest
+
+from ha_launchpad.infrastructure.ha.metrics import (
+    ClientMetrics,
+    Histogram,
+    endpoint_class,
+)
+
+
+@pytest.mark.parametrize(
+    ("path", "kind"),
+    [
+        ("http://ha/api/states", "states"),
+        ("http://ha/api/template", "states"),
+        ("http://ha/api/states/light.a", "state"),
+        ("http://ha/api/services/light/toggle", "service"),
+        ("http://ha/api/", "health"),
+        ("http://ha/api/config", "other"),
+    ],
+)
+def test_endpoint_classes(path, kind):
+    assert endpoint_class(path) == kind
+
+
+def test_histogram_buckets_and_percentiles():
+    histogram = Histogram((1, 10, 100))
+    for value in [0.5] * 50 + [5] * 45 + [50] * 4 + [500]:
+        histogram.observe(value)
+
+    snapshot = histogram.snapshot()
+
+    assert snapshot["buckets"] == {1: 50, 10: 45, 100: 4, "inf": 1}
+    assert snapshot["p50"] == 1
+    assert snapshot["p95"] == 10
+    assert snapshot["p99"] == 100
+    # Beyond the last edge, the worst seen is the only honest answer.
+    assert histogram.percentile(1.0) == 500
+    assert snapshot["max"] == 500
+
+
+def test_empty_histogram_reads_as_zero():
+    assert Histogram((1, 2)).percentile(0.5) == 0.0
+
+
+def test_snapshot_covers_only_endpoints_that_were_used():
+    metrics = ClientMetrics(log_interval=0)
+    metrics.record_request("states", 0.012, 200, retries=1, size=2048)
+    metrics.record_request("states", 0.030, 503)
+    metrics.record_request("states", 2.0, None)
+    metrics.record_decode("states", 0.0004)
+
+    snapshot = metrics.snapshot()
+
+    assert set(snapshot) == {"states"}
+    states = snapshot["states"]
+    assert states["statuses"] == {200: 1, 503: 1, "error": 1}
+    assert states["retries"] == 1
+    assert states["latency_ms"]["count"] == 3
+    assert states["response_bytes"]["count"] == 1
+    assert states["decode_ms"]["p50"] == 0.5
+
+
+def test_summary_is_logged_when_due(caplog):
+    caplog.set_level(logging.INFO, logger="ha_launchpad.infrastructure.ha.metrics")
+    metrics = ClientMetrics(log_interval=3600)
+    metrics.record_request("service", 0.004, 200, size=2)
+    assert not caplog.records
+
+    metrics._next_log = 0.0
+    metrics.record_request("service", 0.004, 200, size=2)
+
+    [record] = caplog.records
+    assert "service: 2 req" in record.getMessage()
+    assert "status 200x2" in record.getMessage()
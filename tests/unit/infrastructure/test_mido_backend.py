@@ -0,0 +1,91 @@
+from unittest.mock import MagicMock
+
+import pytest
+
+from ha_launchpad.config.mapping import ALL_PADS
+from ha_launchpad.infrastructure.midi.mido_backend import MidoBackend
+
+
+@pytest.fixture
+def backend():
+    backend = MidoBackend()
+    backend.midi_out = MagicMock()
+    return backend
+
+
+def _sent(backend):
+    return [c.args[0] for c in backend.midi_out.send.call_args_list]
+
+
+def test_a_whole_board_is_one_message(backend):
+    backend.send_frame([(pad, 21, 0) for pad in ALL_PADS])
+
+    (msg,) = _sent(backend)
+    assert msg.type == "sysex"
+    assert list(msg.data[:6]) == [0x00, 0x20, 0x29, 0x02, 0x0D, 0x03]
+    assert len(msg.data) == 6 + 3 * len(ALL_PADS)
+
+
+def test_each_pad_is_its_lighting_type_index_and_colour(backend):
+    backend.send_frame([(11, 5, 0), (88, 37, 2)])
+
+    (msg,) = _sent(backend)
+    assert list(msg.bytes()) == [
+        0xF0,
+        *(0x00, 0x20, 0x29, 0x02, 0x0D, 0x03),
+        *(0x00, 11, 5),  # static
+        *(0x02, 88, 37),  # pulsing
+        0xF7,
+    ]
+
+
+def test_a_flashing_pad_still_goes_as_a_note(backend):
+    backend.send_frame([(11, 5, 1), (12, 6, 0)])
+
+    note, frame = _sent(backend)
+    assert (note.type, note.note, note.velocity, note.channel) == ("note_on", 11, 5, 1)
+    assert list(frame.data[6:]) == [0x00, 12, 6]
+
+
+def test_more_pads_than_the_device_has_leds_are_split(backend):
+    backend.send_frame([(note, 1, 0) for note in range(100)])
+
+    assert [len(msg.data) - 6 for msg in _sent(backend)] == [81 * 3, 19 * 3]
+
+
+@pytest.mark.parametrize(
+    "send",
+    [
+        lambda backend: backend.send_velocity(11, 5),
+        lambda backend: backend.send_frame([(11, 5, 0), (12, 6, 0)]),
+        lambda backend: backend.send_cc(95, 3),
+    ],
+)
+def test_a_failed_write_raises_for_the_writer_to_report(backend, send):
+    backend.midi_out.send.side_effect = OSError("device gone")
+
+    with pytest.raises(OSError, match="device gone"):
+        send(backend)
+
+
+def test_nothing_is_sent_before_the_port_is_open():
+    backend = MidoBackend()
+
+    backend.send_frame([(11, 5, 0)])  # must not raise
+
+
+def test_listening_hands_the_port_a_callback(backend):
+    backend.midi_in = MagicMock()
+    heard = []
+
+    assert backend.listen(heard.append)
+    backend.midi_in.callback("msg")
+
+    assert heard == ["msg"]
+
+
+def test_a_port_without_a_callback_has_to_be_polled(backend):
+    backend.midi_in = object()
+
+    assert not backend.listen(print)
+    assert not MidoBackend().listen(print)
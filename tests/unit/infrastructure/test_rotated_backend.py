@@ -23,6 +23,15 @@ def test_rotated_backend_send():
     inner_backend.send_note.assert_called_with(18, "green_1", 0)
 
 
+def test_a_frame_is_rotated_pad_by_pad():
+    inner_backend = MagicMock()
+    rotated = RotatedBackend(inner_backend, 180)
+
+    rotated.send_frame([(81, 21, 0), (11, 5, 2)])
+
+    inner_backend.send_frame.assert_called_once_with([(18, 21, 0), (88, 5, 2)])
+
+
 @pytest.mark.parametrize("rotation", [0, 90, 180, 270])
 def test_every_pad_stays_a_valid_midi_note_when_rotated(rotation):
     """Rotation must map the grid onto itself, whatever the angle.
@@ -57,3 +66,15 @@ def test_rotated_backend_receive():
 
     assert len(msgs) == 1
     assert msgs[0].note == 81  # Should be rotated back to logical
+
+
+def test_a_message_heard_is_rotated_like_a_polled_one():
+    inner_backend = MagicMock()
+    rotated = RotatedBackend(inner_backend, 180)
+    heard = []
+
+    rotated.listen(heard.append)
+    (callback,) = inner_backend.listen.call_args.args
+    callback(MockMsg(18))
+
+    assert [msg.note for msg in heard] == [81]
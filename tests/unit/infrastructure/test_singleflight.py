@@ -0,0 +1,73 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from ha_launchpad.infrastructure.ha.singleflight import SingleFlight
+
+
+def _blocked_fetch(result, release, calls):
+    def fetch():
+        calls.append(1)
+        release.wait(1)
+        return result
+
+    return fetch
+
+
+def test_concurrent_callers_share_one_fetch_and_its_result():
+    flights = SingleFlight()
+    release = threading.Event()
+    calls = []
+    answer = {"state": "on"}
+
+    with ThreadPoolExecutor(4) as pool:
+        futures = [
+            pool.submit(flights.do, "light.a", _blocked_fetch(answer, release, calls))
+            for _ in range(4)
+        ]
+        while flights.metrics()["shared"] < 3:
+            pass
+        release.set()
+        results = [f.result(1) for f in futures]
+
+    assert len(calls) == 1
+    assert all(result is answer for result in results)
+    assert flights.metrics() == {"made": 1, "shared": 3}
+
+
+def test_different_keys_do_not_share():
+    flights = SingleFlight()
+
+    assert flights.do("a", lambda: 1) == 1
+    assert flights.do("b", lambda: 2) == 2
+    assert flights.metrics() == {"made": 2, "shared": 0}
+
+
+def test_nothing_is_kept_once_the_fetch_lands():
+    flights = SingleFlight()
+    answers = iter(["first", "second"])
+
+    assert flights.do("a", lambda: next(answers)) == "first"
+    assert flights.do("a", lambda: next(answers)) == "second"
+
+
+def test_every_waiter_sees_the_failure():
+    flights = SingleFlight()
+    release = threading.Event()
+
+    def fetch():
+        release.wait(1)
+        raise RuntimeError("boom")
+
+    with ThreadPoolExecutor(2) as pool:
+        futures = [pool.submit(flights.do, "a", fetch) for _ in range(2)]
+        while flights.metrics()["shared"] < 1:
+            pass
+        release.set()
+        for future in futures:
+            with pytest.raises(RuntimeError, match="boom"):
+                future.result(1)
+
+    # The failure is not remembered either.
+    assert flights.do("a", lambda: "recovered") == "recovered"
@@ -0,0 +1,113 @@
+import json
+
+import pytest
+
+from ha_launchpad.infrastructure.ha.states_decoder import StatesDecoder
+
+STATES = [
+    {
+        "entity_id": "light.a",
+        "state": "on",
+        "attributes": {"brightness": 120, "friendly_name": "A", "effect_list": []},
+        "last_changed": "2026-01-01T00:00:00+00:00",
+        "context": {"id": "x"},
+    },
+    {
+        "entity_id": "sensor.noisy",
+        "state": "12.5",
+        # A nested object keyed like a state must not be mistaken for one.
+        "attributes": {"note": '{"entity_id":"light.a"}', "items": [{"x": "}"}]},
+    },
+    {"entity_id": "switch.b", "state": "off", "attributes": {}},
+]
+
+
+def _decode(body: bytes, chunk_size: int, watched=("light.a", "switch.b")):
+    decoder = StatesDecoder(watched, {"brightness"})
+    for i in range(0, len(body), chunk_size):
+        decoder.feed(body[i : i + chunk_size])
+    return decoder, decoder.finish()
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 64, 1 << 20])
+@pytest.mark.parametrize("separators", [(",", ":"), (", ", ": ")])
+def test_keeps_only_watched_entities_and_attributes(chunk_size, separators):
+    """However the body is split, and however it is spaced."""
+    body = json.dumps(STATES, separators=separators).encode()
+
+    decoder, states = _decode(body, chunk_size)
+
+    assert states == {
+        "light.a": {
+            "entity_id": "light.a",
+            "state": "on",
+            "attributes": {"brightness": 120},
+        },
+        "switch.b": {"entity_id": "switch.b", "state": "off", "attributes": {}},
+    }
+    assert decoder.states_seen == 3
+
+
+def test_multibyte_characters_split_across_chunks():
+    body = json.dumps(
+        [{"entity_id": "light.a", "state": "Küche ☀", "attributes": {}}],
+        ensure_ascii=False,
+    ).encode()
+
+    _, states = _decode(body, 1)
+
+    assert states["light.a"]["state"] == "Küche ☀"
+
+
+def test_a_state_that_does_not_lead_with_entity_id_is_still_found():
+    body = json.dumps(
+        [{"state": "on", "entity_id": "light.a", "attributes": {"brightness": 1}}]
+    ).encode()
+
+    decoder, states = _decode(body, 5)
+
+    assert states["light.a"]["attributes"] == {"brightness": 1}
+    assert decoder.states_seen == 1
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 1 << 20])
+def test_an_attribute_naming_a_watched_entity_is_not_taken_for_it(chunk_size):
+    # Groups and scenes list their members as objects keyed like a state.
+    member = {"entity_id": "light.a", "state": "off", "attributes": {"brightness": 1}}
+    body = json.dumps(
+        [
+            {
+                "entity_id": "group.all",
+                "state": "on",
+                "attributes": {"members": [member]},
+            },
+            {"entity_id": "light.a", "state": "on", "attributes": {"brightness": 200}},
+            {"entity_id": "scene.x", "state": "1", "attributes": {"target": member}},
+        ]
+    ).encode()
+
+    decoder, states = _decode(body, chunk_size)
+
+    assert states == {
+        "light.a": {
+            "entity_id": "light.a",
+            "state": "on",
+            "attributes": {"brightness": 200},
+        }
+    }
+    assert decoder.states_seen == 3
+
+
+def test_an_empty_house_sees_nothing():
+    decoder, states = _decode(b"[]", 1)
+
+    assert states == {}
+    assert decoder.states_seen == 0
+
+
+def test_a_body_cut_off_inside_a_watched_state_is_invalid():
+    body = json.dumps(STATES).encode()
+    cut = body[: body.index(b'"switch.b"') + 20]
+
+    with pytest.raises(ValueError):
+        _decode(cut, 16)
@@ -0,0 +1,99 @@
+import pytest
+
+from ha_launchpad.infrastructure.ha.store import EntityStore
+
+ON = {"entity_id": "light.a", "state": "on", "attributes": {}}
+OFF = {"entity_id": "light.a", "state": "off", "attributes": {}}
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(
+        "ha_launchpad.infrastructure.ha.store.time.monotonic", lambda: now[0]
+    )
+    return now
+
+
+def test_a_recent_entry_is_served_and_an_old_one_is_not(clock):
+    store = EntityStore()
+    store.put("light.a", ON)
+
+    clock[0] += 2.0
+    assert store.get("light.a", max_age=3.0) == ON
+
+    clock[0] += 2.0
+    assert store.get("light.a", max_age=3.0) is None
+
+
+def test_an_unchanged_poll_keeps_the_entry_fresh(clock):
+    store = EntityStore()
+    store.put("light.a", ON)
+    version = store.version("light.a")
+
+    clock[0] += 10.0
+    store.touch({"light.a"})
+
+    assert store.get("light.a", max_age=3.0) == ON
+    assert store.version("light.a") == version
+
+
+def test_the_version_moves_only_when_the_state_does():
+    store = EntityStore()
+    store.put("light.a", ON)
+    first = store.version("light.a")
+
+    store.put("light.a", dict(ON))
+    assert store.version("light.a") == first
+
+    store.put("light.a", OFF)
+    assert store.version("light.a") > first
+
+
+def test_a_complete_read_drops_what_home_assistant_no_longer_knows():
+    store = EntityStore()
+    store.put("light.a", ON)
+    store.put("light.gone", ON)
+
+    store.replace({"light.a": OFF}, {"light.a", "light.gone"})
+
+    assert store.get("light.a", 3.0) == OFF
+    assert store.get("light.gone", 3.0) is None
+    assert store.version("light.gone") == 0
+
+
+def test_push_keeps_its_entities_current_however_old(clock):
+    store = EntityStore()
+    store.put("light.a", ON)
+    store.set_live({"light.a"})
+
+    clock[0] += 3600.0
+    assert store.get("light.a", max_age=3.0) == ON
+
+    store.set_live(())
+    assert store.get("light.a", max_age=3.0) is None
+
+
+def test_an_invalidated_entry_is_read_again_even_under_push():
+    store = EntityStore()
+    store.put("light.a", ON)
+    store.set_live({"light.a"})
+
+    store.invalidate("light.a")
+
+    assert store.get("light.a", 3.0) is None
+    store.put("light.a", OFF)
+    assert store.get("light.a", 3.0) == OFF
+
+
+def test_invalidating_leaves_alone_what_was_already_read_back():
+    """Push usually delivers the change before the call that made it has
+    returned. That entry is the read-back, not something to distrust."""
+    store = EntityStore()
+    store.put("light.a", ON)
+    seen = store.version("light.a")
+    store.put("light.a", OFF)
+
+    store.invalidate("light.a", seen)
+
+    assert store.get("light.a", 3.0) == OFF
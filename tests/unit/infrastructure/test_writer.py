@@ -0,0 +1,124 @@
+import threading
+import time
+from itertools import pairwise
+from unittest.mock import MagicMock
+
+import pytest
+
+from ha_launchpad.config.mapping import COLORS
+from ha_launchpad.infrastructure.midi.writer import MidiWriter
+
+
+class _StuckBoard:
+    """A backend whose first write hangs until released."""
+
+    def __init__(self, backend):
+        self.release = threading.Event()
+        self.entered = threading.Event()
+        backend.send_velocity.side_effect = self._hang
+
+    def _hang(self, *_args):
+        self.entered.set()
+        self.release.wait(2)
+
+
+@pytest.fixture
+def writer():
+    writer = MidiWriter(MagicMock(), interval=0.01)
+    writer.start()
+    yield writer
+    writer.stop()
+
+
+def test_writes_go_straight_through_until_started():
+    backend = MagicMock()
+    writer = MidiWriter(backend)
+
+    writer.send_note(81, "green_1")
+    writer.send_cc(95, 3)
+
+    backend.send_note.assert_called_once_with(81, "green_1", 0)
+    backend.send_cc.assert_called_once_with(95, 3, 0)
+
+
+def test_a_burst_on_one_pad_goes_out_once_with_the_last_colour(writer, wait_for):
+    board = _StuckBoard(writer._backend)
+    writer.send_velocity(11, 1)
+    assert board.entered.wait(1)
+
+    writer.send_note(81, "red_1")
+    writer.send_note(81, "yellow_3", 2)
+    writer.send_frame([(81, COLORS["green_1"], 0), (82, 5, 0)])
+    board.release.set()
+
+    assert wait_for(lambda: writer._backend.send_frame.called)
+    writer._backend.send_frame.assert_called_once_with(
+        [(81, COLORS["green_1"], 0), (82, 5, 0)]
+    )
+    assert writer.metrics()["coalesced"] == 2
+
+
+def test_a_caller_never_waits_on_the_board(writer):
+    board = _StuckBoard(writer._backend)
+    writer.send_velocity(11, 1)
+    assert board.entered.wait(1)
+
+    started = time.perf_counter()
+    for note in range(11, 89):
+        writer.send_note(note, "green_1")
+    elapsed = time.perf_counter() - started
+    board.release.set()
+
+    assert elapsed < 0.05
+
+
+def test_flushes_are_at_least_the_interval_apart(wait_for):
+    backend = MagicMock()
+    sent = []
+    backend.send_velocity.side_effect = lambda *_: sent.append(time.monotonic())
+    writer = MidiWriter(backend, interval=0.05)
+    writer.start()
+    try:
+        for note in (11, 12, 13):
+            writer.send_velocity(note, 5)
+            assert wait_for(lambda n=note: len(sent) == n - 10)
+    finally:
+        writer.stop()
+
+    assert all(b - a >= 0.045 for a, b in pairwise(sent))
+
+
+def test_stopping_sends_what_is_still_waiting(writer):
+    board = _StuckBoard(writer._backend)
+    writer.send_velocity(11, 1)
+    assert board.entered.wait(1)
+    writer.send_cc(95, 3)
+    board.release.set()
+
+    writer.stop()
+
+    writer._backend.send_cc.assert_called_once_with(95, 3, 0)
+
+
+def test_a_failed_write_does_not_stop_the_writer(writer, wait_for):
+    writer._backend.send_velocity.side_effect = [OSError("gone"), None]
+
+    writer.send_velocity(11, 1)
+    assert wait_for(lambda: writer._backend.send_velocity.call_count == 1)
+    writer.send_velocity(12, 1)
+
+    assert wait_for(lambda: writer._backend.send_velocity.call_count == 2)
+
+
+def test_a_failed_write_is_reported_with_what_it_was_for(writer, wait_for):
+    failed = []
+    writer.on_error = lambda pads, controls: failed.append((pads, controls))
+    writer._backend.send_frame.side_effect = OSError("gone")
+    writer._backend.send_cc.side_effect = [OSError("gone"), None]
+
+    writer.send_frame([(81, 5, 0), (82, 5, 0)])
+    writer.send_cc(95, 3)
+    writer.send_cc(96, 3)
+
+    assert wait_for(lambda: failed)
+    assert failed == [([81, 82], [95])]